@@ -0,0 +1,131 @@
+"""Micro-benchmark of the contact reward terms of the locomotion tasks with the shared contact features.
+
+Compares the previous terms, which each gather and reduce the force history of the contact sensor, with the terms of
+:mod:`unitree_rl_lab.tasks.locomotion.mdp.rewards`, which select their bodies from the
+:class:`~unitree_rl_lab.tasks.locomotion.mdp.contacts.ContactFeatures` of the step. The contact terms are evaluated
+with the bodies and thresholds of the M3 23dof velocity task on random forces.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/contact_features.py --num_envs 4096 --device cuda --check
+"""
+
+import argparse
+import time
+import torch
+from types import SimpleNamespace
+
+from unitree_rl_lab.tasks.locomotion.mdp import rewards
+
+parser = argparse.ArgumentParser(description="Benchmark the contact reward terms of the locomotion tasks.")
+parser.add_argument("--num_envs", type=int, default=4096)
+parser.add_argument("--num_bodies", type=int, default=24)
+parser.add_argument("--history_length", type=int, default=3)
+parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--iterations", type=int, default=200)
+parser.add_argument("--check", action="store_true", help="Assert that both implementations agree.")
+args = parser.parse_args()
+
+
+class Env:
+    # the contact features are cached per env, which needs a weakly referenceable object
+    def __init__(self, scene):
+        self.scene = scene
+        self.common_step_counter = 0
+
+
+class Scene:
+    def __init__(self, robot, sensors):
+        self.robot = robot
+        self.sensors = sensors
+
+    def __getitem__(self, name):
+        return self.robot
+
+
+def previous_terms(env, feet, others):
+    forces = env.scene.sensors["contact_forces"].data.net_forces_w_history
+    current = env.scene.sensors["contact_forces"].data.net_forces_w
+    undesired = torch.max(torch.norm(forces[:, :, others], dim=-1), dim=1)[0] > 1.0
+    fly = torch.max(torch.norm(forces[:, :, feet], dim=-1), dim=1)[0] > 1.0
+    slide = forces[:, :, feet, :].norm(dim=-1).max(dim=1)[0] > 1.0
+    body_vel = env.scene["robot"].data.body_lin_vel_w[:, feet, :2]
+    body_force = current[:, feet, 2].norm(dim=-1)
+    body_force[body_force < 500] = 0
+    body_force[body_force > 500] -= 500
+    stumble = torch.any(torch.norm(current[:, feet, :2], dim=2) > 5 * torch.abs(current[:, feet, 2]), dim=1)
+    return {
+        "undesired_contacts": torch.sum(undesired, dim=1),
+        "fly": torch.sum(fly, dim=-1) < 0.5,
+        "feet_slide": torch.sum(body_vel.norm(dim=-1) * slide, dim=1),
+        "body_force": body_force.clamp(min=0, max=400),
+        "feet_stumble": stumble,
+    }
+
+
+def current_terms(env, feet, others):
+    sensor_feet = SimpleNamespace(name="contact_forces", body_ids=feet)
+    sensor_others = SimpleNamespace(name="contact_forces", body_ids=others)
+    return {
+        "undesired_contacts": rewards.undesired_contacts(env, 1.0, sensor_others),
+        "fly": rewards.fly(env, 1.0, sensor_feet),
+        "feet_slide": rewards.feet_slide(env, sensor_feet, SimpleNamespace(name="robot", body_ids=feet)),
+        "body_force": rewards.body_force(env, sensor_feet),
+        "feet_stumble": rewards.feet_stumble(env, sensor_feet),
+    }
+
+
+def step(env):
+    # contact forces of a few hundred newtons, zero for about half of the bodies
+    forces = env.scene.sensors["contact_forces"].data.net_forces_w_history
+    forces.normal_(0.0, 200.0).mul_(torch.rand(forces.shape[:3] + (1,), device=forces.device) < 0.5)
+    env.scene["robot"].data.body_lin_vel_w.normal_()
+    env.common_step_counter += 1
+
+
+def measure(fn, env, feet, others) -> float:
+    cuda = args.device.startswith("cuda")
+    elapsed = 0.0
+    for i in range(args.iterations + 10):
+        step(env)
+        if cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        fn(env, feet, others)
+        if cuda:
+            torch.cuda.synchronize()
+        if i >= 10:
+            elapsed += time.perf_counter() - start
+    return elapsed / args.iterations * 1e3
+
+
+def main():
+    history = torch.zeros(args.num_envs, args.history_length, args.num_bodies, 3, device=args.device)
+    sensor = SimpleNamespace(
+        device=args.device, data=SimpleNamespace(net_forces_w_history=history, net_forces_w=history[:, 0])
+    )
+    robot = SimpleNamespace(
+        data=SimpleNamespace(body_lin_vel_w=torch.zeros(args.num_envs, args.num_bodies, 3, device=args.device))
+    )
+    env = Env(Scene(robot, {"contact_forces": sensor}))
+    # the ankle roll links of the M3 and every other body
+    feet = [args.num_bodies - 4, args.num_bodies - 3]
+    others = [i for i in range(args.num_bodies) if i not in (feet[0], feet[1], feet[0] - 2, feet[1] - 2)]
+
+    if args.check:
+        for _ in range(5):
+            step(env)
+            expected, actual = previous_terms(env, feet, others), current_terms(env, feet, others)
+            for name in expected:
+                torch.testing.assert_close(actual[name], expected[name], msg=name)
+        print("[INFO] The contact terms match the previous implementation.")
+
+    previous_ms = measure(previous_terms, env, feet, others)
+    current_ms = measure(current_terms, env, feet, others)
+    print(f"[INFO] {args.num_envs} envs, {args.num_bodies} bodies, history {args.history_length}, {args.device}")
+    print(f"  previous terms        {previous_ms:8.3f} ms")
+    print(f"  shared features       {current_ms:8.3f} ms  ({previous_ms / current_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Equivalence check and CPU benchmark of the chunked csv reader of :class:`unitree_rl_lab.motion.CsvMotionLoader`.
+
+Compares the previous loader, which read the whole file with :func:`numpy.loadtxt` as ``float64`` before resampling
+it, with the streaming loader on a synthetic capture session. It reports wall time and peak traced memory (NumPy and
+Python allocations, not the tensors of the output motion). Both parse with the C parser of :func:`numpy.loadtxt`, so
+the wall times are about the same; the streaming loader bounds the memory.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/csv_reader.py --check
+    python scripts/benchmarks/csv_reader.py --minutes 60 --input_fps 120 --frame_range 100000 200000
+"""
+
+import argparse
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+import tracemalloc
+
+from unitree_rl_lab.motion import CsvMotionLoader, compute_frame_blend
+from unitree_rl_lab.utils.quat_kernels import quat_slerp
+
+parser = argparse.ArgumentParser(description="Check and benchmark the chunked csv reader.")
+parser.add_argument("--minutes", type=float, default=60.0, help="Duration of the synthetic capture session.")
+parser.add_argument("--input_fps", type=int, default=120)
+parser.add_argument("--output_fps", type=int, default=50)
+parser.add_argument("--num_joints", type=int, default=29)
+parser.add_argument("--frame_range", nargs=2, type=int, metavar=("START", "END"))
+parser.add_argument("--check", action="store_true", help="Only assert that both loaders agree on a short clip.")
+args = parser.parse_args()
+
+
+def write_session(path: str, num_frames: int):
+    t = np.arange(num_frames)[:, None] / args.input_fps
+    yaw = 0.3 * t[:, 0]
+    root = np.concatenate([0.5 * t, 0 * t, 0.8 + 0.02 * np.sin(t)], axis=1)
+    quat = np.stack([0 * yaw, 0 * yaw, np.sin(yaw / 2), np.cos(yaw / 2)], axis=1)
+    dof = 0.3 * np.sin(t * np.arange(1, args.num_joints + 1) * 0.5)
+    np.savetxt(path, np.concatenate([root, quat, dof], axis=1), delimiter=",", fmt="%.6f")
+
+
+def loadtxt_motion(path: str) -> dict[str, torch.Tensor]:
+    # previous CsvMotionLoader._load_motion and _interpolate_motion
+    if args.frame_range is None:
+        motion = np.loadtxt(path, delimiter=",")
+    else:
+        start, end = args.frame_range
+        motion = np.loadtxt(path, delimiter=",", skiprows=start - 1, max_rows=end - start + 1)
+    motion = torch.from_numpy(motion).to(torch.float32)
+    duration = (motion.shape[0] - 1) / args.input_fps
+    # the previous loader used float32 times, which drift by up to 1e-4 s over an hour; float64 keeps the reference
+    # exact, so that both loaders can be compared on long sessions
+    times = torch.arange(0, duration, 1.0 / args.output_fps, dtype=torch.float64)
+    index_0, index_1, blend = compute_frame_blend(times, duration, motion.shape[0])
+    blend = blend.float().unsqueeze(1)
+    rots = motion[:, [6, 3, 4, 5]]
+    return {
+        "motion_base_poss": torch.lerp(motion[index_0, :3], motion[index_1, :3], blend),
+        "motion_base_rots": quat_slerp(rots[index_0], rots[index_1], blend),
+        "motion_dof_poss": torch.lerp(motion[index_0, 7:], motion[index_1, 7:], blend),
+    }
+
+
+def measure(fn):
+    """Returns the result of ``fn``, its wall time in seconds and its peak traced memory in MB."""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    # traced separately, since tracing slows down allocations
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    num_frames = 2_000 if args.check else int(args.minutes * 60 * args.input_fps)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "session.csv")
+        write_session(path, num_frames)
+        size = os.path.getsize(path) / 2**20
+
+        expected, t_loadtxt, m_loadtxt = measure(lambda: loadtxt_motion(path))
+        motion, t_stream, m_stream = measure(
+            lambda: CsvMotionLoader(path, args.input_fps, args.output_fps, frame_range=args.frame_range)
+        )
+
+    for name, value in expected.items():
+        torch.testing.assert_close(getattr(motion, name), value, atol=1e-4, rtol=1e-4, msg=lambda m: f"{name}: {m}")
+    print(f"[INFO] Both loaders agree on {motion.output_frames} output frames.")
+    if args.check:
+        return
+
+    print(f"[INFO] {num_frames} frames at {args.input_fps} fps ({size:.0f} MB csv) -> {args.output_fps} fps")
+    print(f"  {'loadtxt (previous)':<20} {t_loadtxt:8.2f} s  {m_loadtxt:8.1f} MB peak")
+    print(f"  {'chunked':<20} {t_stream:8.2f} s  {m_stream:8.1f} MB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Equivalence check and CPU benchmark of the root orientation resampling of ``scripts/mimic/csv_to_npz.py``.
+
+Compares the previous per-frame loop over :func:`isaaclab.utils.math.quat_slerp` with the batched
+:func:`unitree_rl_lab.utils.quat_kernels.quat_slerp` used by :class:`unitree_rl_lab.motion.CsvMotionLoader`, on a
+synthetic clip whose orientations include sign flips between neighbouring frames and repeated (parallel) frames.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/csv_slerp.py --check
+    python scripts/benchmarks/csv_slerp.py --num_frames 100000 --input_fps 120 --output_fps 50
+"""
+
+import argparse
+import time
+import torch
+
+from isaaclab.utils.math import quat_slerp
+
+from unitree_rl_lab.motion import compute_frame_blend
+from unitree_rl_lab.utils import quat_kernels
+
+parser = argparse.ArgumentParser(description="Check and benchmark the batched slerp of the csv motion loader.")
+parser.add_argument("--num_frames", type=int, default=100_000, help="Number of input frames of the clip.")
+parser.add_argument("--input_fps", type=int, default=120)
+parser.add_argument("--output_fps", type=int, default=50)
+parser.add_argument("--check", action="store_true", help="Only assert that both implementations agree.")
+args = parser.parse_args()
+
+
+def make_clip(num_frames: int) -> torch.Tensor:
+    """Returns a smooth random rotation sequence with random signs and some frozen frames. Shape is (T, 4)."""
+    omega = torch.randn(num_frames, 3).cumsum(dim=0) * 1e-3
+    angle = omega.norm(dim=-1, keepdim=True)
+    quat = torch.cat([torch.cos(angle / 2), torch.sin(angle / 2) * omega / angle.clamp(min=1e-9)], dim=-1)
+    quat = quat_kernels.quat_mul(quat, torch.tensor([0.0, 0.0, 0.0, 1.0]))
+    frozen = torch.rand(num_frames) < 0.05
+    quat[1:][frozen[1:]] = quat[:-1][frozen[1:]]
+    return quat * torch.where(torch.rand(num_frames, 1) < 0.5, -1.0, 1.0)
+
+
+def loop_slerp(a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
+    # previous CsvMotionLoader._slerp
+    slerped_quats = torch.zeros_like(a)
+    for i in range(a.shape[0]):
+        slerped_quats[i] = quat_slerp(a[i], b[i].clone(), blend[i])
+    return slerped_quats
+
+
+def batched_slerp(a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
+    return quat_kernels.quat_slerp(a, b, blend.unsqueeze(-1))
+
+
+def main():
+    torch.manual_seed(0)
+    num_frames = 5_000 if args.check else args.num_frames
+    rots = make_clip(num_frames)
+    duration = (num_frames - 1) / args.input_fps
+    times = torch.arange(0, duration, 1.0 / args.output_fps, dtype=torch.float32)
+    index_0, index_1, blend = compute_frame_blend(times, duration, num_frames)
+    a, b = rots[index_0], rots[index_1]
+
+    start = time.perf_counter()
+    expected = loop_slerp(a, b, blend)
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = batched_slerp(a, b, blend)
+    t_batched = time.perf_counter() - start
+
+    # the loop snaps to the first frame when the frames are within ~1e-3 rad in float32 (4 eps on the cosine), so
+    # both are compared with the loop on renormalized float64 inputs, where that threshold is negligible
+    a64, b64 = a.double(), b.double()
+    exact = loop_slerp(a64 / a64.norm(dim=-1, keepdim=True), b64 / b64.norm(dim=-1, keepdim=True), blend.double())
+    exact = exact.float()
+    error_loop = (expected - exact).abs().max().item()
+    error_batched = (actual - exact).abs().max().item()
+    print(
+        f"[INFO] Max error vs. float64 on {times.shape[0]} frames: loop {error_loop:.2e}, batched {error_batched:.2e}"
+    )
+    assert error_batched < 1e-5, "batched slerp disagrees with the float64 reference"
+    if args.check:
+        return
+
+    print(f"[INFO] {num_frames} frames at {args.input_fps} fps -> {times.shape[0]} frames at {args.output_fps} fps")
+    print(f"  {'loop (previous)':<18} {t_loop * 1e3:10.1f} ms")
+    print(f"  {'batched':<18} {t_batched * 1e3:10.1f} ms  ({t_loop / t_batched:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Equivalence check and benchmark of :func:`unitree_rl_lab.motion.derive_velocities`.
+
+Checks that deriving the velocities of concatenated clips in one pass matches :func:`torch.gradient` and
+:func:`~unitree_rl_lab.motion.so3_derivative` applied clip by clip, and reports the derivation time, the error against
+the velocities of forward kinematics and the size of archives with and without velocities.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/derived_velocities.py --check
+    python scripts/benchmarks/derived_velocities.py --num_clips 200 --device cuda
+"""
+
+import argparse
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+
+from unitree_rl_lab.motion import (
+    MOTION_ROBOTS,
+    VELOCITY_SOURCES,
+    UrdfKinematics,
+    derive_velocities,
+    save_compact_motion,
+    so3_derivative,
+)
+
+parser = argparse.ArgumentParser(description="Check and benchmark velocities derived from motion poses.")
+parser.add_argument("--num_clips", type=int, default=50)
+parser.add_argument("--num_frames", type=int, default=1500, help="Frames of the longest clip.")
+parser.add_argument("--device", type=str, default="cpu")
+parser.add_argument("--check", action="store_true", help="Only assert the equivalence on a few short clips.")
+args = parser.parse_args()
+
+
+def clip(kinematics: UrdfKinematics, num_frames: int, fps: int, seed: int) -> dict[str, torch.Tensor]:
+    generator = torch.Generator().manual_seed(seed)
+    frequency = 1.0 + torch.rand(kinematics.num_joints, generator=generator)
+    phase = 6.0 * torch.rand(kinematics.num_joints, generator=generator)
+    t = torch.arange(num_frames, dtype=torch.float64)[:, None] / fps
+    yaw = 0.5 * t[:, 0]
+    root_pos = torch.stack([0.5 * t[:, 0], 0.1 * torch.sin(t[:, 0]), 0.8 + 0.02 * torch.sin(4 * t[:, 0])], dim=-1)
+    root_lin_vel = torch.stack([0.5 + 0 * yaw, 0.1 * torch.cos(t[:, 0]), 0.08 * torch.cos(4 * t[:, 0])], dim=-1)
+    root_quat = torch.stack([torch.cos(yaw / 2), 0 * yaw, 0 * yaw, torch.sin(yaw / 2)], dim=-1)
+    root_ang_vel = torch.stack([0 * yaw, 0 * yaw, 0.5 + 0 * yaw], dim=-1)
+    joint_pos = 0.4 * torch.sin(frequency * t + phase)
+    joint_vel = 0.4 * frequency * torch.cos(frequency * t + phase)
+    states = kinematics.forward(
+        *(x.float() for x in (root_pos, root_quat, joint_pos, root_lin_vel, root_ang_vel, joint_vel))
+    )
+    return {"joint_pos": joint_pos.float(), "joint_vel": joint_vel.float(), **states}
+
+
+def main():
+    kinematics = UrdfKinematics(MOTION_ROBOTS["m3"].urdf_path)
+    num_clips = 6 if args.check else args.num_clips
+    # include clips of one and two frames, which have no central differences
+    lengths = [1, 2, 3] + [int(n) for n in np.linspace(args.num_frames // 4, args.num_frames, num_clips - 3)]
+    if args.check:
+        lengths = [1, 2, 3, 40, 97, 150]
+    fps = [50 if i % 2 else 30 for i in range(len(lengths))]
+    clips = [clip(kinematics, n, f, i) for i, (n, f) in enumerate(zip(lengths, fps))]
+
+    library = {name: torch.cat([c[name] for c in clips]).to(args.device) for name in VELOCITY_SOURCES.values()}
+    clip_lengths = torch.tensor(lengths, device=args.device)
+    clip_fps = torch.tensor(fps, dtype=torch.float32, device=args.device)
+    derived = derive_velocities(library, clip_fps, clip_lengths=clip_lengths)
+
+    offset = 0
+    for c, n, f in zip(clips, lengths, fps):
+        expected = {name: torch.zeros_like(c[name]) for name in ("joint_pos", "body_pos_w")}
+        if n > 1:
+            expected = {name: torch.gradient(c[name], spacing=1.0 / f, dim=0)[0] for name in expected}
+        for name, source in (("joint_vel", "joint_pos"), ("body_lin_vel_w", "body_pos_w")):
+            torch.testing.assert_close(derived[name][offset : offset + n].cpu(), expected[source], atol=1e-4, rtol=1e-4)
+        if n >= 3:
+            omega = so3_derivative(c["body_quat_w"], 1.0 / f)
+            torch.testing.assert_close(
+                derived["body_ang_vel_w"][offset : offset + n].cpu(), omega, atol=1e-3, rtol=1e-4
+            )
+        offset += n
+    print(f"[INFO] Derived velocities of {len(lengths)} concatenated clips match the per-clip derivatives.")
+    if args.check:
+        return
+
+    for _ in range(3):
+        start = time.perf_counter()
+        derive_velocities(library, clip_fps, clip_lengths=clip_lengths)
+        if args.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+    num_frames, num_bodies = library["body_pos_w"].shape[:2]
+    print(f"[INFO] {num_frames} frames of {num_bodies} bodies derived in {1000 * elapsed:.1f} ms on {args.device}")
+
+    # the derived body velocities are the ones of the body frames, the stored ones of the centers of mass
+    stored = {name: torch.cat([c[name] for c in clips]) for name in VELOCITY_SOURCES}
+    for name, value in stored.items():
+        error = (derived[name].cpu() - value).norm(dim=-1) if value.dim() > 2 else (derived[name].cpu() - value).abs()
+        print(f"  {name:<16} mean error {error.mean():.4f}, p99 {error.flatten().quantile(0.99):.4f}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, names in (("with velocities", list(VELOCITY_SOURCES)), ("poses only", [])):
+            arrays = {"fps": np.array([fps[-1]])}
+            arrays.update({name: clips[-1][name].numpy() for name in list(VELOCITY_SOURCES.values()) + names})
+            npz_path, compact_path = os.path.join(tmp_dir, "clip.npz"), os.path.join(tmp_dir, "clip_compact.npz")
+            np.savez(npz_path, **arrays)
+            save_compact_motion(compact_path, arrays)
+            for fmt, path in (("npz", npz_path), ("compact", compact_path)):
+                print(f"  {fmt:<8} {label:<16} {os.path.getsize(path) / 2**20:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
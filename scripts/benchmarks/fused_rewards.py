@@ -0,0 +1,263 @@
+"""Equivalence check and benchmark of :class:`unitree_rl_lab.utils.fused_rewards.FusedRewardEvaluator`.
+
+Builds a reward manager with terms shaped like the locomotion rewards on random robot data, and compares the reward,
+the episodic sums and the step rewards of :meth:`RewardManager.compute` with those of the fused evaluator. A class
+term, a term that syncs with the host and two terms reading a per-step cache, one of them listed in ``eager_terms``,
+are included; they must be evaluated eagerly.
+It then reports the time of a step of both implementations.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/fused_rewards.py --num_envs 4096 --backend compile --check
+"""
+
+import argparse
+import time
+import torch
+from types import SimpleNamespace
+
+from isaaclab.managers import ManagerTermBase, RewardManager
+
+from unitree_rl_lab.utils.fused_rewards import FusedRewardEvaluator
+
+parser = argparse.ArgumentParser(description="Check and benchmark the fused reward evaluator.")
+parser.add_argument("--num_envs", type=int, default=4096)
+parser.add_argument("--num_joints", type=int, default=23)
+parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--backend", type=str, default="compile", choices=["eager", "compile"])
+parser.add_argument("--iterations", type=int, default=200)
+parser.add_argument("--check", action="store_true", help="Assert that both implementations agree.")
+args = parser.parse_args()
+
+
+def track_lin_vel_xy_exp(env, std: float):
+    error = torch.sum(torch.square(env.command[:, :2] - env.data.root_lin_vel_b[:, :2]), dim=1)
+    return torch.exp(-error / std**2)
+
+
+def track_ang_vel_z_exp(env, std: float):
+    error = torch.square(env.command[:, 2] - env.data.root_ang_vel_b[:, 2])
+    return torch.exp(-error / std**2)
+
+
+def lin_vel_z_l2(env):
+    return torch.square(env.data.root_lin_vel_b[:, 2])
+
+
+def ang_vel_xy_l2(env):
+    return torch.sum(torch.square(env.data.root_ang_vel_b[:, :2]), dim=1)
+
+
+def joint_torques_l2(env):
+    return torch.sum(torch.square(env.data.applied_torque), dim=1)
+
+
+def joint_acc_l2(env):
+    return torch.sum(torch.square(env.data.joint_acc), dim=1)
+
+
+def action_rate_l2(env):
+    return torch.sum(torch.square(env.action - env.prev_action), dim=1)
+
+
+def joint_pos_limits(env):
+    out_of_limits = -(env.data.joint_pos - env.data.soft_joint_pos_limits[..., 0]).clip(max=0.0)
+    out_of_limits += (env.data.joint_pos - env.data.soft_joint_pos_limits[..., 1]).clip(min=0.0)
+    return torch.sum(out_of_limits, dim=1)
+
+
+def energy(env):
+    return torch.sum(torch.abs(env.data.joint_vel * env.data.applied_torque), dim=-1)
+
+
+def flat_orientation_l2(env):
+    return torch.sum(torch.square(env.data.projected_gravity_b[:, :2]), dim=1)
+
+
+def base_height_l2(env, target_height: float):
+    return torch.square(env.data.root_pos_w[:, 2] - target_height)
+
+
+def is_alive(env):
+    return (~env.terminated).float()
+
+
+def mean_speed_bonus(env):
+    # syncs with the host and breaks the graph
+    return torch.full((env.num_envs,), float(env.data.root_lin_vel_b[:, 0].mean().item()), device=env.device)
+
+
+_STEP_CACHE = {}
+
+
+def _joint_speed(env):
+    # refreshed once per step, as the contact features of the locomotion rewards
+    if _STEP_CACHE.get("step") != env.common_step_counter:
+        _STEP_CACHE["step"] = env.common_step_counter
+        _STEP_CACHE["speed"] = env.data.joint_vel.abs()
+    return _STEP_CACHE["speed"]
+
+
+def joint_speed_l1(env):
+    return torch.sum(_joint_speed(env), dim=1)
+
+
+def joint_speed_max(env):
+    return torch.amax(_joint_speed(env), dim=1)
+
+
+class SmoothedJointVel(ManagerTermBase):
+    """Keeps a running average of the joint velocities."""
+
+    def __init__(self, cfg, env):
+        super().__init__(cfg, env)
+        self.average = torch.zeros_like(env.data.joint_vel)
+
+    def __call__(self, env):
+        self.average.mul_(0.9).add_(0.1 * env.data.joint_vel)
+        return torch.sum(torch.square(self.average), dim=1)
+
+
+TERMS = {
+    "track_lin_vel_xy": (track_lin_vel_xy_exp, 1.0, {"std": 0.5}),
+    "track_ang_vel_z": (track_ang_vel_z_exp, 0.5, {"std": 0.5}),
+    "lin_vel_z": (lin_vel_z_l2, -2.0, {}),
+    "ang_vel_xy": (ang_vel_xy_l2, -0.05, {}),
+    "joint_torques": (joint_torques_l2, -1e-5, {}),
+    "joint_acc": (joint_acc_l2, -2.5e-7, {}),
+    "action_rate": (action_rate_l2, -0.01, {}),
+    "joint_pos_limits": (joint_pos_limits, -5.0, {}),
+    "energy": (energy, -2e-5, {}),
+    "flat_orientation": (flat_orientation_l2, -1.0, {}),
+    "base_height": (base_height_l2, -10.0, {"target_height": 0.78}),
+    "alive": (is_alive, 0.15, {}),
+    "undesired": (joint_acc_l2, 0.0, {}),
+    "mean_speed": (mean_speed_bonus, 0.1, {}),
+    "joint_speed": (joint_speed_l1, -1e-3, {}),
+    "joint_speed_max": (joint_speed_max, -1e-3, {}),
+    "smoothed_joint_vel": (SmoothedJointVel, -0.001, {}),
+}
+
+
+def make_env():
+    n, j, device = args.num_envs, args.num_joints, args.device
+    limits = torch.tensor([-1.0, 1.0], device=device).expand(n, j, 2).clone()
+    data = SimpleNamespace(
+        root_lin_vel_b=torch.zeros(n, 3, device=device),
+        root_ang_vel_b=torch.zeros(n, 3, device=device),
+        root_pos_w=torch.zeros(n, 3, device=device),
+        projected_gravity_b=torch.zeros(n, 3, device=device),
+        joint_pos=torch.zeros(n, j, device=device),
+        joint_vel=torch.zeros(n, j, device=device),
+        joint_acc=torch.zeros(n, j, device=device),
+        applied_torque=torch.zeros(n, j, device=device),
+        soft_joint_pos_limits=limits,
+    )
+    return SimpleNamespace(
+        num_envs=n,
+        device=device,
+        common_step_counter=0,
+        data=data,
+        command=torch.zeros(n, 3, device=device),
+        action=torch.zeros(n, j, device=device),
+        prev_action=torch.zeros(n, j, device=device),
+        terminated=torch.zeros(n, dtype=torch.bool, device=device),
+    )
+
+
+def make_manager(env):
+    """A reward manager with the terms of :data:`TERMS`, without the configuration parsing of Isaac Lab."""
+    manager = object.__new__(RewardManager)
+    manager._env, manager.device, manager.num_envs = env, env.device, env.num_envs
+    manager._term_names, manager._term_cfgs = [], []
+    for name, (func, weight, params) in TERMS.items():
+        term_cfg = SimpleNamespace(func=func, weight=weight, params=params)
+        if isinstance(func, type):
+            term_cfg.func = func(term_cfg, env)
+        manager._term_names.append(name)
+        manager._term_cfgs.append(term_cfg)
+    manager._episode_sums = {name: torch.zeros(env.num_envs, device=env.device) for name in manager._term_names}
+    manager._reward_buf = torch.zeros(env.num_envs, device=env.device)
+    manager._step_reward = torch.zeros(env.num_envs, len(manager._term_names), device=env.device)
+    return manager
+
+
+def step(env, generator):
+    # in place, as the simulation updates the buffers
+    for value in (env.command, env.action, env.prev_action, *vars(env.data).values()):
+        if value is not env.data.soft_joint_pos_limits:
+            value.copy_(torch.randn(value.shape, generator=generator).to(env.device))
+    env.data.root_pos_w[:, 2] += 0.78
+    env.terminated.copy_((torch.rand(env.num_envs, generator=generator) < 0.01).to(env.device))
+    env.common_step_counter += 1
+
+
+def reset(manager, env_ids):
+    # as RewardManager.reset, which zeroes the episodic sums in place
+    for name in manager._episode_sums:
+        manager._episode_sums[name][env_ids] = 0.0
+
+
+def measure(compute, env) -> float:
+    cuda = args.device.startswith("cuda")
+    generator = torch.Generator().manual_seed(1)
+    elapsed = 0.0
+    for i in range(args.iterations + 10):
+        step(env, generator)
+        if cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        compute(0.02)
+        if cuda:
+            torch.cuda.synchronize()
+        if i >= 10:
+            elapsed += time.perf_counter() - start
+    return elapsed / args.iterations * 1e3
+
+
+def main():
+    env = make_env()
+    eager_manager, fused_manager = make_manager(env), make_manager(env)
+    evaluator = FusedRewardEvaluator(
+        fused_manager,
+        backend=args.backend,
+        eager_terms=["joint_speed_max"],
+        validation_steps=3,
+        validation_interval=10,
+    )
+
+    if args.check:
+        generator = torch.Generator().manual_seed(0)
+        for i in range(30):
+            step(env, generator)
+            if i == 15:
+                # a curriculum enables a term during training
+                for manager in (eager_manager, fused_manager):
+                    manager._term_cfgs[manager._term_names.index("undesired")].weight = -1e-7
+            expected = RewardManager.compute(eager_manager, 0.02).clone()
+            actual = evaluator.compute(0.02)
+            torch.testing.assert_close(actual, expected, msg=f"reward at step {i}")
+            torch.testing.assert_close(fused_manager._step_reward, eager_manager._step_reward, msg=f"step {i}")
+            for name in eager_manager._term_names:
+                torch.testing.assert_close(
+                    fused_manager._episode_sums[name], eager_manager._episode_sums[name], msg=f"{name} at step {i}"
+                )
+            env_ids = torch.nonzero(env.terminated).squeeze(-1)
+            reset(eager_manager, env_ids)
+            reset(fused_manager, env_ids)
+        for name in ("mean_speed", "smoothed_joint_vel", "joint_speed", "joint_speed_max"):
+            assert name not in evaluator._fused_names, name
+        if args.backend == "compile":
+            assert len(evaluator._fused_names) > 0
+        print("[INFO] The fused evaluator matches the reward manager.")
+
+    eager_ms = measure(lambda dt: RewardManager.compute(eager_manager, dt), env)
+    fused_ms = measure(evaluator.compute, env)
+    print(evaluator.format_report())
+    print(f"[INFO] {args.num_envs} envs, {len(TERMS)} terms, {args.backend} backend on {args.device}")
+    print(f"  reward manager        {eager_ms:8.3f} ms")
+    print(f"  fused evaluator       {fused_ms:8.3f} ms  ({eager_ms / fused_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Size, decode time and error of the compact motion archives of :mod:`unitree_rl_lab.motion.compact`.
+
+Writes one clip as a regular archive (``np.savez``, as the conversion scripts do), a deflated regular archive and
+compact archives, and reports the file size, the time to decode every array and the largest errors. Without
+``--motion_file`` a synthetic clip of the M3 is generated with forward kinematics.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/motion_compact.py --check
+    python scripts/benchmarks/motion_compact.py --motion_file path_to/motion.npz
+"""
+
+import argparse
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+
+from unitree_rl_lab.motion import (
+    MOTION_ROBOTS,
+    MotionStore,
+    UrdfKinematics,
+    open_motion_archive,
+    save_compact_motion,
+)
+from unitree_rl_lab.motion.compact import zstandard
+
+parser = argparse.ArgumentParser(description="Compare regular and compact motion archives.")
+parser.add_argument("--motion_file", type=str, help="A motion npz. Defaults to a synthetic clip.")
+parser.add_argument("--num_frames", type=int, default=3000, help="Frames of the synthetic clip.")
+parser.add_argument("--repeats", type=int, default=5)
+parser.add_argument("--check", action="store_true", help="Only assert the round trip on a short synthetic clip.")
+args = parser.parse_args()
+
+
+def synthetic_clip(num_frames: int, fps: int = 50) -> dict[str, np.ndarray]:
+    robot = MOTION_ROBOTS["m3"]
+    kinematics = UrdfKinematics(robot.urdf_path)
+    t = torch.arange(num_frames, dtype=torch.float32)[:, None] / fps
+    phase = torch.arange(kinematics.num_joints) * 0.7
+    joint_pos = 0.4 * torch.sin(2.0 * t + phase)
+    joint_vel = 0.8 * torch.cos(2.0 * t + phase)
+    yaw = 0.3 * t[:, 0]
+    root_pos = torch.stack([0.5 * t[:, 0], 0.1 * torch.sin(t[:, 0]), 0.8 + 0.02 * torch.sin(4 * t[:, 0])], dim=-1)
+    root_quat = torch.stack([torch.cos(yaw / 2), 0 * yaw, 0 * yaw, torch.sin(yaw / 2)], dim=-1)
+    root_lin_vel = torch.stack([0.5 + 0 * yaw, 0.1 * torch.cos(t[:, 0]), 0.08 * torch.cos(4 * t[:, 0])], dim=-1)
+    root_ang_vel = torch.stack([0 * yaw, 0 * yaw, 0.3 + 0 * yaw], dim=-1)
+    bodies = kinematics.forward(root_pos, root_quat, joint_pos, root_lin_vel, root_ang_vel, joint_vel)
+    return {
+        "fps": np.array([fps]),
+        "joint_pos": joint_pos.numpy(),
+        "joint_vel": joint_vel.numpy(),
+        **{name: value.numpy() for name, value in bodies.items()},
+    }
+
+
+def decode(path: str) -> dict[str, np.ndarray]:
+    with open_motion_archive(path) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def errors(reference: dict[str, np.ndarray], decoded: dict[str, np.ndarray]) -> dict[str, float]:
+    # arccos of the dot product is only accurate to about 1e-3 rad close to 1, atan2 of the chords is exact
+    q0 = reference["body_quat_w"].astype(np.float64)
+    q1 = decoded["body_quat_w"] * np.sign(np.sum(q0 * decoded["body_quat_w"], axis=-1, keepdims=True))
+    angle = 4 * np.arctan2(np.linalg.norm(q0 - q1, axis=-1), np.linalg.norm(q0 + q1, axis=-1))
+    result = {"quat (rad)": float(np.max(angle))}
+    for name in ("body_pos_w", "joint_vel", "body_lin_vel_w", "body_ang_vel_w"):
+        result[name] = float(np.max(np.abs(reference[name] - decoded[name])))
+    return result
+
+
+def main():
+    reference = (
+        synthetic_clip(200 if args.check else args.num_frames) if args.motion_file is None else decode(args.motion_file)
+    )
+    variants = {
+        "np.savez": lambda path: np.savez(path, **reference),
+        "np.savez_compressed": lambda path: np.savez_compressed(path, **reference),
+        "compact deflate": lambda path: save_compact_motion(path, reference),
+    }
+    if zstandard is not None:
+        variants["compact zstd"] = lambda path: save_compact_motion(path, reference, compression="zstd")
+    else:
+        print("[INFO] zstandard is not installed, skipping zstd compression.")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, save in variants.items():
+            path = os.path.join(tmp_dir, name.replace(" ", "_") + ".npz")
+            save(path)
+            decoded = decode(path)
+            assert sorted(decoded) == sorted(reference), f"{name}: {sorted(decoded)}"
+            error = errors(reference, decoded)
+            if name.startswith("compact"):
+                assert error["quat (rad)"] < 1e-4, f"{name}: {error}"
+                np.testing.assert_array_equal(decoded["body_pos_w"], reference["body_pos_w"].astype(np.float32))
+                for key in ("joint_vel", "body_lin_vel_w", "body_ang_vel_w"):
+                    # float16 keeps 11 significant bits
+                    np.testing.assert_allclose(decoded[key], reference[key], rtol=1e-3, atol=1e-4, err_msg=name)
+                # the store decodes compact archives both directly and into its memory-mapped cache
+                for use_cache in (False, True):
+                    store = MotionStore(path, use_cache=use_cache)
+                    np.testing.assert_allclose(store.read("body_quat_w"), decoded["body_quat_w"], atol=0)
+            if args.check:
+                continue
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                decode(path)
+                times.append(time.perf_counter() - start)
+            rows.append((name, os.path.getsize(path), 1000 * min(times), error))
+    print("[INFO] All archives decode to the reference within tolerance.")
+    if args.check:
+        return
+
+    num_frames, num_bodies = reference["body_pos_w"].shape[:2]
+    print(f"[INFO] {num_frames} frames, {num_bodies} bodies, decode time is the best of {args.repeats}")
+    print(f"  {'format':<20} {'size':>10} {'ratio':>6} {'decode':>10}  max errors")
+    for name, size, decode_ms, error in rows:
+        error_text = ", ".join(f"{key} {value:.1e}" for key, value in error.items())
+        print(f"  {name:<20} {size / 2**20:7.2f} MB {rows[0][1] / size:5.1f}x {decode_ms:7.1f} ms  {error_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Equivalence check and CPU benchmark of :mod:`unitree_rl_lab.motion.ops`.
+
+Compares the per-column loops the conversion scripts used before (a column copy loop for joint reordering,
+:func:`numpy.interp` and ``scipy.interpolate.interp1d`` per column for resampling) with the single-gather
+:class:`~unitree_rl_lab.motion.ops.ColumnPermutation` and the whole-matrix
+:func:`~unitree_rl_lab.motion.ops.resample_frames`.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/motion_ops.py --check
+    python scripts/benchmarks/motion_ops.py --num_frames 200000 --num_joints 29
+"""
+
+import argparse
+import numpy as np
+import time
+
+from unitree_rl_lab.motion.ops import ColumnPermutation, resample_frames
+
+parser = argparse.ArgumentParser(description="Check and benchmark the motion array operations.")
+parser.add_argument("--num_frames", type=int, default=100_000)
+parser.add_argument("--num_joints", type=int, default=29)
+parser.add_argument("--repeats", type=int, default=5)
+parser.add_argument("--check", action="store_true", help="Only assert that the loops and the ops agree.")
+args = parser.parse_args()
+
+
+def reorder_loop(data: np.ndarray, mapping: list[int], num_targets: int) -> np.ndarray:
+    # previous npz_to_csv.reorder_joints_from_isaac_to_csv
+    out = np.zeros((data.shape[0], num_targets))
+    for i, target_index in enumerate(mapping):
+        if target_index != -1 and i < data.shape[1]:
+            out[:, target_index] = data[:, i]
+    return out
+
+
+def resample_loop(data: np.ndarray, num_frames: int) -> np.ndarray:
+    # previous npz_to_csv resampling
+    times = np.linspace(0, data.shape[0] - 1, num_frames)
+    out = np.zeros((num_frames, data.shape[1]))
+    for i in range(data.shape[1]):
+        out[:, i] = np.interp(times, np.arange(data.shape[0]), data[:, i])
+    return out
+
+
+def resample_interp1d(data: np.ndarray, num_frames: int) -> np.ndarray:
+    # previous pkl_to_npz resampling
+    from scipy import interpolate
+
+    out = np.zeros((num_frames, data.shape[1]))
+    for i in range(data.shape[1]):
+        f = interpolate.interp1d(np.linspace(0, 1, data.shape[0]), data[:, i], kind="linear", fill_value="extrapolate")
+        out[:, i] = f(np.linspace(0, 1, num_frames))
+    return out
+
+
+def timeit(fn) -> float:
+    """Returns the best wall time of ``fn`` in milliseconds."""
+    times = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * min(times)
+
+
+def main():
+    num_frames = 1_000 if args.check else args.num_frames
+    rng = np.random.default_rng(0)
+    source_names = [f"joint_{i}" for i in range(args.num_joints)]
+    # a shuffled target order with one joint the source does not have
+    target_names = [source_names[i] for i in rng.permutation(args.num_joints)[:-1]] + ["extra_joint"]
+    data = rng.standard_normal((num_frames, args.num_joints))
+    num_resampled = int(num_frames * 50 / 120)
+
+    permutation = ColumnPermutation(source_names, target_names)
+    mapping = [target_names.index(name) if name in target_names else -1 for name in source_names]
+    np.testing.assert_array_equal(permutation(data), reorder_loop(data, mapping, len(target_names)))
+    np.testing.assert_allclose(
+        resample_frames(data, num_resampled), resample_loop(data, num_resampled), rtol=0, atol=1e-9
+    )
+    try:
+        np.testing.assert_allclose(
+            resample_frames(data, num_resampled), resample_interp1d(data, num_resampled), rtol=0, atol=1e-9
+        )
+    except ImportError:
+        print("[INFO] scipy is not installed, skipping the interp1d comparison.")
+    print("[INFO] The loops and the ops agree.")
+    if args.check:
+        return
+
+    print(f"[INFO] {num_frames} frames x {args.num_joints} joints, best of {args.repeats}")
+    rows = [
+        ("reorder loop", lambda: reorder_loop(data, mapping, len(target_names))),
+        ("ColumnPermutation", lambda: permutation(data)),
+        ("np.interp per column", lambda: resample_loop(data, num_resampled)),
+        ("resample_frames", lambda: resample_frames(data, num_resampled)),
+    ]
+    for name, fn in rows:
+        print(f"  {name:<22} {timeit(fn):10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
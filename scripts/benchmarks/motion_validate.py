@@ -0,0 +1,138 @@
+"""Detection check and benchmark of :func:`unitree_rl_lab.motion.validate_motions`.
+
+Writes a library of synthetic M3 clips generated with forward kinematics, injects one fault into some of them (NaN
+values, a denormalized orientation, a joint beyond its limit, a pose jump, a body below the ground, another frame
+rate, a missing array, a retargeted ``.pkl`` clip beyond its joint limits) and checks that exactly these clips are
+reported, with the right checks and frames. It then reports the validation throughput.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/motion_validate.py --check
+    python scripts/benchmarks/motion_validate.py --num_clips 500 --device cuda
+"""
+
+import argparse
+import numpy as np
+import os
+import pickle
+import tempfile
+import time
+import torch
+
+from unitree_rl_lab.motion import (
+    MOTION_ROBOTS,
+    ColumnPermutation,
+    UrdfKinematics,
+    soft_joint_limits,
+    validate_motions,
+)
+
+parser = argparse.ArgumentParser(description="Check and benchmark the motion validator.")
+parser.add_argument("--num_clips", type=int, default=200)
+parser.add_argument("--num_frames", type=int, default=1500, help="Frames of every clip.")
+parser.add_argument("--device", type=str, default="cpu")
+parser.add_argument("--check", action="store_true", help="Only assert the detection on a few short clips.")
+args = parser.parse_args()
+
+
+def clip(kinematics: UrdfKinematics, joint_limits: torch.Tensor, num_frames: int, seed: int, fps: int = 50):
+    generator = torch.Generator().manual_seed(seed)
+    phase = 6.0 * torch.rand(kinematics.num_joints, generator=generator)
+    t = torch.arange(num_frames, dtype=torch.float32)[:, None] / fps
+    # within the soft limits
+    center, half_range = joint_limits.mean(dim=-1), 0.4 * (joint_limits[:, 1] - joint_limits[:, 0])
+    joint_pos = center + half_range * torch.sin(1.5 * t + phase)
+    joint_vel = 1.5 * half_range * torch.cos(1.5 * t + phase)
+    yaw = 0.5 * t[:, 0]
+    root_pos = torch.stack([0.5 * t[:, 0], 0 * yaw, 0.8 + 0.02 * torch.sin(4 * t[:, 0])], dim=-1)
+    root_quat = torch.stack([torch.cos(yaw / 2), 0 * yaw, 0 * yaw, torch.sin(yaw / 2)], dim=-1)
+    root_lin_vel = torch.stack([0.5 + 0 * yaw, 0 * yaw, 0.08 * torch.cos(4 * t[:, 0])], dim=-1)
+    root_ang_vel = torch.stack([0 * yaw, 0 * yaw, 0.5 + 0 * yaw], dim=-1)
+    bodies = kinematics.forward(root_pos, root_quat, joint_pos, root_lin_vel, root_ang_vel, joint_vel)
+    arrays = {"fps": np.array([fps]), "joint_pos": joint_pos.numpy(), "joint_vel": joint_vel.numpy()}
+    return arrays | {name: value.numpy() for name, value in bodies.items()}
+
+
+def main():
+    robot = MOTION_ROBOTS["m3"]
+    kinematics = UrdfKinematics(robot.urdf_path)
+    joint_limits = soft_joint_limits(kinematics.joint_limits, robot.soft_joint_pos_limit_factor)
+    num_clips = 12 if args.check else args.num_clips
+    num_frames = 200 if args.check else args.num_frames
+    frame = num_frames // 2
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files, expected = [], {}
+        for i in range(num_clips):
+            arrays = clip(kinematics, joint_limits, num_frames, i, fps=30 if i == 5 else 50)
+            if i == 0:
+                arrays["body_pos_w"][frame, 3, 1] = np.nan
+                expected[i] = {"non_finite": frame}
+            elif i == 1:
+                arrays["body_quat_w"][frame, 2] *= 1.01
+                expected[i] = {"quat_norm": frame}
+            elif i == 2:
+                arrays["joint_pos"][frame:, 4] = joint_limits[4, 1] + 0.1
+                expected[i] = {"joint_limits": frame, "velocity_spike": frame - 1}
+            elif i == 3:
+                arrays["body_pos_w"][frame:, :, 0] += 0.5
+                expected[i] = {"velocity_spike": frame - 1}
+            elif i == 4:
+                arrays["body_pos_w"][frame:, :, 2] -= 1.0
+                expected[i] = {"ground_penetration": frame, "velocity_spike": frame - 1}
+            elif i == 5:
+                expected[i] = {"fps": None}
+            elif i == 6:
+                del arrays["body_quat_w"]
+                expected[i] = {"structure": None}
+            path = os.path.join(tmp_dir, f"clip_{i}.npz")
+            np.savez(path, **arrays)
+            files.append(path)
+
+        # a retargeted clip in SDK joint order, whose last joint leaves its limits
+        sdk_order = ColumnPermutation(kinematics.joint_names, robot.joint_names)
+        arrays = clip(kinematics, joint_limits, num_frames, num_clips)
+        dof_pos = sdk_order(arrays["joint_pos"])
+        joint = kinematics.joint_names.index(robot.joint_names[-1])
+        dof_pos[frame, -1] = joint_limits[joint, 0] - 0.2
+        root_rot = arrays["body_quat_w"][:, 0, [1, 2, 3, 0]]
+        path = os.path.join(tmp_dir, "retargeted.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(
+                {"fps": 50, "root_pos": arrays["body_pos_w"][:, 0], "root_rot": root_rot, "dof_pos": dof_pos}, f
+            )
+        files.append(path)
+        expected[num_clips] = {"joint_limits": frame, "velocity_spike": frame - 1}
+
+        report = validate_motions(
+            files,
+            joint_limits=joint_limits,
+            joint_names=kinematics.joint_names,
+            joint_permutation=ColumnPermutation(robot.joint_names, kinematics.joint_names),
+            device=args.device,
+        )
+        for i, clip_report in enumerate(report["clips"]):
+            issues = clip_report["issues"]
+            assert sorted(issues) == sorted(expected.get(i, {})), f"{clip_report['file']}: {issues}"
+            for name, first_frame in expected.get(i, {}).items():
+                if first_frame is not None:
+                    assert issues[name]["first_frame"] == first_frame, f"{clip_report['file']}: {issues}"
+        assert report["clips"][2]["issues"]["joint_limits"]["joints"] == [kinematics.joint_names[4]]
+        assert report["clips"][num_clips]["issues"]["joint_limits"]["joints"] == [robot.joint_names[-1]]
+        print(f"[INFO] The {len(expected)} faulty clips of {len(files)} are reported with the right checks and frames.")
+        if args.check:
+            return
+
+        for _ in range(2):
+            start = time.perf_counter()
+            report = validate_motions(files, joint_limits=joint_limits, device=args.device)
+            elapsed = time.perf_counter() - start
+        summary = report["summary"]
+        print(
+            f"[INFO] {summary['num_clips']} clips, {summary['num_frames']} frames ({summary['duration'] / 60:.1f} min)"
+            f" validated in {elapsed:.2f} s on {args.device}, {60 * summary['num_clips'] / elapsed:.0f} clips/min"
+        )
+
+
+if __name__ == "__main__":
+    main()
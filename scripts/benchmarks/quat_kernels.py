@@ -0,0 +1,151 @@
+"""Equivalence check and CPU benchmark of :mod:`unitree_rl_lab.utils.quat_kernels` against :mod:`isaaclab.utils.math`.
+
+Every case evaluates a quantity of the mimic MDP the way the terms computed it with the Isaac Lab functions and with
+the kernels, on random unit quaternions of shape (N, B, 4).
+
+.. code-block:: bash
+
+    python scripts/benchmarks/quat_kernels.py --check
+    python scripts/benchmarks/quat_kernels.py --num_envs 4096 --num_bodies 14 --device cuda
+"""
+
+import argparse
+import time
+import torch
+
+import isaaclab.utils.math as math_utils
+
+from unitree_rl_lab.utils import quat_kernels
+
+parser = argparse.ArgumentParser(description="Check and benchmark the quaternion kernels.")
+parser.add_argument("--num_envs", type=int, default=4096)
+parser.add_argument("--num_bodies", type=int, default=14)
+parser.add_argument("--device", type=str, default="cpu")
+parser.add_argument("--iterations", type=int, default=50)
+parser.add_argument("--check", action="store_true", help="Only assert that the kernels agree with Isaac Lab.")
+args = parser.parse_args()
+
+
+def random_quat(*shape: int) -> torch.Tensor:
+    q = torch.randn(*shape, 4, device=args.device)
+    return q / q.norm(dim=-1, keepdim=True)
+
+
+def isaaclab_body_pose_b(anchor_pos, anchor_quat, body_pos, body_quat):
+    # robot_body_pos_b and robot_body_ori_b each called subtract_frame_transforms on repeated anchors
+    num_bodies = body_pos.shape[1]
+    pos_b, _ = math_utils.subtract_frame_transforms(
+        anchor_pos[:, None, :].repeat(1, num_bodies, 1),
+        anchor_quat[:, None, :].repeat(1, num_bodies, 1),
+        body_pos,
+        body_quat,
+    )
+    _, ori_b = math_utils.subtract_frame_transforms(
+        anchor_pos[:, None, :].repeat(1, num_bodies, 1),
+        anchor_quat[:, None, :].repeat(1, num_bodies, 1),
+        body_pos,
+        body_quat,
+    )
+    mat = math_utils.matrix_from_quat(ori_b)
+    return pos_b.view(pos_b.shape[0], -1), mat[..., :2].reshape(mat.shape[0], -1)
+
+
+def kernel_body_pose_b(anchor_pos, anchor_quat, body_pos, body_quat):
+    pos_b, quat_b = quat_kernels.subtract_frame_transforms(
+        anchor_pos[:, None, :], anchor_quat[:, None, :], body_pos, body_quat
+    )
+    return pos_b.reshape(pos_b.shape[0], -1), quat_kernels.matrix_6d_from_quat(quat_b).view(pos_b.shape[0], -1)
+
+
+def isaaclab_relative_body_pose(anchor_pos, anchor_quat, target_pos, target_quat, body_pos, body_quat):
+    num_bodies = body_pos.shape[1]
+    anchor_pos_repeat = anchor_pos[:, None, :].repeat(1, num_bodies, 1)
+    anchor_quat_repeat = anchor_quat[:, None, :].repeat(1, num_bodies, 1)
+    delta_pos = target_pos[:, None, :].repeat(1, num_bodies, 1)
+    delta_pos[..., 2] = anchor_pos_repeat[..., 2]
+    target_quat_repeat = target_quat[:, None, :].repeat(1, num_bodies, 1)
+    delta_ori = math_utils.yaw_quat(math_utils.quat_mul(target_quat_repeat, math_utils.quat_inv(anchor_quat_repeat)))
+    return delta_pos + math_utils.quat_apply(delta_ori, body_pos - anchor_pos_repeat), math_utils.quat_mul(
+        delta_ori, body_quat
+    )
+
+
+def make_cases():
+    n, b = args.num_envs, args.num_bodies
+    anchor_pos, anchor_quat = torch.randn(n, 3, device=args.device), random_quat(n)
+    target_pos, target_quat = torch.randn(n, 3, device=args.device), random_quat(n)
+    body_pos, body_quat = torch.randn(n, b, 3, device=args.device), random_quat(n, b)
+    other_quat = random_quat(n, b)
+    gravity = torch.tensor([0.0, 0.0, -1.0], device=args.device).repeat(n, 1)
+    out_pos, out_quat = torch.zeros(n, b, 3, device=args.device), torch.zeros(n, b, 4, device=args.device)
+
+    # name: (isaaclab path, kernel path)
+    return {
+        "quat_error_magnitude (N*B)": (
+            lambda: math_utils.quat_error_magnitude(body_quat.view(-1, 4), other_quat.view(-1, 4)).view(n, b),
+            lambda: quat_kernels.quat_error_magnitude(body_quat, other_quat),
+        ),
+        "rotation 6D (N)": (
+            lambda: math_utils.matrix_from_quat(anchor_quat)[..., :2].reshape(n, -1),
+            lambda: quat_kernels.matrix_6d_from_quat(anchor_quat),
+        ),
+        "projected gravity (N)": (
+            lambda: math_utils.quat_apply_inverse(anchor_quat, gravity),
+            lambda: quat_kernels.quat_apply_inverse(anchor_quat, gravity),
+        ),
+        "anchor pose in anchor (N)": (
+            lambda: math_utils.subtract_frame_transforms(anchor_pos, anchor_quat, target_pos, target_quat),
+            lambda: quat_kernels.subtract_frame_transforms(anchor_pos, anchor_quat, target_pos, target_quat),
+        ),
+        "body pose in anchor, 6D (N*B)": (
+            lambda: isaaclab_body_pose_b(anchor_pos, anchor_quat, body_pos, body_quat),
+            lambda: kernel_body_pose_b(anchor_pos, anchor_quat, body_pos, body_quat),
+        ),
+        "relative body pose (N*B)": (
+            lambda: isaaclab_relative_body_pose(anchor_pos, anchor_quat, target_pos, target_quat, body_pos, body_quat),
+            lambda: quat_kernels.relative_body_pose_(
+                anchor_pos, anchor_quat, target_pos, target_quat, body_pos, body_quat, out_pos, out_quat
+            ),
+        ),
+    }
+
+
+def measure(fn) -> float:
+    """Returns the mean wall time of ``fn`` in milliseconds."""
+    for _ in range(5):
+        fn()
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        fn()
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / args.iterations * 1e3
+
+
+def main():
+    torch.manual_seed(0)
+    cases = make_cases()
+    for name, (reference, kernel) in cases.items():
+        expected, actual = reference(), kernel()
+        if not isinstance(expected, tuple):
+            expected, actual = (expected,), (actual,)
+        for e, a in zip(expected, actual):
+            # quaternions are only defined up to sign
+            if e.shape[-1] == 4:
+                a = a * torch.sign((a * e).sum(dim=-1, keepdim=True))
+            torch.testing.assert_close(a, e, atol=1e-4, rtol=1e-4, msg=lambda m: f"{name}: {m}")
+    print(f"[INFO] All {len(cases)} kernels agree with isaaclab.utils.math.")
+    if args.check:
+        return
+
+    print(f"[INFO] {args.num_envs} envs x {args.num_bodies} bodies on {args.device}, {args.iterations} iterations")
+    print(f"  {'case':<32} {'isaaclab':>10} {'kernels':>10} {'speedup':>8}")
+    for name, (reference, kernel) in cases.items():
+        t_ref, t_kernel = measure(reference), measure(kernel)
+        print(f"  {name:<32} {t_ref:8.3f}ms {t_kernel:8.3f}ms {t_ref / t_kernel:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark of the relative body pose update of the mimic ``MotionCommand``.
+
+Compares the previous implementation, which repeats the anchors for every body and allocates new output tensors,
+with :func:`unitree_rl_lab.utils.quat_kernels.relative_body_pose_`, which writes into persistent buffers.
+
+.. code-block:: bash
+
+    python scripts/benchmarks/relative_body_pose.py --num_envs 4096 --num_bodies 30 --device cuda --check
+"""
+
+import argparse
+import time
+import torch
+
+from isaaclab.utils.math import quat_apply, quat_inv, quat_mul, random_orientation, yaw_quat
+
+from unitree_rl_lab.utils.quat_kernels import relative_body_pose_
+
+parser = argparse.ArgumentParser(description="Benchmark the relative body pose update of the motion command.")
+parser.add_argument("--num_envs", type=int, default=4096)
+parser.add_argument("--num_bodies", type=int, default=30)
+parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--iterations", type=int, default=200)
+parser.add_argument("--check", action="store_true", help="Assert that both implementations agree.")
+args = parser.parse_args()
+
+
+def repeat_path(anchor_pos_w, anchor_quat_w, robot_anchor_pos_w, robot_anchor_quat_w, body_pos_w, body_quat_w):
+    num_bodies = body_pos_w.shape[1]
+    anchor_pos_w_repeat = anchor_pos_w[:, None, :].repeat(1, num_bodies, 1)
+    anchor_quat_w_repeat = anchor_quat_w[:, None, :].repeat(1, num_bodies, 1)
+    robot_anchor_pos_w_repeat = robot_anchor_pos_w[:, None, :].repeat(1, num_bodies, 1)
+    robot_anchor_quat_w_repeat = robot_anchor_quat_w[:, None, :].repeat(1, num_bodies, 1)
+
+    delta_pos_w = robot_anchor_pos_w_repeat
+    delta_pos_w[..., 2] = anchor_pos_w_repeat[..., 2]
+    delta_ori_w = yaw_quat(quat_mul(robot_anchor_quat_w_repeat, quat_inv(anchor_quat_w_repeat)))
+
+    body_quat_relative_w = quat_mul(delta_ori_w, body_quat_w)
+    body_pos_relative_w = delta_pos_w + quat_apply(delta_ori_w, body_pos_w - anchor_pos_w_repeat)
+    return body_pos_relative_w, body_quat_relative_w
+
+
+def measure(fn, iterations: int) -> tuple[float, float]:
+    """Returns the mean wall time of ``fn`` in milliseconds and its peak temporary CUDA memory in MB."""
+    cuda = args.device.startswith("cuda")
+    for _ in range(10):
+        fn()
+    if cuda:
+        torch.cuda.synchronize()
+        baseline = torch.cuda.memory_allocated()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    if cuda:
+        torch.cuda.synchronize()
+    elapsed = (time.perf_counter() - start) / iterations * 1e3
+    peak = (torch.cuda.max_memory_allocated() - baseline) / 2**20 if cuda else float("nan")
+    return elapsed, peak
+
+
+def main():
+    n, b, device = args.num_envs, args.num_bodies, args.device
+    inputs = (
+        torch.randn(n, 3, device=device),
+        random_orientation(n, device=device),
+        torch.randn(n, 3, device=device),
+        random_orientation(n, device=device),
+        torch.randn(n, b, 3, device=device),
+        random_orientation(n * b, device=device).view(n, b, 4),
+    )
+    out_pos = torch.zeros(n, b, 3, device=device)
+    out_quat = torch.zeros(n, b, 4, device=device)
+
+    if args.check:
+        ref_pos, ref_quat = repeat_path(*inputs)
+        relative_body_pose_(*inputs, out_pos=out_pos, out_quat=out_quat)
+        torch.testing.assert_close(out_pos, ref_pos, atol=1e-4, rtol=1e-4)
+        torch.testing.assert_close(out_quat, ref_quat, atol=1e-4, rtol=1e-4)
+        print("[INFO] Both implementations agree.")
+
+    print(f"[INFO] {n} envs x {b} bodies on {device}, {args.iterations} iterations")
+    for name, fn in [
+        ("repeat (previous)", lambda: repeat_path(*inputs)),
+        ("broadcast, in place", lambda: relative_body_pose_(*inputs, out_pos=out_pos, out_quat=out_quat)),
+    ]:
+        elapsed, peak = measure(fn, args.iterations)
+        memory = "" if peak != peak else f"  {peak:8.2f} MB temporary"
+        print(f"  {name:<22} {elapsed:8.3f} ms{memory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,33 @@
 """This script replay a motion from a csv file and output it to a npz file
 
+Many clips can be converted with a single launch of the simulator: pass a directory of csv files or a manifest (a
+text file with one csv path per line, relative to the manifest) and every clip is replayed in its own environment.
+
 .. code-block:: bash
 
     # Usage
     python csv_to_npz.py -f path_to_input.csv --input_fps 60
+    python csv_to_npz.py -f path_to_csv_dir_or_manifest --input_fps 60 --output_dir path_to_npz_dir --num_envs 64
 """
 
 """Launch Isaac Sim Simulator first."""
 
 import argparse
+import glob
+import os
 import numpy as np
 
 from isaaclab.app import AppLauncher
 
 # add argparse arguments
 parser = argparse.ArgumentParser(description="Replay motion from csv file and output to npz file.")
-parser.add_argument("--input_file", "-f", type=str, required=True, help="The path to the input motion csv file.")
+parser.add_argument(
+    "--input_file",
+    "-f",
+    type=str,
+    required=True,
+    help="The path to the input motion csv file, a directory of csv files or a manifest listing csv files.",
+)
 parser.add_argument("--input_fps", type=int, default=50, help="The fps of the input motion.")
 parser.add_argument(
     "--frame_range",
@@ -27,19 +39,45 @@ parser.add_argument(
         " loaded."
     ),
 )
-parser.add_argument("--output_name", type=str, help="The name of the motion npz file.")
+parser.add_argument("--output_name", type=str, help="The name of the motion npz file (single input file only).")
+parser.add_argument("--output_dir", type=str, help="Directory of the npz files. Defaults to next to the csv files.")
 parser.add_argument("--output_fps", type=int, default=50, help="The fps of the output motion.")
 parser.add_argument("--robot", type=str, required=True, choices=["g1", "m3"], help="Robot type: G1 or M3")
+parser.add_argument("--num_envs", type=int, default=64, help="The maximum number of clips replayed in parallel.")
+parser.add_argument(
+    "--poses_only", action="store_true", help="Do not store velocities, the motion loader derives them on load."
+)
 
 # append AppLauncher cli args
 AppLauncher.add_app_launcher_args(parser)
 # parse the arguments
 args_cli = parser.parse_args()
-if not args_cli.output_name:
+
+
+def collect_inputs(path: str) -> list[str]:
+    """Lists the csv files of a csv file, a directory or a manifest."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True))
+    if path.endswith(".csv"):
+        return [path]
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(os.path.dirname(path), line) for line in lines if line and not line.startswith("#")]
+
+
+input_files = collect_inputs(args_cli.input_file)
+if not input_files:
+    raise ValueError(f"No csv files found in {args_cli.input_file}.")
+if args_cli.output_name and len(input_files) != 1:
+    raise ValueError("--output_name requires a single input file, use --output_dir instead.")
+
+
+def output_path(input_file: str) -> str:
+    if args_cli.output_name:
+        return args_cli.output_name
     # generate at the same location as input file
-    args_cli.output_name = (
-        "/".join(args_cli.input_file.split("/")[:-1]) + "/" + args_cli.input_file.split("/")[-1].replace(".csv", ".npz")
-    )
+    name = os.path.splitext(os.path.basename(input_file))[0] + ".npz"
+    return os.path.join(args_cli.output_dir or os.path.dirname(input_file), name)
 
 
 # launch omniverse app
@@ -56,13 +94,13 @@ from isaaclab.scene import InteractiveScene, InteractiveSceneCfg
 from isaaclab.sim import SimulationContext
 from isaaclab.utils import configclass
 from isaaclab.utils.assets import ISAAC_NUCLEUS_DIR
-from isaaclab.utils.math import axis_angle_from_quat, quat_conjugate, quat_mul, quat_slerp
 
 ##
 # Pre-defined configs
 ##
 from unitree_rl_lab.assets.robots.unitree import UNITREE_G1_29DOF_CFG as G1_ROBOT_CFG  # Currently only support G1-29dof
 from unitree_rl_lab.assets.robots.m3 import M3_MIMIC_CONFIG as M3_ROBOT_CFG
+from unitree_rl_lab.motion import VELOCITY_SOURCES, CsvMotionLoader, pad_csv_motions
 
 
 @configclass
@@ -89,245 +127,107 @@ class ReplayMotionsSceneCfg(InteractiveSceneCfg):
     else:
         raise ValueError(f"Unsupported robot type: {args_cli.robot}")
 
-class MotionLoader:
-    def __init__(
-        self,
-        motion_file: str,
-        input_fps: int,
-        output_fps: int,
-        device: torch.device,
-        frame_range: tuple[int, int] | None,
-    ):
-        self.motion_file = motion_file
-        self.input_fps = input_fps
-        self.output_fps = output_fps
-        self.input_dt = 1.0 / self.input_fps
-        self.output_dt = 1.0 / self.output_fps
-        self.current_idx = 0
-        self.device = device
-        self.frame_range = frame_range
-        self._load_motion()
-        self._interpolate_motion()
-        self._compute_velocities()
-
-    def _load_motion(self):
-        """Loads the motion from the csv file."""
-        if self.frame_range is None:
-            motion = torch.from_numpy(np.loadtxt(self.motion_file, delimiter=","))
-        else:
-            motion = torch.from_numpy(
-                np.loadtxt(
-                    self.motion_file,
-                    delimiter=",",
-                    skiprows=self.frame_range[0] - 1,
-                    max_rows=self.frame_range[1] - self.frame_range[0] + 1,
-                )
-            )
-        motion = motion.to(torch.float32).to(self.device)
-        self.motion_base_poss_input = motion[:, :3]
-        self.motion_base_rots_input = motion[:, 3:7]
-        self.motion_base_rots_input = self.motion_base_rots_input[:, [3, 0, 1, 2]]  # convert to wxyz
-        self.motion_dof_poss_input = motion[:, 7:]
-
-        self.input_frames = motion.shape[0]
-        self.duration = (self.input_frames - 1) * self.input_dt
-        print(f"Motion loaded ({self.motion_file}), duration: {self.duration} sec, frames: {self.input_frames}")
-
-    def _interpolate_motion(self):
-        """Interpolates the motion to the output fps."""
-        times = torch.arange(0, self.duration, self.output_dt, device=self.device, dtype=torch.float32)
-        self.output_frames = times.shape[0]
-        index_0, index_1, blend = self._compute_frame_blend(times)
-        self.motion_base_poss = self._lerp(
-            self.motion_base_poss_input[index_0],
-            self.motion_base_poss_input[index_1],
-            blend.unsqueeze(1),
-        )
-        self.motion_base_rots = self._slerp(
-            self.motion_base_rots_input[index_0],
-            self.motion_base_rots_input[index_1],
-            blend,
-        )
-        self.motion_dof_poss = self._lerp(
-            self.motion_dof_poss_input[index_0],
-            self.motion_dof_poss_input[index_1],
-            blend.unsqueeze(1),
-        )
-        print(
-            f"Motion interpolated, input frames: {self.input_frames}, input fps: {self.input_fps}, output frames:"
-            f" {self.output_frames}, output fps: {self.output_fps}"
-        )
 
-    def _lerp(self, a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
-        """Linear interpolation between two tensors."""
-        return a * (1 - blend) + b * blend
-
-    def _slerp(self, a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
-        """Spherical linear interpolation between two quaternions."""
-        slerped_quats = torch.zeros_like(a)
-        for i in range(a.shape[0]):
-            slerped_quats[i] = quat_slerp(a[i], b[i], blend[i])
-        return slerped_quats
-
-    def _compute_frame_blend(self, times: torch.Tensor) -> torch.Tensor:
-        """Computes the frame blend for the motion."""
-        phase = times / self.duration
-        index_0 = (phase * (self.input_frames - 1)).floor().long()
-        index_1 = torch.minimum(index_0 + 1, torch.tensor(self.input_frames - 1))
-        blend = phase * (self.input_frames - 1) - index_0
-        return index_0, index_1, blend
-
-    def _compute_velocities(self):
-        """Computes the velocities of the motion."""
-        self.motion_base_lin_vels = torch.gradient(self.motion_base_poss, spacing=self.output_dt, dim=0)[0]
-        self.motion_dof_vels = torch.gradient(self.motion_dof_poss, spacing=self.output_dt, dim=0)[0]
-        self.motion_base_ang_vels = self._so3_derivative(self.motion_base_rots, self.output_dt)
-
-    def _so3_derivative(self, rotations: torch.Tensor, dt: float) -> torch.Tensor:
-        """Computes the derivative of a sequence of SO3 rotations.
-
-        Args:
-            rotations: shape (B, 4).
-            dt: time step.
-        Returns:
-            shape (B, 3).
-        """
-        q_prev, q_next = rotations[:-2], rotations[2:]
-        q_rel = quat_mul(q_next, quat_conjugate(q_prev))  # shape (B−2, 4)
-
-        omega = axis_angle_from_quat(q_rel) / (2.0 * dt)  # shape (B−2, 3)
-        omega = torch.cat([omega[:1], omega, omega[-1:]], dim=0)  # repeat first and last sample
-        return omega
-
-    def get_next_state(
-        self,
-    ) -> tuple[
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-    ]:
-        """Gets the next state of the motion."""
-        state = (
-            self.motion_base_poss[self.current_idx : self.current_idx + 1],
-            self.motion_base_rots[self.current_idx : self.current_idx + 1],
-            self.motion_base_lin_vels[self.current_idx : self.current_idx + 1],
-            self.motion_base_ang_vels[self.current_idx : self.current_idx + 1],
-            self.motion_dof_poss[self.current_idx : self.current_idx + 1],
-            self.motion_dof_vels[self.current_idx : self.current_idx + 1],
+def run_simulator(sim: sim_utils.SimulationContext, scene: InteractiveScene, input_files: list[str]):
+    """Replays a batch of motions, one per environment, and saves the states of every environment to its npz file."""
+    # Load motions
+    motions = [
+        CsvMotionLoader(
+            motion_file=input_file,
+            input_fps=args_cli.input_fps,
+            output_fps=args_cli.output_fps,
+            device=sim.device,
+            frame_range=args_cli.frame_range,
         )
-        self.current_idx += 1
-        reset_flag = False
-        if self.current_idx >= self.output_frames:
-            self.current_idx = 0
-            reset_flag = True
-        return state, reset_flag
-
-
-def run_simulator(sim: sim_utils.SimulationContext, scene: InteractiveScene):
-    """Runs the simulation loop."""
-    # Load motion
-    motion = MotionLoader(
-        motion_file=args_cli.input_file,
-        input_fps=args_cli.input_fps,
-        output_fps=args_cli.output_fps,
-        device=sim.device,
-        frame_range=args_cli.frame_range,
-    )
+        for input_file in input_files
+    ]
+    # clips shorter than the longest one hold their last pose; their padded frames are not saved
+    motion, lengths = pad_csv_motions(motions)
+    num_clips, num_frames = len(motions), motion["base_pos"].shape[1]
 
     # Extract scene entities
     robot = scene["robot"]
     robot_joint_indexes = robot.find_joints(scene.cfg.robot.joint_sdk_names, preserve_order=True)[0]
+    env_ids = torch.arange(num_clips, device=sim.device)
+    env_origins = scene.env_origins[env_ids]
 
     # ------- data logger -------------------------------------------------------
     log = {
-        "fps": [args_cli.output_fps],
-        "joint_pos": [],
-        "joint_vel": [],
-        "body_pos_w": [],
-        "body_quat_w": [],
-        "body_lin_vel_w": [],
-        "body_ang_vel_w": [],
+        "joint_pos": np.zeros((num_clips, num_frames, robot.num_joints), dtype=np.float32),
+        "joint_vel": np.zeros((num_clips, num_frames, robot.num_joints), dtype=np.float32),
+        "body_pos_w": np.zeros((num_clips, num_frames, robot.num_bodies, 3), dtype=np.float32),
+        "body_quat_w": np.zeros((num_clips, num_frames, robot.num_bodies, 4), dtype=np.float32),
+        "body_lin_vel_w": np.zeros((num_clips, num_frames, robot.num_bodies, 3), dtype=np.float32),
+        "body_ang_vel_w": np.zeros((num_clips, num_frames, robot.num_bodies, 3), dtype=np.float32),
     }
-    file_saved = False
     # --------------------------------------------------------------------------
 
     # Simulation loop
-    while simulation_app.is_running():
-        (
-            (
-                motion_base_pos,
-                motion_base_rot,
-                motion_base_lin_vel,
-                motion_base_ang_vel,
-                motion_dof_pos,
-                motion_dof_vel,
-            ),
-            reset_flag,
-        ) = motion.get_next_state()
+    for frame in range(num_frames):
+        if not simulation_app.is_running():
+            return
 
         # set root state
-        root_states = robot.data.default_root_state.clone()
-        root_states[:, :3] = motion_base_pos
-        root_states[:, :2] += scene.env_origins[:, :2]
-        root_states[:, 3:7] = motion_base_rot
-        root_states[:, 7:10] = motion_base_lin_vel
-        root_states[:, 10:] = motion_base_ang_vel
-        robot.write_root_state_to_sim(root_states)
+        root_states = robot.data.default_root_state[env_ids].clone()
+        root_states[:, :3] = motion["base_pos"][:, frame]
+        root_states[:, :2] += env_origins[:, :2]
+        root_states[:, 3:7] = motion["base_rot"][:, frame]
+        root_states[:, 7:10] = motion["base_lin_vel"][:, frame]
+        root_states[:, 10:] = motion["base_ang_vel"][:, frame]
+        robot.write_root_state_to_sim(root_states, env_ids=env_ids)
 
         # set joint state
-        joint_pos = robot.data.default_joint_pos.clone()
-        joint_vel = robot.data.default_joint_vel.clone()
-        joint_pos[:, robot_joint_indexes] = motion_dof_pos
-        joint_vel[:, robot_joint_indexes] = motion_dof_vel
-        robot.write_joint_state_to_sim(joint_pos, joint_vel)
+        joint_pos = robot.data.default_joint_pos[env_ids].clone()
+        joint_vel = robot.data.default_joint_vel[env_ids].clone()
+        joint_pos[:, robot_joint_indexes] = motion["dof_pos"][:, frame]
+        joint_vel[:, robot_joint_indexes] = motion["dof_vel"][:, frame]
+        robot.write_joint_state_to_sim(joint_pos, joint_vel, env_ids=env_ids)
         sim.render()  # We don't want physic (sim.step())
         scene.update(sim.get_physics_dt())
 
         pos_lookat = root_states[0, :3].cpu().numpy()
         sim.set_camera_view(pos_lookat + np.array([2.0, 2.0, 0.5]), pos_lookat)
 
-        if not file_saved:
-            log["joint_pos"].append(robot.data.joint_pos[0, :].cpu().numpy().copy())
-            log["joint_vel"].append(robot.data.joint_vel[0, :].cpu().numpy().copy())
-            log["body_pos_w"].append(robot.data.body_pos_w[0, :].cpu().numpy().copy())
-            log["body_quat_w"].append(robot.data.body_quat_w[0, :].cpu().numpy().copy())
-            log["body_lin_vel_w"].append(robot.data.body_lin_vel_w[0, :].cpu().numpy().copy())
-            log["body_ang_vel_w"].append(robot.data.body_ang_vel_w[0, :].cpu().numpy().copy())
-
-        if reset_flag and not file_saved:
-            file_saved = True
-            for k in (
-                "joint_pos",
-                "joint_vel",
-                "body_pos_w",
-                "body_quat_w",
-                "body_lin_vel_w",
-                "body_ang_vel_w",
-            ):
-                log[k] = np.stack(log[k], axis=0)
-
-            np.savez(args_cli.output_name, **log)
-            print("[INFO]: Motion npz file saved to", args_cli.output_name)
+        # the body positions are saved relative to the origin of their environment
+        body_pos_w = robot.data.body_pos_w[env_ids].clone()
+        body_pos_w[..., :2] -= env_origins[:, None, :2]
+        log["joint_pos"][:, frame] = robot.data.joint_pos[env_ids].cpu().numpy()
+        log["joint_vel"][:, frame] = robot.data.joint_vel[env_ids].cpu().numpy()
+        log["body_pos_w"][:, frame] = body_pos_w.cpu().numpy()
+        log["body_quat_w"][:, frame] = robot.data.body_quat_w[env_ids].cpu().numpy()
+        log["body_lin_vel_w"][:, frame] = robot.data.body_lin_vel_w[env_ids].cpu().numpy()
+        log["body_ang_vel_w"][:, frame] = robot.data.body_ang_vel_w[env_ids].cpu().numpy()
+
+    if args_cli.poses_only:
+        log = {k: v for k, v in log.items() if k not in VELOCITY_SOURCES}
+    for env_id, input_file in enumerate(input_files):
+        length = int(lengths[env_id])
+        np.savez(
+            output_path(input_file),
+            fps=[args_cli.output_fps],
+            **{k: v[env_id, :length] for k, v in log.items()},
+        )
+        print("[INFO]: Motion npz file saved to", output_path(input_file))
 
 
 def main():
     """Main function."""
+    if args_cli.output_dir:
+        os.makedirs(args_cli.output_dir, exist_ok=True)
     # Load kit helper
     sim_cfg = sim_utils.SimulationCfg(device=args_cli.device)
     sim_cfg.dt = 1.0 / args_cli.output_fps
     sim = SimulationContext(sim_cfg)
     # Design scene
-    scene_cfg = ReplayMotionsSceneCfg(num_envs=1, env_spacing=2.0)
+    scene_cfg = ReplayMotionsSceneCfg(num_envs=min(args_cli.num_envs, len(input_files)), env_spacing=2.0)
     scene = InteractiveScene(scene_cfg)
     # Play the simulator
     sim.reset()
     # Now we are ready!
     print("[INFO]: Setup complete...")
-    # Run the simulator
-    run_simulator(sim, scene)
+    # Run the simulator, one batch of clips at a time
+    for start in range(0, len(input_files), scene.num_envs):
+        run_simulator(sim, scene, input_files[start : start + scene.num_envs])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""Convert motion csv files to npz files with batched forward kinematics, without Isaac Sim.
+
+Writes the same arrays as ``csv_to_npz.py``, but computes the body states from the robot URDF instead of replaying
+the motion in the simulator, so it runs on CPU-only machines and converts a whole directory of clips in one process.
+
+.. code-block:: bash
+
+    # Usage
+    python csv_to_npz_fk.py -f path_to_input.csv --input_fps 60 --robot m3
+    python csv_to_npz_fk.py -f path_to_csv_dir --input_fps 30 --robot m3 --output_dir path_to_npz_dir
+    python csv_to_npz_fk.py -f path_to_input.csv --robot g1 --urdf path_to/g1_29dof_rev_1_0.urdf
+"""
+
+import argparse
+import glob
+import os
+import time
+import numpy as np
+
+from unitree_rl_lab.motion import MOTION_ROBOTS, CsvMotionLoader, UrdfKinematics, csv_motion_to_arrays
+
+parser = argparse.ArgumentParser(description="Convert motion csv files to npz files without the simulator.")
+parser.add_argument(
+    "--input_file", "-f", type=str, nargs="+", required=True, help="Motion csv files or directories of csv files."
+)
+parser.add_argument("--input_fps", type=int, default=50, help="The fps of the input motion.")
+parser.add_argument(
+    "--frame_range",
+    nargs=2,
+    type=int,
+    metavar=("START", "END"),
+    help=(
+        "frame range: START END (both inclusive). The frame index starts from 1. If not provided, all frames will be"
+        " loaded."
+    ),
+)
+parser.add_argument("--output_name", type=str, help="The name of the motion npz file (single input file only).")
+parser.add_argument("--output_dir", type=str, help="Directory of the npz files. Defaults to next to the csv files.")
+parser.add_argument("--output_fps", type=int, default=50, help="The fps of the output motion.")
+parser.add_argument("--robot", type=str, required=True, choices=sorted(MOTION_ROBOTS), help="Robot type.")
+parser.add_argument("--urdf", type=str, help="URDF of the robot. Defaults to the one under assets/description.")
+parser.add_argument("--device", type=str, default="cpu")
+parser.add_argument(
+    "--poses_only", action="store_true", help="Do not store velocities, the motion loader derives them on load."
+)
+args_cli = parser.parse_args()
+
+
+def collect_inputs(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def output_path(input_file: str) -> str:
+    if args_cli.output_name:
+        return args_cli.output_name
+    name = os.path.splitext(os.path.basename(input_file))[0] + ".npz"
+    return os.path.join(args_cli.output_dir or os.path.dirname(input_file), name)
+
+
+def main():
+    robot = MOTION_ROBOTS[args_cli.robot]
+    urdf_path = args_cli.urdf or robot.urdf_path
+    if urdf_path is None:
+        raise ValueError(f"The URDF of robot '{args_cli.robot}' is not part of this repository, pass it with --urdf.")
+    input_files = collect_inputs(args_cli.input_file)
+    if args_cli.output_name and len(input_files) != 1:
+        raise ValueError("--output_name requires a single input file, use --output_dir instead.")
+    if args_cli.output_dir:
+        os.makedirs(args_cli.output_dir, exist_ok=True)
+
+    kinematics = UrdfKinematics(urdf_path, device=args_cli.device)
+    print(f"[INFO]: Loaded {urdf_path}: {kinematics.num_bodies} bodies, {kinematics.num_joints} joints")
+    for input_file in input_files:
+        start = time.perf_counter()
+        motion = CsvMotionLoader(
+            motion_file=input_file,
+            input_fps=args_cli.input_fps,
+            output_fps=args_cli.output_fps,
+            device=args_cli.device,
+            frame_range=args_cli.frame_range,
+        )
+        arrays = csv_motion_to_arrays(motion, kinematics, robot.joint_names, velocities=not args_cli.poses_only)
+        np.savez(output_path(input_file), **arrays)
+        print(f"[INFO]: Motion npz file saved to {output_path(input_file)} ({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
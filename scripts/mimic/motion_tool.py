@@ -0,0 +1,359 @@
+"""Bulk motion conversion and validation over directory trees.
+
+``batch`` fans every matching file under the inputs out over a process pool. The content hash of every input and the
+conversion parameters are recorded in a cache file next to the outputs, so re-running after editing a few clips only
+converts those clips. Directory inputs are mirrored into ``--output_dir``.
+
+``validate`` checks every ``.npz`` and ``.pkl`` clip under the inputs for non-finite values, orientation norm drift,
+joint limit violations, velocity spikes, frame rate mismatches and ground penetration (see
+:func:`unitree_rl_lab.motion.validate_motions`), prints the clips with issues and optionally writes the full report with
+per-clip statistics to a JSON file.
+
+.. code-block:: bash
+
+    # Usage
+    python motion_tool.py batch csv_to_npz path_to_csv_dir --robot m3 --input_fps 30 --output_dir path_to_npz_dir
+    python motion_tool.py batch pkl_to_npz path_to_pkl_dir --robot m3 --workers 8
+    python motion_tool.py batch csv_to_npz a.csv b.csv --robot m3 --force --report timings.json
+    python motion_tool.py batch compact path_to_npz_dir --compression zstd --output_dir path_to_compact_dir
+    python motion_tool.py validate path_to_npz_dir path_to_pkl_dir --robot m3 --report report.json
+"""
+
+import argparse
+import contextlib
+import functools
+import glob
+import io
+import json
+import numpy as np
+import os
+import time
+
+from unitree_rl_lab.motion import (
+    MOTION_ROBOTS,
+    VELOCITY_SOURCES,
+    BatchJob,
+    ColumnPermutation,
+    CsvMotionLoader,
+    MotionValidationCfg,
+    UrdfKinematics,
+    csv_motion_to_arrays,
+    open_motion_archive,
+    run_batch,
+    save_compact_motion,
+    soft_joint_limits,
+    validate_motions,
+)
+
+CACHE_NAME = ".motion_tool_cache.json"
+
+
+@functools.lru_cache
+def load_kinematics(urdf_path: str, device: str) -> UrdfKinematics:
+    # parsed once per worker process
+    return UrdfKinematics(urdf_path, device=device)
+
+
+def convert_csv_to_npz(
+    input_path: str,
+    output_path: str,
+    robot: str,
+    urdf: str | None,
+    input_fps: int,
+    output_fps: int,
+    device: str,
+    poses_only: bool,
+):
+    motion_robot = MOTION_ROBOTS[robot]
+    with contextlib.redirect_stdout(io.StringIO()):
+        motion = CsvMotionLoader(input_path, input_fps, output_fps, device=device)
+    arrays = csv_motion_to_arrays(
+        motion,
+        load_kinematics(urdf or motion_robot.urdf_path, device),
+        motion_robot.joint_names,
+        velocities=not poses_only,
+    )
+    np.savez(output_path, **arrays)
+
+
+def convert_pkl_to_npz(
+    input_path: str,
+    output_path: str,
+    target_frames: int | None,
+    robot: str,
+    urdf: str | None,
+    device: str,
+    poses_only: bool,
+):
+    import pkl_to_npz  # sibling script
+
+    # the single-file script prints a summary of every output, which would interleave between workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        pkl_to_npz.convert_pkl_to_npz(
+            input_path,
+            output_path,
+            target_frames=target_frames,
+            robot=robot,
+            urdf=urdf,
+            device=device,
+            poses_only=poses_only,
+        )
+
+
+def convert_npz_to_compact(
+    input_path: str, output_path: str, quat_bits: int | None, velocity_dtype: str, compression: str, poses_only: bool
+):
+    with open_motion_archive(input_path) as archive:
+        arrays = {name: archive[name] for name in archive.files if not (poses_only and name in VELOCITY_SOURCES)}
+    save_compact_motion(
+        output_path, arrays, quat_bits=quat_bits, velocity_dtype=velocity_dtype, compression=compression
+    )
+
+
+# operation: (conversion, input suffix, output suffix)
+OPERATIONS = {
+    "csv_to_npz": (convert_csv_to_npz, ".csv", ".npz"),
+    "pkl_to_npz": (convert_pkl_to_npz, ".pkl", ".npz"),
+    "compact": (convert_npz_to_compact, ".npz", ".compact.npz"),
+}
+
+parser = argparse.ArgumentParser(description="Motion file tools.")
+subparsers = parser.add_subparsers(dest="command", required=True)
+batch_parser = subparsers.add_parser("batch", help="Convert directory trees of motion files in parallel.")
+batch_parser.add_argument("operation", choices=sorted(OPERATIONS), help="The conversion.")
+batch_parser.add_argument("inputs", nargs="+", help="Input files or directories, searched recursively.")
+batch_parser.add_argument("--output_dir", type=str, help="Directory of the outputs. Defaults to next to the inputs.")
+batch_parser.add_argument("--workers", type=int, default=None, help="Worker processes. Defaults to one per CPU.")
+batch_parser.add_argument("--cache", type=str, help=f"Cache file. Defaults to {CACHE_NAME} in the output directory.")
+batch_parser.add_argument("--force", action="store_true", help="Convert every file, even if it is cached.")
+batch_parser.add_argument("--report", type=str, help="Write the per-file timings to this JSON file.")
+batch_parser.add_argument(
+    "--poses_only",
+    action="store_true",
+    help="Do not store velocities (csv_to_npz, pkl_to_npz, compact), they are derived on load.",
+)
+# csv_to_npz, pkl_to_npz
+batch_parser.add_argument(
+    "--robot", type=str, choices=sorted(MOTION_ROBOTS), help="Robot type (csv_to_npz, pkl_to_npz)."
+)
+batch_parser.add_argument(
+    "--urdf", type=str, help="URDF of the robot (csv_to_npz, pkl_to_npz). Defaults to the repository one."
+)
+batch_parser.add_argument("--device", type=str, default="cpu", help="Torch device (csv_to_npz, pkl_to_npz).")
+# csv_to_npz
+batch_parser.add_argument("--input_fps", type=int, default=50, help="The fps of the input motions (csv_to_npz).")
+batch_parser.add_argument("--output_fps", type=int, default=50, help="The fps of the output motions (csv_to_npz).")
+# pkl_to_npz
+batch_parser.add_argument("--target_frames", type=int, help="Resample to this number of frames (pkl_to_npz).")
+# compact
+batch_parser.add_argument("--quat_bits", type=int, default=15, help="Bits per quaternion component, 0 for float32.")
+batch_parser.add_argument("--velocity_dtype", type=str, default="float16", choices=["float16", "float32"])
+batch_parser.add_argument("--compression", type=str, default="deflate", choices=["deflate", "zstd"])
+validate_parser = subparsers.add_parser("validate", help="Check motion clips and report their statistics.")
+validate_parser.add_argument("inputs", nargs="+", help="Input .npz or .pkl files or directories, searched recursively.")
+validate_parser.add_argument("--robot", type=str, choices=sorted(MOTION_ROBOTS), help="Robot type, for joint limits.")
+validate_parser.add_argument("--urdf", type=str, help="URDF of the robot. Defaults to the repository one.")
+validate_parser.add_argument(
+    "--soft_limit_factor", type=float, help="Fraction of the joint ranges allowed. Defaults to the robot's."
+)
+validate_parser.add_argument("--fps", type=float, help="Expected fps. Defaults to the most common one.")
+validate_parser.add_argument("--report", type=str, help="Write the full report to this JSON file.")
+validate_parser.add_argument("--device", type=str, default="cpu", help="Torch device.")
+for field in ("quat_norm_tolerance", "joint_limit_tolerance", "ground_tolerance", "max_joint_vel", "max_body_lin_vel"):
+    validate_parser.add_argument(f"--{field}", type=float, default=getattr(MotionValidationCfg, field))
+
+
+def collect_jobs(inputs: list[str], output_dir: str | None, input_suffix: str, output_suffix: str) -> list[BatchJob]:
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, "**", f"*{input_suffix}"), recursive=True))
+            root = path
+        else:
+            files = [path]
+            root = os.path.dirname(path)
+        for file in files:
+            # outputs that share the input suffix, e.g. x.compact.npz of x.npz, are not converted again
+            if output_suffix != input_suffix and file.endswith(output_suffix):
+                continue
+            output_path = os.path.splitext(file)[0] + output_suffix
+            if output_dir is not None:
+                output_path = os.path.join(output_dir, os.path.relpath(output_path, root))
+            jobs.append(BatchJob(file, output_path))
+    return jobs
+
+
+def batch(args: argparse.Namespace):
+    convert, input_suffix, output_suffix = OPERATIONS[args.operation]
+    if args.operation in ("csv_to_npz", "pkl_to_npz"):
+        if args.robot is None:
+            raise ValueError(f"{args.operation} requires --robot.")
+        if args.urdf is None and MOTION_ROBOTS[args.robot].urdf_path is None:
+            raise ValueError(f"The URDF of robot '{args.robot}' is not part of this repository, pass it with --urdf.")
+        urdf = os.path.abspath(args.urdf) if args.urdf else None
+    if args.operation == "csv_to_npz":
+        params = dict(
+            robot=args.robot,
+            urdf=urdf,
+            input_fps=args.input_fps,
+            output_fps=args.output_fps,
+            device=args.device,
+            poses_only=args.poses_only,
+        )
+    elif args.operation == "pkl_to_npz":
+        params = dict(
+            target_frames=args.target_frames,
+            robot=args.robot,
+            urdf=urdf,
+            device=args.device,
+            poses_only=args.poses_only,
+        )
+    else:
+        params = dict(
+            quat_bits=args.quat_bits or None,
+            velocity_dtype=args.velocity_dtype,
+            compression=args.compression,
+            poses_only=args.poses_only,
+        )
+
+    jobs = collect_jobs(args.inputs, args.output_dir, input_suffix, output_suffix)
+    if not jobs:
+        print(f"[INFO]: No {input_suffix} files found.")
+        return
+    cache_dir = args.output_dir or (
+        args.inputs[0] if os.path.isdir(args.inputs[0]) else os.path.dirname(args.inputs[0])
+    )
+    cache_path = args.cache or os.path.join(cache_dir, CACHE_NAME)
+
+    done = 0
+    width = len(str(len(jobs)))
+
+    def report(result):
+        nonlocal done
+        done += 1
+        print(f"[{done:>{width}}/{len(jobs)}] {result.status:<9} {result.seconds:7.2f} s  {result.job.input_path}")
+        if result.error is not None:
+            print(result.error)
+
+    start = time.perf_counter()
+    results = run_batch(
+        convert,
+        jobs,
+        params,
+        cache_path=cache_path,
+        num_workers=args.workers,
+        force=args.force,
+        on_result=report,
+    )
+    wall_time = time.perf_counter() - start
+
+    counts = {status: sum(r.status == status for r in results) for status in ("converted", "cached", "failed")}
+    convert_time = sum(r.seconds for r in results)
+    print(
+        f"[INFO]: {counts['converted']} converted, {counts['cached']} cached, {counts['failed']} failed in"
+        f" {wall_time:.2f} s ({convert_time:.2f} s of conversion)"
+    )
+    converted = [r for r in results if r.status == "converted"]
+    if converted:
+        print("[INFO]: Slowest files:")
+        for result in sorted(converted, key=lambda r: r.seconds, reverse=True)[:5]:
+            print(f"  {result.seconds:7.2f} s  {result.job.input_path}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(
+                {
+                    "wall_time": wall_time,
+                    "files": [
+                        {
+                            "input": r.job.input_path,
+                            "output": r.job.output_path,
+                            "status": r.status,
+                            "seconds": r.seconds,
+                        }
+                        for r in results
+                    ],
+                },
+                f,
+                indent=2,
+            )
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+def validate(args: argparse.Namespace):
+    files = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            files += sorted(
+                file
+                for suffix in (".npz", ".pkl")
+                for file in glob.glob(os.path.join(path, "**", f"*{suffix}"), recursive=True)
+            )
+        else:
+            files.append(path)
+    if not files:
+        print("[INFO]: No .npz or .pkl files found.")
+        return
+
+    joint_limits = joint_names = joint_permutation = None
+    if args.robot is not None:
+        motion_robot = MOTION_ROBOTS[args.robot]
+        urdf = args.urdf or motion_robot.urdf_path
+        if urdf is None:
+            raise ValueError(f"The URDF of robot '{args.robot}' is not part of this repository, pass it with --urdf.")
+        kinematics = UrdfKinematics(urdf)
+        factor = args.soft_limit_factor or motion_robot.soft_joint_pos_limit_factor
+        joint_limits = soft_joint_limits(kinematics.joint_limits, factor)
+        joint_names = kinematics.joint_names
+        # pkl clips are in SDK joint order, npz clips in the order of the articulation
+        joint_permutation = ColumnPermutation(motion_robot.joint_names, kinematics.joint_names)
+    cfg = MotionValidationCfg(
+        fps=args.fps,
+        quat_norm_tolerance=args.quat_norm_tolerance,
+        joint_limit_tolerance=args.joint_limit_tolerance,
+        ground_tolerance=args.ground_tolerance,
+        max_joint_vel=args.max_joint_vel,
+        max_body_lin_vel=args.max_body_lin_vel,
+    )
+
+    def report(clip):
+        if clip["issues"]:
+            print(f"[ISSUE] {clip['file']}")
+            for name, issue in clip["issues"].items():
+                print(f"  {name:<20} {json.dumps(issue)}")
+
+    result = validate_motions(
+        files,
+        cfg,
+        joint_limits=joint_limits,
+        joint_names=joint_names,
+        joint_permutation=joint_permutation,
+        device=args.device,
+        on_clip=report,
+    )
+    summary = result["summary"]
+    print(
+        f"[INFO]: {summary['num_clips']} clips, {summary['num_frames']} frames ({summary['duration'] / 60:.1f} min),"
+        f" {summary['num_clips_with_issues']} with issues, checked in {summary['seconds']:.2f} s"
+    )
+    for name, count in summary["clips_per_check"].items():
+        if count:
+            print(f"  {name:<20} {count} clips")
+    print(f"[INFO]: Frame rates: {summary['fps']}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
+    if summary["num_clips_with_issues"]:
+        raise SystemExit(1)
+
+
+def main():
+    args = parser.parse_args()
+    if args.command == "batch":
+        batch(args)
+    elif args.command == "validate":
+        validate(args)
+
+
+if __name__ == "__main__":
+    main()
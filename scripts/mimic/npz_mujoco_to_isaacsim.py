@@ -2,6 +2,8 @@
 import numpy as np
 import argparse
 
+from unitree_rl_lab.motion.ops import ColumnPermutation
+
 parser = argparse.ArgumentParser(description="Convert Mujoco motion NPZ to IsaacSim format")
 parser.add_argument("--input", type=str, required=True, help="Input NPZ file (Mujoco order)")
 parser.add_argument("--output", type=str, default=None, help="Output NPZ file (Isaac order)")
@@ -61,28 +63,20 @@ M3_MUJOCO_JOINT_NAMES = [
 ]
 
 
-
 def create_mujoco_to_isaac_mapping(ISAAC_JOINT_NAMES, MUJOCO_JOINT_NAMES):
     """
-    创建从Mujoco顺序到Isaac顺序的映射
+    创建从Mujoco顺序到Isaac顺序的映射（一次gather完成重排，缺失的Isaac关节填0）
     """
-    mujoco_to_isaac = []
-    for isaac_joint in ISAAC_JOINT_NAMES:
-        if isaac_joint in MUJOCO_JOINT_NAMES:
-            mujoco_idx = MUJOCO_JOINT_NAMES.index(isaac_joint)
-            mujoco_to_isaac.append(mujoco_idx)
-        else:
-            # 如果Isaac关节在Mujoco中不存在，使用-1标记
-            mujoco_to_isaac.append(-1)
-            print(f"警告: Isaac关节 '{isaac_joint}' 在Mujoco关节列表中未找到")
-    
+    mujoco_to_isaac = ColumnPermutation(MUJOCO_JOINT_NAMES, ISAAC_JOINT_NAMES)
+    for isaac_joint in mujoco_to_isaac.missing_target_names:
+        print(f"警告: Isaac关节 '{isaac_joint}' 在Mujoco关节列表中未找到")
     # 检查是否有Mujoco关节在Isaac中不存在（反向检查）
-    for mujoco_joint in MUJOCO_JOINT_NAMES:
-        if mujoco_joint not in ISAAC_JOINT_NAMES:
-            print(f"警告: Mujoco关节 '{mujoco_joint}' 在Isaac关节列表中未找到")
-    
+    for mujoco_joint in mujoco_to_isaac.unused_source_names:
+        print(f"警告: Mujoco关节 '{mujoco_joint}' 在Isaac关节列表中未找到")
+
     return mujoco_to_isaac
 
+
 def convert_npz_file(input_path, output_path=None):
     """
     转换NPZ文件从Mujoco顺序到Isaac顺序
@@ -102,32 +96,14 @@ def convert_npz_file(input_path, output_path=None):
         MUJOCO_JOINT_NAMES = M3_MUJOCO_JOINT_NAMES
     # 创建映射
     mapping = create_mujoco_to_isaac_mapping(ISAAC_JOINT_NAMES, MUJOCO_JOINT_NAMES)
-    
-    # 转换joint_pos和joint_vel
-    if 'joint_pos' in data:
-        mujoco_joint_pos = data['joint_pos']  # [timesteps, dof]
-        # 创建新的数组
-        isaac_joint_pos = np.zeros((mujoco_joint_pos.shape[0], len(ISAAC_JOINT_NAMES)), 
-                                  dtype=mujoco_joint_pos.dtype)
-        
-        for i, mujoco_idx in enumerate(mapping):
-            if mujoco_idx != -1:
-                isaac_joint_pos[:, i] = mujoco_joint_pos[:, mujoco_idx]
-        
-        print(f"转换 joint_pos: {mujoco_joint_pos.shape} -> {isaac_joint_pos.shape}")
-    
-    if 'joint_vel' in data:
-        mujoco_joint_vel = data['joint_vel']  # [timesteps, dof]
-        # 创建新的数组
-        isaac_joint_vel = np.zeros((mujoco_joint_vel.shape[0], len(ISAAC_JOINT_NAMES)), 
-                                  dtype=mujoco_joint_vel.dtype)
-        
-        for i, mujoco_idx in enumerate(mapping):
-            if mujoco_idx != -1:
-                isaac_joint_vel[:, i] = mujoco_joint_vel[:, mujoco_idx]
-        
-        print(f"转换 joint_vel: {mujoco_joint_vel.shape} -> {isaac_joint_vel.shape}")
-    
+
+    # 转换joint_pos和joint_vel: [timesteps, dof]
+    converted = {}
+    for key in ("joint_pos", "joint_vel"):
+        if key in data:
+            converted[key] = mapping(data[key])
+            print(f"转换 {key}: {data[key].shape} -> {converted[key].shape}")
+
     # 生成输出文件名
     if output_path is None:
         if input_path.endswith('.npz'):
@@ -136,21 +112,14 @@ def convert_npz_file(input_path, output_path=None):
             output_path = input_path + '_isaac.npz'
     
     # 保存转换后的数据
-    save_data = {}
-    for key in data.files:
-        if key == 'joint_pos':
-            save_data[key] = isaac_joint_pos
-        elif key == 'joint_vel':
-            save_data[key] = isaac_joint_vel
-        else:
-            save_data[key] = data[key]
+    save_data = {key: converted[key] if key in converted else data[key] for key in data.files}
     
     np.savez(output_path, **save_data)
     print(f"转换完成！保存到: {output_path}")
     
     # 打印转换信息
     print(f"\n关节映射信息:")
-    for i, (isaac_joint, mujoco_idx) in enumerate(zip(ISAAC_JOINT_NAMES, mapping)):
+    for i, (isaac_joint, mujoco_idx) in enumerate(zip(ISAAC_JOINT_NAMES, mapping.index)):
         if mujoco_idx != -1:
             print(f"  Isaac[{i}]: {isaac_joint:20s} <- Mujoco[{mujoco_idx}]: {MUJOCO_JOINT_NAMES[mujoco_idx]}")
     
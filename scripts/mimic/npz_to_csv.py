@@ -4,7 +4,8 @@ npz_to_csv.py - 将npz文件转换回CSV格式，处理关节顺序映射
 
 import argparse
 import numpy as np
-import torch
+
+from unitree_rl_lab.motion.ops import ColumnPermutation, resample_frames
 
 # 定义关节名称映射
 G1_CSV_JOINT_NAMES = [
@@ -92,71 +93,41 @@ else:
 
 # 创建从Isaac关节名到CSV索引的映射
 # 注意：Isaac关节名没有"_joint"后缀，CSV关节名有"_joint"后缀
+ISAAC_JOINT_FULL_NAMES = [f"{isaac_joint}_joint" for isaac_joint in ISAAC_JOINT_NAMES]
+
+
 def create_joint_mapping():
-    """创建Isaac关节顺序到CSV关节顺序的映射"""
-    mapping = []
-    for isaac_joint in ISAAC_JOINT_NAMES:
-        # 尝试找到对应的CSV关节名（添加"_joint"后缀）
-        csv_joint = f"{isaac_joint}_joint"
-        try:
-            csv_index = CSV_JOINT_NAMES.index(csv_joint)
-            mapping.append(csv_index)
-        except ValueError:
-            # 如果找不到，尝试其他可能的变体
-            print(f"警告: 无法找到Isaac关节 '{isaac_joint}' 对应的CSV关节")
-            # 使用-1表示未找到
-            mapping.append(-1)
-    
+    """创建Isaac关节顺序到CSV关节顺序的映射（预先计算gather索引，-1表示未找到）"""
+    mapping = ColumnPermutation(ISAAC_JOINT_FULL_NAMES, CSV_JOINT_NAMES)
+    for isaac_joint in mapping.unused_source_names:
+        print(f"警告: 无法找到Isaac关节 '{isaac_joint[:-len('_joint')]}' 对应的CSV关节")
+
     # 验证映射
-    valid_mapping = [i for i in mapping if i != -1]
-    if len(valid_mapping) != len(CSV_JOINT_NAMES):
-        print(f"警告: 映射不完整! CSV有{len(CSV_JOINT_NAMES)}个关节, 但只映射了{len(valid_mapping)}个")
-    
+    if mapping.missing.any():
+        num_mapped = len(CSV_JOINT_NAMES) - int(mapping.missing.sum())
+        print(f"警告: 映射不完整! CSV有{len(CSV_JOINT_NAMES)}个关节, 但只映射了{num_mapped}个")
+
     return mapping
 
+
 # 创建反向映射（从CSV索引到Isaac索引）
 def create_reverse_mapping():
     """创建CSV关节顺序到Isaac关节顺序的映射"""
-    mapping = []
-    for csv_joint in CSV_JOINT_NAMES:
-        # 移除"_joint"后缀
-        isaac_joint = csv_joint.replace("_joint", "")
-        try:
-            isaac_index = ISAAC_JOINT_NAMES.index(isaac_joint)
-            mapping.append(isaac_index)
-        except ValueError:
-            print(f"警告: 无法找到CSV关节 '{csv_joint}' 对应的Isaac关节")
-            mapping.append(-1)
-    
+    mapping = ColumnPermutation(CSV_JOINT_NAMES, ISAAC_JOINT_FULL_NAMES)
+    for csv_joint in mapping.unused_source_names:
+        print(f"警告: 无法找到CSV关节 '{csv_joint}' 对应的Isaac关节")
+
     return mapping
 
+
 def reorder_joints_from_isaac_to_csv(joint_data_isaac_order):
     """将Isaac顺序的关节数据重新排序为CSV顺序"""
-    mapping = create_joint_mapping()
-    num_frames = joint_data_isaac_order.shape[0]
-    num_joints = len(CSV_JOINT_NAMES)
-    
-    joint_data_csv_order = np.zeros((num_frames, num_joints))
-    
-    for i, csv_index in enumerate(mapping):
-        if csv_index != -1 and i < joint_data_isaac_order.shape[1]:
-            joint_data_csv_order[:, csv_index] = joint_data_isaac_order[:, i]
-    
-    return joint_data_csv_order
+    return create_joint_mapping()(joint_data_isaac_order)
+
 
 def reorder_joints_from_csv_to_isaac(joint_data_csv_order):
     """将CSV顺序的关节数据重新排序为Isaac顺序"""
-    mapping = create_reverse_mapping()
-    num_frames = joint_data_csv_order.shape[0]
-    num_joints = len(ISAAC_JOINT_NAMES)
-    
-    joint_data_isaac_order = np.zeros((num_frames, num_joints))
-    
-    for csv_index, isaac_index in enumerate(mapping):
-        if isaac_index != -1 and csv_index < joint_data_csv_order.shape[1]:
-            joint_data_isaac_order[:, isaac_index] = joint_data_csv_order[:, csv_index]
-    
-    return joint_data_isaac_order
+    return create_reverse_mapping()(joint_data_csv_order)
 
 def main():
     
@@ -203,11 +174,7 @@ def main():
             
             # 转换四元数从WXYZ到XYZW
             print("将四元数从WXYZ转换为XYZW格式...")
-            base_quat_xyzw = np.zeros_like(base_rot)
-            base_quat_xyzw[:, 0] = base_rot[:, 1]  # X
-            base_quat_xyzw[:, 1] = base_rot[:, 2]  # Y
-            base_quat_xyzw[:, 2] = base_rot[:, 3]  # Z
-            base_quat_xyzw[:, 3] = base_rot[:, 0]  # W
+            base_quat_xyzw = base_rot[:, [1, 2, 3, 0]]
             
             # 组合数据: XYZ + QX QY QZ QW + 关节位置(CSV顺序)
             csv_data = np.concatenate([base_pos, base_quat_xyzw, joint_pos_csv], axis=1)
@@ -231,11 +198,7 @@ def main():
         
         # 转换四元数从WXYZ到XYZW
         print("将四元数从WXYZ转换为XYZW格式...")
-        base_quat_xyzw = np.zeros_like(base_rot)
-        base_quat_xyzw[:, 0] = base_rot[:, 1]  # X
-        base_quat_xyzw[:, 1] = base_rot[:, 2]  # Y
-        base_quat_xyzw[:, 2] = base_rot[:, 3]  # Z
-        base_quat_xyzw[:, 3] = base_rot[:, 0]  # W
+        base_quat_xyzw = base_rot[:, [1, 2, 3, 0]]
         
         # 组合数据
         csv_data = np.concatenate([base_pos, base_quat_xyzw, joint_pos_csv], axis=1)
@@ -268,14 +231,8 @@ def main():
         num_frames = csv_data.shape[0]
         original_num_frames = int(num_frames * args.output_fps / args.input_fps)
         
-        original_times = np.linspace(0, num_frames-1, original_num_frames)
-        npz_times = np.arange(num_frames)
-        
-        csv_data_resampled = np.zeros((original_num_frames, csv_data.shape[1]))
-        for i in range(csv_data.shape[1]):
-            csv_data_resampled[:, i] = np.interp(original_times, npz_times, csv_data[:, i])
-        
-        csv_data = csv_data_resampled
+        # 一次性对所有列进行线性插值
+        csv_data = resample_frames(csv_data, original_num_frames)
         print(f"重采样后: {csv_data.shape}")
 
     # # ===== 在这里添加z坐标偏移 =====
@@ -306,7 +263,7 @@ def main():
         f.write("\n\n映射关系:\n")
         f.write("-" * 40 + "\n")
         f.write("CSV列 -> Isaac索引 -> CSV关节名 -> Isaac关节名\n")
-        mapping = create_reverse_mapping()
+        mapping = create_reverse_mapping().index
         for csv_index, isaac_index in enumerate(mapping):
             if isaac_index != -1:
                 f.write(f"列 {csv_index+7} -> Isaac索引 {isaac_index} -> {CSV_JOINT_NAMES[csv_index]} -> {ISAAC_JOINT_NAMES[isaac_index]}\n")
@@ -31,6 +31,12 @@ parser.add_argument(
 )
 parser.add_argument("--real-time", action="store_true", default=False, help="Run in real-time, if possible.")
 parser.add_argument("--debug", action="store_true", default=False, help="Run in debug mode.")
+parser.add_argument(
+    "--profile_terms",
+    action="store_true",
+    default=False,
+    help="Time every manager term and write the table to the params directory of the checkpoint run.",
+)
 # append RSL-RL cli arguments
 cli_args.add_rsl_rl_args(parser)
 # append AppLauncher cli args
@@ -66,6 +72,7 @@ from unitree_rl_lab.assets.robots.m3 import M3_MIMIC_ACTION_SCALE
 
 import unitree_rl_lab.tasks  # noqa: F401
 from unitree_rl_lab.utils.parser_cfg import parse_env_cfg
+from unitree_rl_lab.utils.term_profiler import TermProfiler
 
 
 def main():
@@ -112,6 +119,9 @@ def main():
     if isinstance(env.unwrapped, DirectMARLEnv):
         env = multi_agent_to_single_agent(env)
 
+    # time the terms of all managers
+    term_profiler = TermProfiler.install(env.unwrapped) if args_cli.profile_terms else None
+
     # wrap for video recording
     if args_cli.video:
         video_kwargs = {
@@ -204,38 +214,43 @@ def main():
     if version("rsl-rl-lib").startswith("2.3."):
         obs, _ = env.get_observations()
     timestep = 0
-    # simulate environment
-    while simulation_app.is_running():
-        start_time = time.time()
-        # run everything in inference mode
-        with torch.inference_mode():
-            # agent stepping
-            actions = policy(obs)
-            # actions = torch.zeros_like(actions)
-            # actions = (asset.data.joint_pos - asset.data.default_joint_pos) / scale_tensor
-            # env stepping
-            obs, _, _, _ = env.step(actions)
-        if args_cli.video:
-            timestep += 1
-            # Exit the play loop after recording one video
-            if timestep == args_cli.video_length:
-                break
-
-        # time delay for real-time evaluation
-        sleep_time = dt - (time.time() - start_time)
-        if args_cli.real_time and sleep_time > 0:
-            time.sleep(sleep_time)
-
-        if args_cli.debug:
-            tau = asset.data.applied_torque[0].cpu().numpy()
-            pos = asset.data.joint_pos[0].cpu().numpy()
-            vel = asset.data.joint_vel[0].cpu().numpy()
-
-            plotter.update(
-                tau[left_indices], tau[right_indices],
-                pos[left_indices], pos[right_indices],
-                vel[left_indices], vel[right_indices],
-            )
+    # the loop of a headless run ends with Ctrl-C, the term profile is written anyway
+    try:
+        # simulate environment
+        while simulation_app.is_running():
+            start_time = time.time()
+            # run everything in inference mode
+            with torch.inference_mode():
+                # agent stepping
+                actions = policy(obs)
+                # actions = torch.zeros_like(actions)
+                # actions = (asset.data.joint_pos - asset.data.default_joint_pos) / scale_tensor
+                # env stepping
+                obs, _, _, _ = env.step(actions)
+            if args_cli.video:
+                timestep += 1
+                # Exit the play loop after recording one video
+                if timestep == args_cli.video_length:
+                    break
+
+            # time delay for real-time evaluation
+            sleep_time = dt - (time.time() - start_time)
+            if args_cli.real_time and sleep_time > 0:
+                time.sleep(sleep_time)
+
+            if args_cli.debug:
+                tau = asset.data.applied_torque[0].cpu().numpy()
+                pos = asset.data.joint_pos[0].cpu().numpy()
+                vel = asset.data.joint_vel[0].cpu().numpy()
+
+                plotter.update(
+                    tau[left_indices], tau[right_indices],
+                    pos[left_indices], pos[right_indices],
+                    vel[left_indices], vel[right_indices],
+                )
+    finally:
+        if term_profiler is not None:
+            print(f"[INFO] Term profile written to: {term_profiler.write_report(log_dir)}")
 
     # close the simulator
     env.close()
@@ -43,12 +43,34 @@ parser.add_argument("--max_iterations", type=int, default=None, help="RL Policy
 parser.add_argument(
     "--distributed", action="store_true", default=False, help="Run training with multiple GPUs or nodes."
 )
+parser.add_argument(
+    "--fused_rewards",
+    type=str,
+    default=None,
+    choices=["eager", "compile"],
+    help="Evaluate the reward terms with a fused evaluator of this backend.",
+)
+parser.add_argument(
+    "--fused_rewards_eager",
+    type=str,
+    nargs="*",
+    default=["undesired_contacts", "fly", "feet_slide", "body_force", "feet_stumble"],
+    help="Reward terms or term functions that the fused evaluator evaluates eagerly (default: the contact terms).",
+)
+parser.add_argument(
+    "--profile_terms",
+    action="store_true",
+    default=False,
+    help="Time every manager term and write the table to the params directory of the run.",
+)
 # append RSL-RL cli arguments
 cli_args.add_rsl_rl_args(parser)
 # append AppLauncher cli args
 AppLauncher.add_app_launcher_args(parser)
 argcomplete.autocomplete(parser)
 args_cli, hydra_args = parser.parse_known_args()
+if args_cli.profile_terms and args_cli.fused_rewards is not None:
+    parser.error("--profile_terms times the reward terms one by one and cannot be combined with --fused_rewards.")
 
 # always enable cameras to record video
 if args_cli.video:
@@ -110,6 +132,8 @@ from isaaclab_tasks.utils.hydra import hydra_task_config
 
 import unitree_rl_lab.tasks  # noqa: F401
 from unitree_rl_lab.utils.export_deploy_cfg import export_deploy_cfg
+from unitree_rl_lab.utils.fused_rewards import FusedRewardEvaluator
+from unitree_rl_lab.utils.term_profiler import TermProfiler
 
 torch.backends.cuda.matmul.allow_tf32 = True
 torch.backends.cudnn.allow_tf32 = True
@@ -167,6 +191,16 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
     if isinstance(env.unwrapped, DirectMARLEnv):
         env = multi_agent_to_single_agent(env)
 
+    # evaluate the reward terms with one fused call
+    fused_rewards = None
+    if args_cli.fused_rewards is not None:
+        fused_rewards = FusedRewardEvaluator.install(
+            env.unwrapped, backend=args_cli.fused_rewards, eager_terms=args_cli.fused_rewards_eager
+        )
+
+    # time the terms of all managers
+    term_profiler = TermProfiler.install(env.unwrapped) if args_cli.profile_terms else None
+
     # save resume path before creating a new log_dir
     if agent_cfg.resume or agent_cfg.algorithm.class_name == "Distillation":
         resume_path = get_checkpoint_path(log_root_path, agent_cfg.load_run, agent_cfg.load_checkpoint)
@@ -206,8 +240,17 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
         os.path.join(log_dir, "params", os.path.basename(inspect.getfile(env_cfg.__class__))),
     )
 
-    # run training
-    runner.learn(num_learning_iterations=agent_cfg.max_iterations, init_at_random_ep_len=True)
+    # run training; the reports are written when it is stopped with Ctrl-C as well
+    try:
+        runner.learn(num_learning_iterations=agent_cfg.max_iterations, init_at_random_ep_len=True)
+    finally:
+        if fused_rewards is not None:
+            report = fused_rewards.format_report()
+            print(f"[INFO] Fused reward evaluation:\n{report}")
+            with open(os.path.join(log_dir, "params", "fused_rewards.txt"), "w") as f:
+                f.write(report + "\n")
+        if term_profiler is not None:
+            print(f"[INFO] Term profile written to: {term_profiler.write_report(log_dir)}")
 
     # close the simulator
     env.close()
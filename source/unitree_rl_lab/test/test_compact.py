@@ -0,0 +1,123 @@
+"""Tests of the compact motion archives of :mod:`unitree_rl_lab.motion.compact` and of :class:`MotionStore`."""
+
+import numpy as np
+import pytest
+import torch
+
+from unitree_rl_lab.motion import (
+    MOTION_ROBOTS,
+    MotionStore,
+    UrdfKinematics,
+    dequantize_smallest_three,
+    open_motion_archive,
+    quantize_smallest_three,
+    save_compact_motion,
+)
+from unitree_rl_lab.motion.compact import zstandard
+
+COMPRESSIONS = [
+    "deflate",
+    pytest.param("zstd", marks=pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")),
+]
+
+
+@pytest.fixture(scope="module")
+def clip() -> dict[str, np.ndarray]:
+    kinematics = UrdfKinematics(MOTION_ROBOTS["m3"].urdf_path)
+    fps = 50
+    t = torch.arange(200, dtype=torch.float32)[:, None] / fps
+    phase = torch.arange(kinematics.num_joints) * 0.7
+    joint_pos = 0.4 * torch.sin(2.0 * t + phase)
+    joint_vel = 0.8 * torch.cos(2.0 * t + phase)
+    yaw = 0.3 * t[:, 0]
+    root_pos = torch.stack([0.5 * t[:, 0], 0.1 * torch.sin(t[:, 0]), 0.8 + 0.02 * torch.sin(4 * t[:, 0])], dim=-1)
+    root_quat = torch.stack([torch.cos(yaw / 2), 0 * yaw, 0 * yaw, torch.sin(yaw / 2)], dim=-1)
+    root_lin_vel = torch.stack([0.5 + 0 * yaw, 0.1 * torch.cos(t[:, 0]), 0.08 * torch.cos(4 * t[:, 0])], dim=-1)
+    root_ang_vel = torch.stack([0 * yaw, 0 * yaw, 0.3 + 0 * yaw], dim=-1)
+    bodies = kinematics.forward(root_pos, root_quat, joint_pos, root_lin_vel, root_ang_vel, joint_vel)
+    return {
+        "fps": np.array([fps]),
+        "joint_pos": joint_pos.numpy(),
+        "joint_vel": joint_vel.numpy(),
+        **{name: value.numpy() for name, value in bodies.items()},
+    }
+
+
+def _decode(path) -> dict[str, np.ndarray]:
+    with open_motion_archive(str(path)) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def _angles(q0: np.ndarray, q1: np.ndarray) -> np.ndarray:
+    # arccos of the dot product is only accurate to about 1e-3 rad close to 1, atan2 of the chords is exact
+    q0 = q0.astype(np.float64)
+    q1 = q1 * np.sign(np.sum(q0 * q1, axis=-1, keepdims=True))
+    return 4 * np.arctan2(np.linalg.norm(q0 - q1, axis=-1), np.linalg.norm(q0 + q1, axis=-1))
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_round_trip(tmp_path, clip, compression):
+    path = tmp_path / "clip.npz"
+    save_compact_motion(str(path), clip, compression=compression)
+    decoded = _decode(path)
+
+    assert sorted(decoded) == sorted(clip)
+    # positions are stored losslessly
+    for name in ("fps", "joint_pos", "body_pos_w"):
+        np.testing.assert_array_equal(decoded[name], clip[name], err_msg=name)
+    assert np.max(_angles(clip["body_quat_w"], decoded["body_quat_w"])) < 1e-4
+    for name in ("joint_vel", "body_lin_vel_w", "body_ang_vel_w"):
+        # float16 keeps 11 significant bits
+        assert decoded[name].dtype == np.float32
+        np.testing.assert_allclose(decoded[name], clip[name], rtol=1e-3, atol=1e-4, err_msg=name)
+
+
+def test_lossless_options(tmp_path, clip):
+    path = tmp_path / "clip.npz"
+    save_compact_motion(str(path), clip, quat_bits=None, velocity_dtype="float32")
+    decoded = _decode(path)
+    for name, value in clip.items():
+        np.testing.assert_array_equal(decoded[name], value, err_msg=name)
+
+
+def test_regular_archive_is_opened_unchanged(tmp_path, clip):
+    path = tmp_path / "clip.npz"
+    np.savez(path, **clip)
+    decoded = _decode(path)
+    for name, value in clip.items():
+        np.testing.assert_array_equal(decoded[name], value, err_msg=name)
+
+
+@pytest.mark.parametrize("bits", [8, 15, 16])
+def test_smallest_three_quantization(bits):
+    generator = np.random.default_rng(bits)
+    quats = generator.standard_normal((1000, 3, 4)).astype(np.float32)
+    quats /= np.linalg.norm(quats, axis=-1, keepdims=True)
+    components, index = quantize_smallest_three(quats, bits)
+    decoded = dequantize_smallest_three(components, index, bits)
+
+    assert decoded.shape == quats.shape
+    np.testing.assert_allclose(np.linalg.norm(decoded, axis=-1), 1.0, atol=1e-6)
+    # the kept components lie in [-1/sqrt(2), 1/sqrt(2)], split into 2**bits - 1 steps
+    step = np.sqrt(2.0) / (2**bits - 1)
+    assert np.max(_angles(quats, decoded)) < 4 * step + 1e-6
+
+
+def test_smallest_three_bits_fit_uint16():
+    with pytest.raises(ValueError):
+        quantize_smallest_three(np.array([1.0, 0.0, 0.0, 0.0]), bits=17)
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_store_reads_compact_archives(tmp_path, clip, use_cache):
+    path = tmp_path / "clip.npz"
+    save_compact_motion(str(path), clip)
+    decoded = _decode(path)
+    store = MotionStore(str(path), use_cache=use_cache)
+
+    assert store.names == sorted(clip)
+    assert store.num_frames == clip["joint_pos"].shape[0]
+    np.testing.assert_array_equal(store.fps, clip["fps"])
+    for name in decoded:
+        np.testing.assert_array_equal(store.read(name), decoded[name], err_msg=name)
+    np.testing.assert_array_equal(store.read("body_pos_w", [3, 0]), decoded["body_pos_w"][:, [3, 0]])
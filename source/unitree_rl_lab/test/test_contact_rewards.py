@@ -0,0 +1,82 @@
+"""Tests of the contact reward terms of the locomotion tasks, which share the contact features of a step."""
+
+import pytest
+import torch
+from types import SimpleNamespace
+
+pytest.importorskip("isaaclab")
+
+from unitree_rl_lab.tasks.locomotion.mdp import rewards  # noqa: E402
+
+NUM_ENVS, NUM_BODIES, HISTORY_LENGTH = 64, 24, 3
+# the ankle roll links of the M3 and every other body
+FEET = [NUM_BODIES - 4, NUM_BODIES - 3]
+OTHERS = [i for i in range(NUM_BODIES) if i not in (FEET[0], FEET[1], FEET[0] - 2, FEET[1] - 2)]
+
+
+class Env:
+    # the contact features are cached per env, which needs a weakly referenceable object
+    def __init__(self, scene):
+        self.scene = scene
+        self.common_step_counter = 0
+
+
+class Scene:
+    def __init__(self, robot, sensors):
+        self.robot = robot
+        self.sensors = sensors
+
+    def __getitem__(self, name):
+        return self.robot
+
+
+def _terms_from_forces(env) -> dict[str, torch.Tensor]:
+    """The contact terms, each computed from the force history of the sensor on its own."""
+    forces = env.scene.sensors["contact_forces"].data.net_forces_w_history
+    current = env.scene.sensors["contact_forces"].data.net_forces_w
+    undesired = torch.max(torch.norm(forces[:, :, OTHERS], dim=-1), dim=1)[0] > 1.0
+    in_contact = torch.max(torch.norm(forces[:, :, FEET], dim=-1), dim=1)[0] > 1.0
+    body_vel = env.scene["robot"].data.body_lin_vel_w[:, FEET, :2]
+    body_force = current[:, FEET, 2].norm(dim=-1)
+    body_force[body_force < 500] = 0
+    body_force[body_force > 500] -= 500
+    stumble = torch.any(torch.norm(current[:, FEET, :2], dim=2) > 5 * torch.abs(current[:, FEET, 2]), dim=1)
+    return {
+        "undesired_contacts": torch.sum(undesired, dim=1),
+        "fly": torch.sum(in_contact, dim=-1) < 0.5,
+        "feet_slide": torch.sum(body_vel.norm(dim=-1) * in_contact, dim=1),
+        "body_force": body_force.clamp(min=0, max=400),
+        "feet_stumble": stumble,
+    }
+
+
+def _terms(env) -> dict[str, torch.Tensor]:
+    sensor_feet = SimpleNamespace(name="contact_forces", body_ids=FEET)
+    sensor_others = SimpleNamespace(name="contact_forces", body_ids=OTHERS)
+    return {
+        "undesired_contacts": rewards.undesired_contacts(env, 1.0, sensor_others),
+        "fly": rewards.fly(env, 1.0, sensor_feet),
+        "feet_slide": rewards.feet_slide(env, sensor_feet, SimpleNamespace(name="robot", body_ids=FEET)),
+        "body_force": rewards.body_force(env, sensor_feet),
+        "feet_stumble": rewards.feet_stumble(env, sensor_feet),
+    }
+
+
+def test_terms_match_the_force_history():
+    generator = torch.Generator().manual_seed(0)
+    history = torch.zeros(NUM_ENVS, HISTORY_LENGTH, NUM_BODIES, 3)
+    sensor = SimpleNamespace(
+        device="cpu", data=SimpleNamespace(net_forces_w_history=history, net_forces_w=history[:, 0])
+    )
+    robot = SimpleNamespace(data=SimpleNamespace(body_lin_vel_w=torch.zeros(NUM_ENVS, NUM_BODIES, 3)))
+    env = Env(Scene(robot, {"contact_forces": sensor}))
+
+    for _ in range(5):
+        # contact forces of a few hundred newtons, zero for about half of the bodies, updated in place
+        forces = torch.randn(history.shape, generator=generator) * 200.0
+        history.copy_(forces * (torch.rand(history.shape[:3] + (1,), generator=generator) < 0.5))
+        robot.data.body_lin_vel_w.copy_(torch.randn(robot.data.body_lin_vel_w.shape, generator=generator))
+        env.common_step_counter += 1
+        expected, actual = _terms_from_forces(env), _terms(env)
+        for name in expected:
+            torch.testing.assert_close(actual[name], expected[name], msg=name)
@@ -0,0 +1,72 @@
+"""Tests of the chunked csv reader of :class:`unitree_rl_lab.motion.CsvMotionLoader`."""
+
+import numpy as np
+import pytest
+import torch
+
+from unitree_rl_lab.motion import CsvMotionLoader, compute_frame_blend, read_csv_chunks, so3_derivative
+from unitree_rl_lab.utils.quat_kernels import quat_slerp
+
+INPUT_FPS = 120
+
+
+@pytest.fixture(scope="module")
+def motion_file(tmp_path_factory) -> str:
+    # root position, root orientation in (x, y, z, w) order and joint positions, with sign flips of the orientation
+    num_frames = 1000
+    t = np.arange(num_frames)[:, None] / INPUT_FPS
+    yaw = 0.8 * t[:, 0]
+    sign = np.where(np.arange(num_frames) % 7 == 3, -1.0, 1.0)[:, None]
+    root = np.concatenate([0.5 * t, 0 * t, 0.8 + 0.02 * np.sin(t)], axis=1)
+    quat = sign * np.stack([0 * yaw, 0.1 * np.sin(yaw), np.sin(yaw / 2), np.cos(yaw / 2)], axis=1)
+    quat /= np.linalg.norm(quat, axis=1, keepdims=True)
+    dof = 0.3 * np.sin(t * np.arange(1, 8) * 0.5)
+    path = tmp_path_factory.mktemp("csv") / "motion.csv"
+    np.savetxt(path, np.concatenate([root, quat, dof], axis=1), delimiter=",", fmt="%.6f")
+    return str(path)
+
+
+def _load(motion_file: str, output_fps: int, frame_range: tuple[int, int] | None) -> dict[str, torch.Tensor]:
+    """Reads the whole file and resamples it at once, as the loader did before it streamed the file."""
+    motion = torch.from_numpy(np.loadtxt(motion_file, delimiter=",", dtype=np.float32))
+    if frame_range is not None:
+        motion = motion[frame_range[0] - 1 : frame_range[1]]
+    duration = (motion.shape[0] - 1) / INPUT_FPS
+    times = torch.arange(0, duration, 1.0 / output_fps, dtype=torch.float64)
+    index_0, index_1, blend = compute_frame_blend(times, duration, motion.shape[0])
+    blend = blend.float().unsqueeze(1)
+    rots = motion[:, [6, 3, 4, 5]]
+    return {
+        "motion_base_poss": torch.lerp(motion[index_0, :3], motion[index_1, :3], blend),
+        "motion_base_rots": quat_slerp(rots[index_0], rots[index_1], blend),
+        "motion_dof_poss": torch.lerp(motion[index_0, 7:], motion[index_1, 7:], blend),
+    }
+
+
+@pytest.mark.parametrize("frame_range", [None, (101, 733)])
+def test_chunks_match_loadtxt(motion_file, frame_range):
+    expected = np.loadtxt(motion_file, delimiter=",", dtype=np.float32)
+    if frame_range is not None:
+        expected = expected[frame_range[0] - 1 : frame_range[1]]
+    chunks = list(read_csv_chunks(motion_file, frame_range, chunk_frames=128))
+    assert all(chunk.dtype == np.float32 for chunk in chunks)
+    assert [len(chunk) for chunk in chunks[:-1]] == [128] * (len(chunks) - 1)
+    np.testing.assert_array_equal(np.concatenate(chunks), expected)
+
+
+@pytest.mark.parametrize("output_fps", [30, 50])
+@pytest.mark.parametrize("frame_range", [None, (101, 733)])
+@pytest.mark.parametrize("chunk_frames", [1, 97, 16384])
+def test_streaming_loader_matches_whole_file(motion_file, output_fps, frame_range, chunk_frames):
+    loader = CsvMotionLoader(motion_file, INPUT_FPS, output_fps, frame_range=frame_range, chunk_frames=chunk_frames)
+    expected = _load(motion_file, output_fps, frame_range)
+    assert loader.output_frames == expected["motion_base_poss"].shape[0]
+    for name, value in expected.items():
+        actual = getattr(loader, name)
+        if name == "motion_base_rots":
+            # quaternions are only defined up to sign
+            actual = actual * torch.sign((actual * value).sum(dim=-1, keepdim=True))
+        torch.testing.assert_close(actual, value, atol=1e-5, rtol=1e-5, msg=name)
+    torch.testing.assert_close(
+        loader.motion_base_ang_vels, so3_derivative(loader.motion_base_rots, 1.0 / output_fps), atol=0, rtol=0
+    )
@@ -0,0 +1,222 @@
+"""Tests of :class:`unitree_rl_lab.utils.fused_rewards.FusedRewardEvaluator`.
+
+A fake reward manager with terms shaped like the locomotion rewards is evaluated on random robot data, and the reward,
+the episodic sums and the step rewards of the fused evaluator must match the ones of the loop of
+:meth:`RewardManager.compute`. A class term, a term with a data-dependent branch and two terms reading a per-step
+cache, one of them listed in ``eager_terms``, are included; they must be evaluated eagerly, for the expected reason.
+"""
+
+import pytest
+import torch
+from types import SimpleNamespace
+
+from unitree_rl_lab.utils.fused_rewards import FusedRewardEvaluator
+
+NUM_ENVS, NUM_JOINTS = 64, 23
+
+
+def track_lin_vel_xy_exp(env, std: float):
+    error = torch.sum(torch.square(env.command[:, :2] - env.data.root_lin_vel_b[:, :2]), dim=1)
+    return torch.exp(-error / std**2)
+
+
+def lin_vel_z_l2(env):
+    return torch.square(env.data.root_lin_vel_b[:, 2])
+
+
+def joint_acc_l2(env):
+    return torch.sum(torch.square(env.data.joint_acc), dim=1)
+
+
+def action_rate_l2(env):
+    return torch.sum(torch.square(env.action - env.prev_action), dim=1)
+
+
+def joint_pos_limits(env):
+    out_of_limits = -(env.data.joint_pos - env.data.soft_joint_pos_limits[..., 0]).clip(max=0.0)
+    out_of_limits += (env.data.joint_pos - env.data.soft_joint_pos_limits[..., 1]).clip(min=0.0)
+    return torch.sum(out_of_limits, dim=1)
+
+
+def base_height_l2(env, target_height: float):
+    return torch.square(env.data.root_pos_w[:, 2] - target_height)
+
+
+def is_alive(env):
+    return (~env.terminated).float()
+
+
+def forward_speed_bonus(env):
+    # branches on the data, which breaks the graph
+    if env.data.root_lin_vel_b[:, 0].mean() > 0.0:
+        return env.data.root_lin_vel_b[:, 0].clip(min=0.0)
+    return torch.zeros(env.num_envs, device=env.device)
+
+
+_STEP_CACHE = {}
+
+
+def _joint_speed(env):
+    # refreshed once per step, as the contact features of the locomotion rewards
+    if _STEP_CACHE.get("step") != env.common_step_counter:
+        _STEP_CACHE["step"] = env.common_step_counter
+        _STEP_CACHE["speed"] = env.data.joint_vel.abs()
+    return _STEP_CACHE["speed"]
+
+
+def joint_speed_l1(env):
+    return torch.sum(_joint_speed(env), dim=1)
+
+
+def joint_speed_max(env):
+    return torch.amax(_joint_speed(env), dim=1)
+
+
+class SmoothedJointVel:
+    """Keeps a running average of the joint velocities, as a ``ManagerTermBase`` of Isaac Lab."""
+
+    def __init__(self, cfg, env):
+        self.average = torch.zeros_like(env.data.joint_vel)
+
+    def __call__(self, env):
+        self.average.mul_(0.9).add_(0.1 * env.data.joint_vel)
+        return torch.sum(torch.square(self.average), dim=1)
+
+
+TERMS = {
+    "track_lin_vel_xy": (track_lin_vel_xy_exp, 1.0, {"std": 0.5}),
+    "lin_vel_z": (lin_vel_z_l2, -2.0, {}),
+    "joint_acc": (joint_acc_l2, -2.5e-7, {}),
+    "action_rate": (action_rate_l2, -0.01, {}),
+    "joint_pos_limits": (joint_pos_limits, -5.0, {}),
+    "base_height": (base_height_l2, -10.0, {"target_height": 0.78}),
+    "alive": (is_alive, 0.15, {}),
+    "undesired": (joint_acc_l2, 0.0, {}),
+    "forward_speed": (forward_speed_bonus, 0.1, {}),
+    "joint_speed": (joint_speed_l1, -1e-3, {}),
+    "joint_speed_max": (joint_speed_max, -1e-3, {}),
+    "smoothed_joint_vel": (SmoothedJointVel, -0.001, {}),
+}
+
+FALLBACK_REASONS = {
+    "forward_speed": "compile failed",
+    "joint_speed": "recompiles every step",
+    "joint_speed_max": "marked eager",
+    "smoothed_joint_vel": "class term",
+}
+
+
+def _make_env():
+    data = SimpleNamespace(
+        root_lin_vel_b=torch.zeros(NUM_ENVS, 3),
+        root_pos_w=torch.zeros(NUM_ENVS, 3),
+        joint_pos=torch.zeros(NUM_ENVS, NUM_JOINTS),
+        joint_vel=torch.zeros(NUM_ENVS, NUM_JOINTS),
+        joint_acc=torch.zeros(NUM_ENVS, NUM_JOINTS),
+        soft_joint_pos_limits=torch.tensor([-1.0, 1.0]).expand(NUM_ENVS, NUM_JOINTS, 2).clone(),
+    )
+    return SimpleNamespace(
+        num_envs=NUM_ENVS,
+        device="cpu",
+        common_step_counter=0,
+        data=data,
+        command=torch.zeros(NUM_ENVS, 3),
+        action=torch.zeros(NUM_ENVS, NUM_JOINTS),
+        prev_action=torch.zeros(NUM_ENVS, NUM_JOINTS),
+        terminated=torch.zeros(NUM_ENVS, dtype=torch.bool),
+    )
+
+
+def _make_manager(env):
+    """A reward manager with the terms of :data:`TERMS` and the buffers of the reward manager of Isaac Lab."""
+    manager = SimpleNamespace()
+    manager._env, manager.device, manager.num_envs = env, env.device, env.num_envs
+    manager._term_names, manager._term_cfgs = [], []
+    for name, (func, weight, params) in TERMS.items():
+        term_cfg = SimpleNamespace(func=func, weight=weight, params=params)
+        if isinstance(func, type):
+            term_cfg.func = func(term_cfg, env)
+        manager._term_names.append(name)
+        manager._term_cfgs.append(term_cfg)
+    manager._episode_sums = {name: torch.zeros(env.num_envs) for name in manager._term_names}
+    manager._reward_buf = torch.zeros(env.num_envs)
+    manager._step_reward = torch.zeros(env.num_envs, len(manager._term_names))
+    return manager
+
+
+def _compute(manager, dt: float) -> torch.Tensor:
+    """The loop of :meth:`RewardManager.compute`."""
+    manager._reward_buf[:] = 0.0
+    for term_idx, (name, term_cfg) in enumerate(zip(manager._term_names, manager._term_cfgs)):
+        if term_cfg.weight == 0.0:
+            manager._step_reward[:, term_idx] = 0.0
+            continue
+        value = term_cfg.func(manager._env, **term_cfg.params) * term_cfg.weight * dt
+        manager._reward_buf += value
+        manager._episode_sums[name] += value
+        manager._step_reward[:, term_idx] = value / dt
+    return manager._reward_buf
+
+
+def _step(env, generator: torch.Generator):
+    # in place, as the simulation updates the buffers
+    for value in (env.command, env.action, env.prev_action, *vars(env.data).values()):
+        if value is not env.data.soft_joint_pos_limits:
+            value.copy_(torch.randn(value.shape, generator=generator))
+    env.data.root_pos_w[:, 2] += 0.78
+    env.terminated.copy_(torch.rand(env.num_envs, generator=generator) < 0.01)
+    env.common_step_counter += 1
+
+
+@pytest.mark.parametrize("backend", ["eager", "compile"])
+def test_fused_evaluator_matches_reward_manager(backend):
+    env = _make_env()
+    eager_manager, fused_manager = _make_manager(env), _make_manager(env)
+    evaluator = FusedRewardEvaluator(
+        fused_manager, backend=backend, eager_terms=["joint_speed_max"], validation_steps=3, validation_interval=10
+    )
+    generator = torch.Generator().manual_seed(0)
+
+    for i in range(30):
+        _step(env, generator)
+        if i == 15:
+            # a curriculum enables a term during training
+            for manager in (eager_manager, fused_manager):
+                manager._term_cfgs[manager._term_names.index("undesired")].weight = -1e-7
+        expected = _compute(eager_manager, 0.02).clone()
+        actual = evaluator.compute(0.02)
+        torch.testing.assert_close(actual, expected, msg=f"reward at step {i}")
+        torch.testing.assert_close(fused_manager._step_reward, eager_manager._step_reward, msg=f"step {i}")
+        for name in eager_manager._term_names:
+            torch.testing.assert_close(
+                fused_manager._episode_sums[name], eager_manager._episode_sums[name], msg=f"{name} at step {i}"
+            )
+        # as RewardManager.reset, which zeroes the episodic sums in place
+        env_ids = torch.nonzero(env.terminated).squeeze(-1)
+        for manager in (eager_manager, fused_manager):
+            for name in manager._episode_sums:
+                manager._episode_sums[name][env_ids] = 0.0
+
+    for name in FALLBACK_REASONS:
+        assert name not in evaluator._fused_names, name
+    if backend == "compile":
+        assert evaluator._fused_names == set(TERMS) - set(FALLBACK_REASONS)
+        for name, reason in FALLBACK_REASONS.items():
+            assert evaluator.fallback_reasons[name].startswith(reason), (name, evaluator.fallback_reasons[name])
+
+
+def test_costs_are_measured_on_the_first_calls():
+    env = _make_env()
+    evaluator = FusedRewardEvaluator(_make_manager(env), backend="compile", validation_steps=2, validation_interval=0)
+    generator = torch.Generator().manual_seed(0)
+    for _ in range(5):
+        _step(env, generator)
+        evaluator.compute(0.02)
+
+    active = [name for name in TERMS if name != "undesired"]
+    assert set(evaluator.term_costs) == set(active)
+    assert evaluator.fused_cost is not None and evaluator.fused_cost > 0.0
+    report = evaluator.format_report()
+    for name in active:
+        assert name in report
+    assert "fused terms, compile" in report
@@ -0,0 +1,226 @@
+"""Tests of :class:`unitree_rl_lab.motion.UrdfKinematics`.
+
+The mimic command indexes the bodies of the motion archives with the body indexes of the Isaac Lab articulation, so
+the body and joint order of the kinematics must be the one of the articulation. The poses and velocities are checked
+against a plain homogeneous-transform walk of the URDF and against finite differences.
+"""
+
+import math
+import numpy as np
+import pytest
+import torch
+import xml.etree.ElementTree as ET
+
+from unitree_rl_lab.motion import MOTION_ROBOTS, UrdfKinematics
+from unitree_rl_lab.utils.quat_kernels import axis_angle_from_quat, quat_inv, quat_mul
+
+# joint order of the M3 articulation, as recorded from Isaac Sim in scripts/mimic/npz_to_csv.py
+M3_ISAAC_JOINT_NAMES = [
+    f"{name}_joint"
+    for name in [
+        "left_hip_pitch", "right_hip_pitch", "waist_yaw",
+        "left_hip_roll", "right_hip_roll", "left_shoulder_pitch", "right_shoulder_pitch",
+        "left_hip_yaw", "right_hip_yaw", "left_shoulder_roll", "right_shoulder_roll",
+        "left_knee", "right_knee", "left_shoulder_yaw", "right_shoulder_yaw",
+        "left_ankle_pitch", "right_ankle_pitch", "left_elbow_pitch", "right_elbow_pitch",
+        "left_ankle_roll", "right_ankle_roll", "left_elbow_yaw", "right_elbow_yaw",
+    ]
+]  # fmt: skip
+
+ROBOTS = [name for name, robot in MOTION_ROBOTS.items() if robot.urdf_path is not None]
+
+TREE_URDF = """<robot name="tree">
+  <link name="base"><inertial><origin xyz="0.1 0 0"/><mass value="2.0"/></inertial></link>
+  <link name="imu"><inertial><origin xyz="0 0 0.2"/><mass value="1.0"/></inertial></link>
+  <link name="arm"><inertial><origin xyz="0 0 -0.1"/><mass value="1.0"/></inertial></link>
+  <link name="hand"><inertial><origin xyz="0 0 0"/><mass value="1.0"/></inertial></link>
+  <link name="slider"/>
+  <joint name="imu_joint" type="fixed">
+    <parent link="base"/><child link="imu"/><origin xyz="0 0 0.1"/>
+  </joint>
+  <joint name="arm_joint" type="revolute">
+    <parent link="base"/><child link="arm"/><origin xyz="0 0.2 0" rpy="0.3 0 0"/><axis xyz="0 1 0"/>
+    <limit lower="-1.0" upper="2.0"/>
+  </joint>
+  <joint name="hand_joint" type="fixed">
+    <parent link="arm"/><child link="hand"/><origin xyz="0 0 -0.3"/>
+  </joint>
+  <joint name="slider_joint" type="prismatic">
+    <parent link="hand"/><child link="slider"/><origin xyz="0.1 0 0"/><axis xyz="1 0 0"/>
+    <limit lower="0.0" upper="0.5"/>
+  </joint>
+</robot>
+"""
+
+
+def _rotation(rpy) -> np.ndarray:
+    roll, pitch, yaw = rpy
+    rx = np.array([[1, 0, 0], [0, np.cos(roll), -np.sin(roll)], [0, np.sin(roll), np.cos(roll)]])
+    ry = np.array([[np.cos(pitch), 0, np.sin(pitch)], [0, 1, 0], [-np.sin(pitch), 0, np.cos(pitch)]])
+    rz = np.array([[np.cos(yaw), -np.sin(yaw), 0], [np.sin(yaw), np.cos(yaw), 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def _axis_rotation(axis: np.ndarray, angle: float) -> np.ndarray:
+    k = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    return np.eye(3) + np.sin(angle) * k + (1 - np.cos(angle)) * k @ k
+
+
+def _quat_matrix(q: np.ndarray) -> np.ndarray:
+    w, x, y, z = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ])  # fmt: skip
+
+
+def _matrices(quats: torch.Tensor) -> torch.Tensor:
+    matrices = np.stack([_quat_matrix(q) for q in quats.reshape(-1, 4).numpy()])
+    return torch.from_numpy(matrices).reshape(*quats.shape[:-1], 3, 3).to(quats.dtype)
+
+
+def _vector(element, attribute: str, default: str) -> np.ndarray:
+    return np.array([float(v) for v in (default if element is None else element.get(attribute, default)).split()])
+
+
+def _link_transforms(urdf_path: str, root_transform: np.ndarray, joint_pos: dict[str, float]) -> dict[str, np.ndarray]:
+    """World transforms of all URDF links, by a recursive walk of the joints."""
+    joints = ET.parse(urdf_path).getroot().findall("joint")
+    children = {}
+    for joint in joints:
+        children.setdefault(joint.find("parent").get("link"), []).append(joint)
+    root = (
+        {joint.find("parent").get("link") for joint in joints} - {j.find("child").get("link") for j in joints}
+    ).pop()
+
+    transforms = {root: root_transform}
+    stack = [root]
+    while stack:
+        link = stack.pop()
+        for joint in children.get(link, []):
+            origin = np.eye(4)
+            origin[:3, :3] = _rotation(_vector(joint.find("origin"), "rpy", "0 0 0"))
+            origin[:3, 3] = _vector(joint.find("origin"), "xyz", "0 0 0")
+            motion = np.eye(4)
+            axis = _vector(joint.find("axis"), "xyz", "1 0 0")
+            axis = axis / np.linalg.norm(axis)
+            if joint.get("type") in ("revolute", "continuous"):
+                motion[:3, :3] = _axis_rotation(axis, joint_pos[joint.get("name")])
+            elif joint.get("type") == "prismatic":
+                motion[:3, 3] = axis * joint_pos[joint.get("name")]
+            child = joint.find("child").get("link")
+            transforms[child] = transforms[link] @ origin @ motion
+            stack.append(child)
+    return transforms
+
+
+def _random_root(generator: torch.Generator, num_frames: int) -> tuple[torch.Tensor, torch.Tensor]:
+    root_pos = torch.randn(num_frames, 3, generator=generator)
+    root_quat = torch.randn(num_frames, 4, generator=generator)
+    return root_pos, root_quat / root_quat.norm(dim=-1, keepdim=True)
+
+
+def test_m3_joint_order_matches_isaac_sim():
+    kinematics = UrdfKinematics(MOTION_ROBOTS["m3"].urdf_path)
+    assert kinematics.joint_names == M3_ISAAC_JOINT_NAMES
+
+
+@pytest.mark.parametrize("robot", ROBOTS)
+def test_body_order_follows_joint_order(robot):
+    # the articulation lists the root and then the child link of every joint, in joint order
+    urdf_path = MOTION_ROBOTS[robot].urdf_path
+    kinematics = UrdfKinematics(urdf_path)
+    child_links = {joint.get("name"): joint.find("child").get("link") for joint in ET.parse(urdf_path).iter("joint")}
+    assert kinematics.body_names[1:] == [child_links[name] for name in kinematics.joint_names]
+    assert kinematics.body_names[0] not in child_links.values()
+    assert sorted(kinematics.joint_names) == sorted(MOTION_ROBOTS[robot].joint_names)
+
+
+def test_parallel_ankle_order():
+    # the parallel-ankle URDF swaps the ankle roll and pitch joints, which ColumnPermutation handles by name
+    names = UrdfKinematics(MOTION_ROBOTS["m3_parallel"].urdf_path).joint_names
+    assert names != M3_ISAAC_JOINT_NAMES
+    assert sorted(names) == sorted(M3_ISAAC_JOINT_NAMES)
+
+
+@pytest.mark.parametrize("robot", ROBOTS)
+def test_poses_match_link_transforms(robot):
+    urdf_path = MOTION_ROBOTS[robot].urdf_path
+    kinematics = UrdfKinematics(urdf_path)
+    generator = torch.Generator().manual_seed(0)
+    num_frames = 5
+    root_pos, root_quat = _random_root(generator, num_frames)
+    joint_pos = torch.rand(num_frames, kinematics.num_joints, generator=generator) * 2 - 1
+    states = kinematics.forward(root_pos, root_quat, joint_pos)
+
+    for frame in range(num_frames):
+        root_transform = np.eye(4)
+        root_transform[:3, :3] = _quat_matrix(root_quat[frame].numpy())
+        root_transform[:3, 3] = root_pos[frame].numpy()
+        positions = dict(zip(kinematics.joint_names, joint_pos[frame].tolist()))
+        transforms = _link_transforms(urdf_path, root_transform, positions)
+        for body, name in enumerate(kinematics.body_names):
+            np.testing.assert_allclose(states["body_pos_w"][frame, body], transforms[name][:3, 3], atol=1e-5)
+            np.testing.assert_allclose(
+                _quat_matrix(states["body_quat_w"][frame, body].numpy()), transforms[name][:3, :3], atol=1e-5
+            )
+
+
+def test_velocities_match_finite_differences():
+    kinematics = UrdfKinematics(MOTION_ROBOTS["m3"].urdf_path)
+    generator = torch.Generator().manual_seed(1)
+    frequency = 1.0 + torch.rand(kinematics.num_joints, generator=generator)
+    phase = 6.0 * torch.rand(kinematics.num_joints, generator=generator)
+    root_ang_vel = torch.tensor([[0.3, -0.2, 0.5]])
+    base_quat = torch.tensor([[0.9, 0.1, -0.3, 0.2]])
+    base_quat = base_quat / base_quat.norm()
+
+    def pose(t: float) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        angle = root_ang_vel.norm() * t
+        rotation = torch.cat(
+            [torch.cos(angle / 2).reshape(1, 1), torch.sin(angle / 2) * root_ang_vel / root_ang_vel.norm()], -1
+        )
+        root_pos = torch.tensor([[0.5 * t, 0.1 * math.sin(t), 0.8 + 0.02 * math.sin(4 * t)]])
+        return root_pos, quat_mul(rotation, base_quat), 0.4 * torch.sin(frequency * t + phase)[None]
+
+    def com_pos_w(states: dict[str, torch.Tensor]) -> torch.Tensor:
+        return states["body_pos_w"] + torch.einsum(
+            "tbij,bj->tbi", _matrices(states["body_quat_w"]), kinematics.body_coms
+        )
+
+    t, h = 0.7, 1e-3
+    before, after = kinematics.forward(*pose(t - h)), kinematics.forward(*pose(t + h))
+    # the root linear velocity is the one of the root center of mass
+    root_lin_vel = (com_pos_w(after)[:, 0] - com_pos_w(before)[:, 0]) / (2 * h)
+    joint_vel = 0.4 * frequency * torch.cos(frequency * t + phase)[None]
+    states = kinematics.forward(*pose(t), root_lin_vel, root_ang_vel, joint_vel)
+
+    lin_vel = (com_pos_w(after) - com_pos_w(before)) / (2 * h)
+    ang_vel = axis_angle_from_quat(quat_mul(after["body_quat_w"], quat_inv(before["body_quat_w"]))) / (2 * h)
+    torch.testing.assert_close(states["body_lin_vel_w"], lin_vel, atol=2e-3, rtol=0)
+    torch.testing.assert_close(states["body_ang_vel_w"], ang_vel, atol=2e-3, rtol=0)
+
+
+def test_fixed_joints_are_merged(tmp_path):
+    urdf_path = tmp_path / "tree.urdf"
+    urdf_path.write_text(TREE_URDF)
+
+    kinematics = UrdfKinematics(str(urdf_path))
+    # the imu is merged into the base and the hand into the arm, which the slider is attached to
+    assert kinematics.body_names == ["base", "arm", "slider"]
+    assert kinematics.joint_names == ["arm_joint", "slider_joint"]
+    torch.testing.assert_close(kinematics.body_masses, torch.tensor([3.0, 2.0, 0.0]))
+    expected_coms = torch.tensor([[0.2 / 3, 0.0, 0.1], [0.0, 0.0, -0.2], [0.0, 0.0, 0.0]])
+    torch.testing.assert_close(kinematics.body_coms, expected_coms)
+    torch.testing.assert_close(kinematics.joint_limits, torch.tensor([[-1.0, 2.0], [0.0, 0.5]]))
+
+    identity = torch.tensor([[1.0, 0.0, 0.0, 0.0]])
+    states = kinematics.forward(torch.zeros(1, 3), identity, torch.tensor([[0.0, 0.25]]))
+    # the slider origin is 0.3 below the arm joint, which is rolled by 0.3 rad, and moves along x
+    expected = torch.tensor([0.35, 0.2 + 0.3 * np.sin(0.3), -0.3 * np.cos(0.3)], dtype=torch.float32)
+    torch.testing.assert_close(states["body_pos_w"][0, 2], expected)
+
+    unmerged = UrdfKinematics(str(urdf_path), merge_fixed_joints=False)
+    assert unmerged.body_names == ["base", "imu", "arm", "hand", "slider"]
+    assert unmerged.joint_names == kinematics.joint_names
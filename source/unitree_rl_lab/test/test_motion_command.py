@@ -0,0 +1,129 @@
+"""Tests of the robot frame cache and the adaptive sampling of the mimic :class:`MotionCommand`, which needs Isaac Lab."""
+
+import math
+import pytest
+import torch
+from types import SimpleNamespace
+
+pytest.importorskip("isaaclab")
+
+from unitree_rl_lab.tasks.mimic.mdp import events  # noqa: E402
+from unitree_rl_lab.tasks.mimic.mdp.commands import MotionCommand  # noqa: E402
+
+NUM_ENVS, NUM_BODIES = 4, 6
+
+
+def _command() -> MotionCommand:
+    """A command with only the state of its robot frame cache, without a scene or motion files."""
+    command = object.__new__(MotionCommand)
+    command._env = SimpleNamespace(device="cpu", num_envs=NUM_ENVS, common_step_counter=0)
+    command._env.command_manager = SimpleNamespace(get_term=lambda name: command)
+    command.cfg = SimpleNamespace(debug_frame_cache=False)
+    command.robot = SimpleNamespace(
+        data=SimpleNamespace(
+            body_pos_w=torch.zeros(NUM_ENVS, NUM_BODIES, 3), body_lin_vel_w=torch.zeros(NUM_ENVS, NUM_BODIES, 3)
+        )
+    )
+    command.body_indexes = torch.tensor([0, 2, 5])
+    command._frame_versions = {}
+    command._robot_write_version = 0
+    command._robot_body_pos_w = torch.zeros(NUM_ENVS, 3, 3)
+    command._robot_body_lin_vel_w = torch.zeros(NUM_ENVS, 3, 3)
+    return command
+
+
+def test_frames_are_cached_within_a_step():
+    command = _command()
+    command.robot_body_lin_vel_w
+    # the simulation only changes the data between steps
+    command.robot.data.body_lin_vel_w.fill_(3.0)
+    torch.testing.assert_close(command.robot_body_lin_vel_w, torch.zeros(NUM_ENVS, 3, 3))
+    command._env.common_step_counter += 1
+    torch.testing.assert_close(command.robot_body_lin_vel_w, torch.full((NUM_ENVS, 3, 3), 3.0))
+
+
+def test_pushes_invalidate_the_robot_frames(monkeypatch):
+    command = _command()
+    torch.testing.assert_close(command.robot_body_lin_vel_w, torch.zeros(NUM_ENVS, 3, 3))
+    torch.testing.assert_close(command.robot_body_pos_w, torch.zeros(NUM_ENVS, 3, 3))
+
+    # an interval event pushes the robot after the command was computed, within the same step
+    def push(env, env_ids, velocity_range, asset_cfg):
+        command.robot.data.body_lin_vel_w[env_ids] = 1.0
+
+    monkeypatch.setattr(events.isaaclab_events, "push_by_setting_velocity", push)
+    events.push_by_setting_velocity(command._env, torch.arange(NUM_ENVS), {"x": (-0.5, 0.5)})
+    torch.testing.assert_close(command.robot_body_lin_vel_w, torch.ones(NUM_ENVS, 3, 3))
+    command.robot.data.body_pos_w.fill_(2.0)
+    command.invalidate_robot_frames()
+    torch.testing.assert_close(command.robot_body_pos_w, torch.full((NUM_ENVS, 3, 3), 2.0))
+
+
+def test_failed_refills_are_not_cached():
+    command = _command()
+    data = command.robot.data
+    command.robot.data = SimpleNamespace(body_lin_vel_w=torch.zeros(NUM_ENVS, 2, 3))
+    with pytest.raises((IndexError, RuntimeError)):
+        command.robot_body_lin_vel_w
+    command.robot.data = data
+    data.body_lin_vel_w.fill_(4.0)
+    torch.testing.assert_close(command.robot_body_lin_vel_w, torch.full((NUM_ENVS, 3, 3), 4.0))
+
+
+def _sampling_command(num_envs: int) -> MotionCommand:
+    """A command with the adaptive sampling bins of three clips at 50 fps, played one frame per step."""
+    command = object.__new__(MotionCommand)
+    command._env = SimpleNamespace(
+        device="cpu",
+        num_envs=num_envs,
+        termination_manager=SimpleNamespace(terminated=torch.zeros(num_envs, dtype=bool)),
+    )
+    command.cfg = SimpleNamespace(
+        interpolate_frames=False,
+        adaptive_kernel_size=3,
+        adaptive_lambda=0.8,
+        adaptive_uniform_ratio=0.1,
+        adaptive_alpha=0.001,
+    )
+    command.motion = SimpleNamespace(num_clips=3, clip_lengths=torch.tensor([400, 120, 260]))
+    command.clip_ids = torch.zeros(num_envs, dtype=torch.long)
+    command.time_steps = torch.zeros(num_envs, dtype=torch.long)
+    command.time_step_totals = torch.zeros(num_envs, dtype=torch.long)
+    command.frame_phase = torch.zeros(num_envs)
+    command.metrics = {
+        name: torch.zeros(num_envs) for name in ("sampling_entropy", "sampling_top1_prob", "sampling_top1_bin")
+    }
+    command._update_frame_indexes = lambda: torch.index_select(
+        command.motion.clip_lengths, 0, command.clip_ids, out=command.time_step_totals
+    )
+    command._init_sampling_bins(0.02)
+    return command
+
+
+def test_sampling_metrics_follow_the_failures():
+    num_envs = 256
+    command = _sampling_command(num_envs)
+    assert command.bin_count == 9 + 3 + 6
+    generator = torch.Generator().manual_seed(0)
+
+    for _ in range(20):
+        # every env resets, a quarter of them failed at a random time of their clip
+        command.time_steps.copy_((torch.rand(num_envs, generator=generator) * command.time_step_totals).long())
+        command._env.termination_manager.terminated.copy_(torch.rand(num_envs, generator=generator) < 0.25)
+        command._adaptive_sampling(torch.arange(num_envs))
+        command._update_bin_failed_count()
+
+    # the metrics of the last reset are the ones of the smoothed EMA at the table update, with the uniform share
+    smoothed = (command.bin_failed_count[command._kernel_neighbors] * command.kernel).sum(-1)
+    probabilities = smoothed + command.cfg.adaptive_uniform_ratio / command.bin_count
+    probabilities /= probabilities.sum()
+    entropy = -(probabilities * probabilities.log()).sum() / math.log(command.bin_count)
+    command._update_sampling_table()
+    command._adaptive_sampling(torch.arange(num_envs))
+    torch.testing.assert_close(command.metrics["sampling_entropy"], entropy.expand(num_envs))
+    torch.testing.assert_close(command.metrics["sampling_top1_prob"], probabilities.max().expand(num_envs))
+    torch.testing.assert_close(
+        command.metrics["sampling_top1_bin"], (probabilities.argmax() / command.bin_count).expand(num_envs)
+    )
+    assert entropy < 1.0
+    assert torch.all(command.time_steps < command.time_step_totals)
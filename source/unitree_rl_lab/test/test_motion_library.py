@@ -0,0 +1,71 @@
+"""Tests of the :class:`MotionLibrary` of the mimic command, which needs Isaac Lab."""
+
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("isaaclab")
+
+from unitree_rl_lab.motion import VELOCITY_SOURCES, save_compact_motion  # noqa: E402
+from unitree_rl_lab.tasks.mimic.mdp.commands import MotionLibrary, MotionLoader  # noqa: E402
+
+BODY_INDEXES = [0, 3, 5]
+
+
+def _arrays(num_frames: int, fps: int, seed: int, velocities=tuple(VELOCITY_SOURCES)) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_frames)[:, None] / fps
+    angle = t[..., None] * rng.uniform(0.5, 1.5, (6, 1))
+    arrays = {
+        "fps": np.array([fps]),
+        "joint_pos": np.sin(t * rng.uniform(1.0, 2.0, 7)).astype(np.float32),
+        "body_pos_w": np.cos(angle + rng.uniform(0, 6, (6, 3))).astype(np.float32),
+        "body_quat_w": np.concatenate([np.cos(angle / 2), np.sin(angle / 2) * np.array([0, 0.6, 0.8])], -1),
+    }
+    arrays["body_quat_w"] = arrays["body_quat_w"].astype(np.float32)
+    for name in velocities:
+        shape = arrays[VELOCITY_SOURCES[name]].shape[:-1] + (3,) if name != "joint_vel" else arrays["joint_pos"].shape
+        arrays[name] = rng.standard_normal(shape).astype(np.float32)
+    return arrays
+
+
+@pytest.fixture
+def motion_files(tmp_path) -> list[str]:
+    # a clip with all velocities, a single frame without velocities and a compact clip without angular velocities
+    paths = [tmp_path / "walk.npz", tmp_path / "pose.npz", tmp_path / "turn.npz"]
+    np.savez(paths[0], **_arrays(40, 50, 0))
+    np.savez(paths[1], **_arrays(1, 50, 1, velocities=()))
+    save_compact_motion(str(paths[2]), _arrays(25, 30, 2, velocities=("joint_vel", "body_lin_vel_w")))
+    return [str(path) for path in paths]
+
+
+def test_clips_are_concatenated(motion_files):
+    library = MotionLibrary(motion_files, BODY_INDEXES, use_cache=False)
+    torch.testing.assert_close(library.clip_lengths, torch.tensor([40, 1, 25]))
+    torch.testing.assert_close(library.clip_offsets, torch.tensor([0, 40, 41]))
+    torch.testing.assert_close(library.clip_fps, torch.tensor([50.0, 50.0, 30.0]))
+    assert library.time_step_total == 66 and library.num_clips == 3
+
+    # every clip has the frames of its loader, which derives its missing velocities on its own
+    for offset, length, motion_file in zip(library.clip_offsets.tolist(), library.clip_lengths.tolist(), motion_files):
+        loader = MotionLoader(motion_file, BODY_INDEXES, use_cache=False)
+        for name in ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w"):
+            torch.testing.assert_close(
+                getattr(library, name)[offset : offset + length], getattr(loader, name), msg=f"{name} of {motion_file}"
+            )
+
+
+def test_single_clip_matches_its_loader(motion_files):
+    library = MotionLibrary(motion_files[2:], BODY_INDEXES)
+    loader = MotionLoader(motion_files[2], BODY_INDEXES)
+    assert library.body_pos_w.shape == (25, len(BODY_INDEXES), 3)
+    for name in ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w"):
+        torch.testing.assert_close(getattr(library, name), getattr(loader, name), atol=0, rtol=0, msg=name)
+
+
+def test_clips_need_the_same_joints(tmp_path, motion_files):
+    arrays = _arrays(10, 50, 3)
+    arrays["joint_pos"] = arrays["joint_pos"][:, :5]
+    np.savez(tmp_path / "other.npz", **arrays)
+    with pytest.raises(AssertionError):
+        MotionLibrary([motion_files[0], str(tmp_path / "other.npz")], BODY_INDEXES, use_cache=False)
@@ -0,0 +1,53 @@
+"""Tests of :mod:`unitree_rl_lab.motion.ops`."""
+
+import numpy as np
+import pytest
+
+from unitree_rl_lab.motion import ColumnPermutation, interpolate_frames, resample_frames
+
+
+def test_column_permutation_matches_column_loop():
+    rng = np.random.default_rng(0)
+    source_names = [f"joint_{i}" for i in range(7)]
+    # a shuffled target order with one joint the source does not have
+    target_names = [source_names[i] for i in rng.permutation(7)[:-1]] + ["extra_joint"]
+    data = rng.standard_normal((50, 7))
+    permutation = ColumnPermutation(source_names, target_names, fill_value=-1.0)
+
+    expected = np.full((50, len(target_names)), -1.0)
+    for i, name in enumerate(source_names):
+        if name in target_names:
+            expected[:, target_names.index(name)] = data[:, i]
+    np.testing.assert_array_equal(permutation(data), expected)
+    assert permutation.missing_target_names == ["extra_joint"]
+    assert permutation.unused_source_names == [name for name in source_names if name not in target_names]
+    # the inverse permutation restores the shared columns
+    restored = ColumnPermutation(target_names, source_names)(permutation(data))
+    shared = [i for i, name in enumerate(source_names) if name in target_names]
+    np.testing.assert_array_equal(restored[:, shared], data[:, shared])
+
+
+def test_column_permutation_checks_the_column_count():
+    with pytest.raises(ValueError):
+        ColumnPermutation(["a", "b"], ["b", "a"])(np.zeros((3, 3)))
+
+
+@pytest.mark.parametrize("num_frames", [1, 17, 500])
+def test_resample_matches_np_interp(num_frames):
+    data = np.random.default_rng(num_frames).standard_normal((120, 5))
+    times = np.linspace(0, data.shape[0] - 1, num_frames)
+    expected = np.stack([np.interp(times, np.arange(data.shape[0]), column) for column in data.T], axis=1)
+    np.testing.assert_allclose(resample_frames(data, num_frames), expected, rtol=0, atol=1e-12)
+
+
+def test_interpolate_along_an_inner_axis():
+    data = np.random.default_rng(0).standard_normal((3, 40, 2)).astype(np.float32)
+    positions = np.array([-0.5, 0.0, 10.25, 39.0, 39.5])
+    result = interpolate_frames(data, positions, axis=1)
+    assert result.shape == (3, 5, 2) and result.dtype == np.float32
+    np.testing.assert_allclose(result[:, 2], 0.75 * data[:, 10] + 0.25 * data[:, 11], rtol=1e-6)
+    # positions outside of the clip are extrapolated from the edge frames
+    np.testing.assert_allclose(result[:, 0], 1.5 * data[:, 0] - 0.5 * data[:, 1], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(result[:, 4], 1.5 * data[:, 39] - 0.5 * data[:, 38], rtol=1e-5, atol=1e-6)
+    # a single frame is repeated
+    np.testing.assert_array_equal(interpolate_frames(data[:, :1], positions, axis=1), data[:, [0] * 5])
@@ -0,0 +1,211 @@
+"""Tests of :mod:`unitree_rl_lab.utils.quat_kernels`.
+
+The kernels are compared with rotation matrices built from the axis and angle of the quaternions, and with the
+functions of :mod:`isaaclab.utils.math` that the mimic terms used before when Isaac Lab is installed.
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from unitree_rl_lab.utils import quat_kernels
+
+N, B = 64, 3
+
+
+def _rodrigues(rotvec: np.ndarray) -> np.ndarray:
+    angle = np.linalg.norm(rotvec)
+    if angle < 1e-12:
+        return np.eye(3)
+    x, y, z = rotvec / angle
+    k = np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]])
+    return np.eye(3) + np.sin(angle) * k + (1 - np.cos(angle)) * k @ k
+
+
+def _matrices(q: torch.Tensor) -> np.ndarray:
+    """Rotation matrices of quaternions of any norm, from their axis and angle. Shape is (..., 4) -> (..., 3, 3)."""
+    flat = q.reshape(-1, 4).numpy()
+    flat = flat / np.linalg.norm(flat, axis=-1, keepdims=True)
+    matrices = []
+    for w, *xyz in flat:
+        xyz = np.array(xyz)
+        norm = np.linalg.norm(xyz)
+        angle = 2 * np.arctan2(norm, w)
+        matrices.append(_rodrigues(xyz / norm * angle if norm > 0 else xyz))
+    return np.stack(matrices).reshape(*q.shape[:-1], 3, 3)
+
+
+def _angle(matrices: np.ndarray) -> np.ndarray:
+    return np.arccos(np.clip((np.trace(matrices, axis1=-2, axis2=-1) - 1) / 2, -1.0, 1.0))
+
+
+def _random_quat(generator: torch.Generator, *shape: int) -> torch.Tensor:
+    q = torch.randn(*shape, 4, generator=generator, dtype=torch.float64)
+    return q / q.norm(dim=-1, keepdim=True)
+
+
+def _same_sign(q: torch.Tensor, reference: torch.Tensor) -> torch.Tensor:
+    # quaternions are only defined up to sign
+    return q * torch.sign((q * reference).sum(dim=-1, keepdim=True))
+
+
+@pytest.fixture
+def generator() -> torch.Generator:
+    return torch.Generator().manual_seed(0)
+
+
+def test_products_and_inverses(generator):
+    q1, q2 = _random_quat(generator, N, B), _random_quat(generator, N, 1)
+    np.testing.assert_allclose(_matrices(quat_kernels.quat_mul(q1, q2)), _matrices(q1) @ _matrices(q2), atol=1e-12)
+    # the inverse does not need unit quaternions
+    q = 3.0 * q1
+    np.testing.assert_allclose(_matrices(quat_kernels.quat_inv(q)), _matrices(q1).swapaxes(-1, -2), atol=1e-12)
+    identity = torch.tensor([1.0, 0.0, 0.0, 0.0], dtype=torch.float64).expand(N, B, 4)
+    torch.testing.assert_close(quat_kernels.quat_mul(q, quat_kernels.quat_inv(q)), identity)
+    # L(q) p == q * p
+    torch.testing.assert_close(
+        (quat_kernels.quat_left_matrix(q1) @ q2.expand(N, B, 4).unsqueeze(-1)).squeeze(-1),
+        quat_kernels.quat_mul(q1, q2),
+    )
+
+
+def test_rotations(generator):
+    q, v = _random_quat(generator, N, B), torch.randn(N, B, 3, generator=generator, dtype=torch.float64)
+    matrices = _matrices(q)
+    np.testing.assert_allclose(quat_kernels.quat_apply(q, v), (matrices @ v.numpy()[..., None])[..., 0], atol=1e-12)
+    np.testing.assert_allclose(
+        quat_kernels.quat_apply_inverse(q, v), (matrices.swapaxes(-1, -2) @ v.numpy()[..., None])[..., 0], atol=1e-12
+    )
+    # any norm
+    np.testing.assert_allclose(quat_kernels.matrix_from_quat(2.0 * q), matrices, atol=1e-12)
+    np.testing.assert_allclose(
+        quat_kernels.matrix_6d_from_quat(2.0 * q), matrices[..., :2].reshape(N, B, 6), atol=1e-12
+    )
+
+
+def test_angles(generator):
+    q1, q2 = _random_quat(generator, N, B), _random_quat(generator, N, B)
+    # close rotations, where the angle of the dot product is inaccurate
+    q2[:, 0] = quat_kernels.quat_mul(q1[:, 0], torch.tensor([1.0, 1e-5, 0.0, 0.0], dtype=torch.float64))
+    expected = _angle(_matrices(q1) @ _matrices(q2).swapaxes(-1, -2))
+    np.testing.assert_allclose(quat_kernels.quat_error_magnitude(q1, q2), expected, atol=1e-7)
+    np.testing.assert_allclose(quat_kernels.quat_error_magnitude(q1, -q2), expected, atol=1e-7)
+
+    rotvec = quat_kernels.axis_angle_from_quat(
+        torch.cat([q1, -q1, torch.tensor([[[1.0, 0, 0, 0]]]).double().expand(N, 1, 4)], 1)
+    )
+    assert torch.all(rotvec.norm(dim=-1) <= torch.pi + 1e-12)
+    matrices = np.stack([_rodrigues(r) for r in rotvec.reshape(-1, 3).numpy()]).reshape(N, 2 * B + 1, 3, 3)
+    np.testing.assert_allclose(matrices[:, :B], _matrices(q1), atol=1e-12)
+    np.testing.assert_allclose(matrices[:, B : 2 * B], _matrices(q1), atol=1e-12)
+    np.testing.assert_allclose(rotvec[:, -1], 0.0)
+
+
+def test_yaw(generator):
+    q = _random_quat(generator, N, B)
+    matrices = _matrices(q)
+    yaw = np.arctan2(matrices[..., 1, 0], matrices[..., 0, 0])
+    np.testing.assert_allclose(
+        _matrices(quat_kernels.yaw_quat(q)),
+        np.stack([_rodrigues([0, 0, y]) for y in yaw.reshape(-1)]).reshape(N, B, 3, 3),
+        atol=1e-12,
+    )
+
+
+def test_slerp(generator):
+    q0, q1 = _random_quat(generator, N, B), _random_quat(generator, N, B)
+    # the shorter arc is taken whatever the sign of the inputs, and equal rotations are kept
+    q1[:, 1] *= -1
+    q1[:, 2] = q0[:, 2]
+    t = torch.rand(N, B, 1, generator=generator, dtype=torch.float64)
+    result = quat_kernels.quat_slerp(q0, q1, t)
+
+    torch.testing.assert_close(result.norm(dim=-1), torch.ones(N, B, dtype=torch.float64))
+    relative = _matrices(q0).swapaxes(-1, -2) @ _matrices(q1)
+    expected = []
+    for r0, rel, fraction in zip(_matrices(q0).reshape(-1, 3, 3), relative.reshape(-1, 3, 3), t.reshape(-1).numpy()):
+        # rotation vector of the relative rotation, from its skew-symmetric part
+        angle = _angle(rel)
+        axis = np.array([rel[2, 1] - rel[1, 2], rel[0, 2] - rel[2, 0], rel[1, 0] - rel[0, 1]])
+        axis = axis / max(np.linalg.norm(axis), 1e-300)
+        expected.append(r0 @ _rodrigues(axis * angle * fraction))
+    np.testing.assert_allclose(_matrices(result), np.stack(expected).reshape(N, B, 3, 3), atol=1e-9)
+
+
+def test_frame_transforms(generator):
+    anchor_pos, anchor_quat = torch.randn(N, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N)
+    body_pos, body_quat = torch.randn(N, B, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N, B)
+    pos_b, quat_b = quat_kernels.subtract_frame_transforms(
+        anchor_pos[:, None], anchor_quat[:, None], body_pos, body_quat
+    )
+    anchor_matrices = _matrices(anchor_quat)[:, None]
+    offset = (body_pos - anchor_pos[:, None]).numpy()[..., None]
+    np.testing.assert_allclose(pos_b, (anchor_matrices.swapaxes(-1, -2) @ offset)[..., 0], atol=1e-12)
+    np.testing.assert_allclose(_matrices(quat_b), anchor_matrices.swapaxes(-1, -2) @ _matrices(body_quat), atol=1e-12)
+
+
+def test_relative_body_pose(generator):
+    anchor_pos, anchor_quat = torch.randn(N, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N)
+    target_pos, target_quat = torch.randn(N, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N)
+    body_pos, body_quat = torch.randn(N, B, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N, B)
+    out_pos, out_quat = torch.empty_like(body_pos), torch.empty_like(body_quat)
+    result = quat_kernels.relative_body_pose_(
+        anchor_pos, anchor_quat, target_pos, target_quat, body_pos, body_quat, out_pos, out_quat
+    )
+    assert result[0] is out_pos and result[1] is out_quat
+
+    # the bodies are turned about z by the yaw between the anchors, and moved onto the target at the anchor height
+    delta = _matrices(target_quat) @ _matrices(anchor_quat).swapaxes(-1, -2)
+    yaw = np.arctan2(delta[:, 1, 0], delta[:, 0, 0])
+    rotation = np.stack([_rodrigues([0, 0, y]) for y in yaw])[:, None]
+    delta_pos = target_pos.clone()
+    delta_pos[:, 2] = anchor_pos[:, 2]
+    offset = (body_pos - anchor_pos[:, None]).numpy()[..., None]
+    np.testing.assert_allclose(out_pos, delta_pos[:, None].numpy() + (rotation @ offset)[..., 0], atol=1e-12)
+    np.testing.assert_allclose(_matrices(out_quat), rotation @ _matrices(body_quat), atol=1e-12)
+
+
+def test_kernels_match_isaaclab(generator):
+    math_utils = pytest.importorskip("isaaclab.utils.math")
+    anchor_pos, anchor_quat = torch.randn(N, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N)
+    target_pos, target_quat = torch.randn(N, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N)
+    body_pos, body_quat = torch.randn(N, B, 3, generator=generator, dtype=torch.float64), _random_quat(generator, N, B)
+    anchor_pos_repeat, anchor_quat_repeat = anchor_pos[:, None].repeat(1, B, 1), anchor_quat[:, None].repeat(1, B, 1)
+
+    # the relative body pose of MotionCommand._update_command
+    delta_pos = target_pos[:, None].repeat(1, B, 1)
+    delta_pos[..., 2] = anchor_pos_repeat[..., 2]
+    delta_quat = math_utils.yaw_quat(
+        math_utils.quat_mul(target_quat[:, None].repeat(1, B, 1), math_utils.quat_inv(anchor_quat_repeat))
+    )
+    out_pos, out_quat = quat_kernels.relative_body_pose_(
+        anchor_pos,
+        anchor_quat,
+        target_pos,
+        target_quat,
+        body_pos,
+        body_quat,
+        torch.empty_like(body_pos),
+        torch.empty_like(body_quat),
+    )
+    torch.testing.assert_close(out_pos, delta_pos + math_utils.quat_apply(delta_quat, body_pos - anchor_pos_repeat))
+    expected_quat = math_utils.quat_mul(delta_quat, body_quat)
+    torch.testing.assert_close(_same_sign(out_quat, expected_quat), expected_quat)
+
+    # the body poses in the anchor frame, with 6D rotations, of the observations
+    expected_pos, expected_quat = math_utils.subtract_frame_transforms(
+        anchor_pos_repeat, anchor_quat_repeat, body_pos, body_quat
+    )
+    pos_b, quat_b = quat_kernels.subtract_frame_transforms(
+        anchor_pos[:, None], anchor_quat[:, None], body_pos, body_quat
+    )
+    torch.testing.assert_close(pos_b, expected_pos)
+    torch.testing.assert_close(
+        quat_kernels.matrix_6d_from_quat(quat_b), math_utils.matrix_from_quat(expected_quat)[..., :2].reshape(N, B, 6)
+    )
+
+    # the orientation errors of the rewards and terminations
+    torch.testing.assert_close(
+        quat_kernels.quat_error_magnitude(body_quat, quat_b),
+        math_utils.quat_error_magnitude(body_quat.view(-1, 4), quat_b.view(-1, 4)).view(N, B),
+    )
@@ -0,0 +1,107 @@
+"""Tests of :func:`unitree_rl_lab.motion.validate_motions`.
+
+A library of synthetic M3 clips is written with one fault injected into some of them, and exactly these clips must be
+reported, with the right checks and first frames.
+"""
+
+import numpy as np
+import pickle
+import pytest
+import torch
+
+from unitree_rl_lab.motion import MOTION_ROBOTS, ColumnPermutation, UrdfKinematics, soft_joint_limits, validate_motions
+
+NUM_FRAMES = 200
+FRAME = NUM_FRAMES // 2
+
+
+@pytest.fixture(scope="module")
+def kinematics() -> UrdfKinematics:
+    return UrdfKinematics(MOTION_ROBOTS["m3"].urdf_path)
+
+
+@pytest.fixture(scope="module")
+def joint_limits(kinematics) -> torch.Tensor:
+    return soft_joint_limits(kinematics.joint_limits, MOTION_ROBOTS["m3"].soft_joint_pos_limit_factor)
+
+
+def _clip(kinematics: UrdfKinematics, joint_limits: torch.Tensor, seed: int, fps: int = 50) -> dict[str, np.ndarray]:
+    generator = torch.Generator().manual_seed(seed)
+    phase = 6.0 * torch.rand(kinematics.num_joints, generator=generator)
+    t = torch.arange(NUM_FRAMES, dtype=torch.float32)[:, None] / fps
+    # within the soft limits
+    center, half_range = joint_limits.mean(dim=-1), 0.4 * (joint_limits[:, 1] - joint_limits[:, 0])
+    joint_pos = center + half_range * torch.sin(1.5 * t + phase)
+    joint_vel = 1.5 * half_range * torch.cos(1.5 * t + phase)
+    yaw = 0.5 * t[:, 0]
+    root_pos = torch.stack([0.5 * t[:, 0], 0 * yaw, 0.8 + 0.02 * torch.sin(4 * t[:, 0])], dim=-1)
+    root_quat = torch.stack([torch.cos(yaw / 2), 0 * yaw, 0 * yaw, torch.sin(yaw / 2)], dim=-1)
+    root_lin_vel = torch.stack([0.5 + 0 * yaw, 0 * yaw, 0.08 * torch.cos(4 * t[:, 0])], dim=-1)
+    root_ang_vel = torch.stack([0 * yaw, 0 * yaw, 0.5 + 0 * yaw], dim=-1)
+    bodies = kinematics.forward(root_pos, root_quat, joint_pos, root_lin_vel, root_ang_vel, joint_vel)
+    arrays = {"fps": np.array([fps]), "joint_pos": joint_pos.numpy(), "joint_vel": joint_vel.numpy()}
+    return arrays | {name: value.numpy() for name, value in bodies.items()}
+
+
+def test_faulty_clips_are_reported(tmp_path, kinematics, joint_limits):
+    robot = MOTION_ROBOTS["m3"]
+    files, expected = [], {}
+    for i in range(10):
+        arrays = _clip(kinematics, joint_limits, i, fps=30 if i == 5 else 50)
+        if i == 0:
+            arrays["body_pos_w"][FRAME, 3, 1] = np.nan
+            expected[i] = {"non_finite": FRAME}
+        elif i == 1:
+            arrays["body_quat_w"][FRAME, 2] *= 1.01
+            expected[i] = {"quat_norm": FRAME}
+        elif i == 2:
+            arrays["joint_pos"][FRAME:, 4] = joint_limits[4, 1] + 0.1
+            expected[i] = {"joint_limits": FRAME, "velocity_spike": FRAME - 1}
+        elif i == 3:
+            arrays["body_pos_w"][FRAME:, :, 0] += 0.5
+            expected[i] = {"velocity_spike": FRAME - 1}
+        elif i == 4:
+            arrays["body_pos_w"][FRAME:, :, 2] -= 1.0
+            expected[i] = {"ground_penetration": FRAME, "velocity_spike": FRAME - 1}
+        elif i == 5:
+            expected[i] = {"fps": None}
+        elif i == 6:
+            del arrays["body_quat_w"]
+            expected[i] = {"structure": None}
+        path = tmp_path / f"clip_{i}.npz"
+        np.savez(path, **arrays)
+        files.append(str(path))
+
+    # a retargeted clip in SDK joint order, whose last joint leaves its limits
+    arrays = _clip(kinematics, joint_limits, len(files))
+    dof_pos = ColumnPermutation(kinematics.joint_names, robot.joint_names)(arrays["joint_pos"])
+    joint = kinematics.joint_names.index(robot.joint_names[-1])
+    dof_pos[FRAME, -1] = joint_limits[joint, 0] - 0.2
+    root_rot = arrays["body_quat_w"][:, 0, [1, 2, 3, 0]]
+    path = tmp_path / "retargeted.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"fps": 50, "root_pos": arrays["body_pos_w"][:, 0], "root_rot": root_rot, "dof_pos": dof_pos}, f)
+    expected[len(files)] = {"joint_limits": FRAME, "velocity_spike": FRAME - 1}
+    files.append(str(path))
+
+    report = validate_motions(
+        files,
+        joint_limits=joint_limits,
+        joint_names=kinematics.joint_names,
+        joint_permutation=ColumnPermutation(robot.joint_names, kinematics.joint_names),
+    )
+    for i, clip_report in enumerate(report["clips"]):
+        issues = clip_report["issues"]
+        assert sorted(issues) == sorted(expected.get(i, {})), clip_report["file"]
+        for name, first_frame in expected.get(i, {}).items():
+            if first_frame is not None:
+                assert issues[name]["first_frame"] == first_frame, f"{clip_report['file']}: {name}"
+    assert report["clips"][2]["issues"]["joint_limits"]["joints"] == [kinematics.joint_names[4]]
+    assert report["clips"][-1]["issues"]["joint_limits"]["joints"] == [robot.joint_names[-1]]
+    assert report["summary"]["num_clips"] == len(files)
+
+
+def test_soft_joint_limits():
+    limits = torch.tensor([[-1.0, 3.0], [-float("inf"), float("inf")]])
+    soft = soft_joint_limits(limits, 0.5)
+    torch.testing.assert_close(soft, torch.tensor([[0.0, 2.0], [-float("inf"), float("inf")]]))
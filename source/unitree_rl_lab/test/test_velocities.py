@@ -0,0 +1,73 @@
+"""Tests of :func:`unitree_rl_lab.motion.derive_velocities`."""
+
+import pytest
+import torch
+
+from unitree_rl_lab.motion import VELOCITY_SOURCES, derive_velocities, so3_derivative
+from unitree_rl_lab.utils.quat_kernels import quat_mul
+
+
+def _rotation(axis: torch.Tensor, angle: torch.Tensor) -> torch.Tensor:
+    return torch.cat([torch.cos(angle / 2), torch.sin(angle / 2) * axis], dim=-1)
+
+
+def _clip(num_frames: int, fps: int, seed: int, num_joints: int = 5, num_bodies: int = 3) -> dict[str, torch.Tensor]:
+    generator = torch.Generator().manual_seed(seed)
+    t = torch.arange(num_frames)[:, None] / fps
+    frequency = 1.0 + torch.rand(num_joints, generator=generator)
+    axis = torch.nn.functional.normalize(torch.randn(num_bodies, 3, generator=generator), dim=-1)
+    offset = torch.nn.functional.normalize(torch.randn(num_bodies, 4, generator=generator), dim=-1)
+    rate = 0.5 + torch.rand(num_bodies, 1, generator=generator)
+    return {
+        "joint_pos": 0.4 * torch.sin(frequency * t),
+        "body_pos_w": torch.sin(t[..., None] * torch.arange(1, num_bodies + 1)[:, None]).expand(-1, -1, 3).clone(),
+        "body_quat_w": quat_mul(_rotation(axis, rate * t[..., None] ** 2), offset),
+    }
+
+
+def test_concatenated_clips_match_clip_by_clip():
+    # clips of one and two frames have no central differences
+    lengths = [1, 2, 3, 40, 97, 150]
+    fps = [50 if i % 2 else 30 for i in range(len(lengths))]
+    clips = [_clip(n, f, i) for i, (n, f) in enumerate(zip(lengths, fps))]
+    library = {name: torch.cat([clip[name] for clip in clips]) for name in VELOCITY_SOURCES.values()}
+    derived = derive_velocities(library, torch.tensor(fps), clip_lengths=torch.tensor(lengths))
+
+    offset = 0
+    for clip, n, f in zip(clips, lengths, fps):
+        for name, source in VELOCITY_SOURCES.items():
+            value = derived[name][offset : offset + n]
+            if n == 1:
+                expected = torch.zeros_like(value)
+            elif name == "body_ang_vel_w":
+                expected = so3_derivative(clip[source], 1.0 / f) if n >= 3 else None
+            else:
+                expected = torch.gradient(clip[source], spacing=1.0 / f, dim=0)[0]
+            if expected is not None:
+                torch.testing.assert_close(value, expected, atol=1e-4, rtol=1e-4, msg=f"{name} of the {n}-frame clip")
+        offset += n
+
+
+def test_constant_velocities_are_exact():
+    fps, num_frames = 50, 20
+    t = torch.arange(num_frames, dtype=torch.float32)[:, None] / fps
+    lin_vel = torch.tensor([0.5, -0.2, 0.1])
+    ang_vel = torch.tensor([0.0, 0.0, 1.5])
+    poses = {
+        "joint_pos": 0.3 * t,
+        "body_pos_w": (t * lin_vel)[:, None],
+        "body_quat_w": _rotation(torch.tensor([0.0, 0.0, 1.0]), 1.5 * t)[:, None],
+    }
+    derived = derive_velocities(poses, fps)
+    torch.testing.assert_close(derived["joint_vel"], torch.full((num_frames, 1), 0.3))
+    torch.testing.assert_close(derived["body_lin_vel_w"], lin_vel.expand(num_frames, 1, 3))
+    torch.testing.assert_close(derived["body_ang_vel_w"], ang_vel.expand(num_frames, 1, 3))
+
+
+@pytest.mark.parametrize("names", [["joint_vel"], ["body_ang_vel_w"], ["body_lin_vel_w", "joint_vel"], []])
+def test_only_requested_velocities_are_derived(names):
+    # only the pose arrays of the requested velocities are needed
+    sources = [VELOCITY_SOURCES[name] for name in names]
+    poses = {source: value for source, value in _clip(10, 50, 0).items() if source in sources}
+    derived = derive_velocities(poses, 50, names)
+    assert sorted(derived) == sorted(names)
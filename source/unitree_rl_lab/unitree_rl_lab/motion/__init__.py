@@ -0,0 +1,14 @@
+"""Motion clip storage and processing utilities shared by the mimic tasks and the conversion scripts.
+
+The package only depends on NumPy and PyTorch, so it can be used on machines without Isaac Sim.
+"""
+
+from .batch import *  # noqa: F401, F403
+from .compact import *  # noqa: F401, F403
+from .csv_motion import *  # noqa: F401, F403
+from .kinematics import *  # noqa: F401, F403
+from .ops import *  # noqa: F401, F403
+from .robots import MOTION_ROBOTS, MotionRobot  # noqa: F401
+from .store import *  # noqa: F401, F403
+from .validate import *  # noqa: F401, F403
+from .velocities import *  # noqa: F401, F403
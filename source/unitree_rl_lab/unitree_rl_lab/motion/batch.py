@@ -0,0 +1,171 @@
+"""Incremental bulk conversion of motion files on a process pool.
+
+:func:`run_batch` converts many files in parallel and records, in a cache file next to the outputs, the content hash
+of every input together with the conversion parameters it was converted with. Re-running it only converts the inputs
+whose content or parameters changed, or whose output is missing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import torch
+import traceback
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+__all__ = ["BatchJob", "BatchResult", "ConversionCache", "file_digest", "params_digest", "run_batch"]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of the content of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_digest(params: Mapping) -> str:
+    """Returns the SHA-256 hex digest of JSON-serializable conversion parameters, independent of the key order."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """A file to convert."""
+
+    input_path: str
+    output_path: str
+
+
+@dataclass
+class BatchResult:
+    """The outcome of a :class:`BatchJob`."""
+
+    job: BatchJob
+    status: str
+    """One of "converted", "cached" or "failed"."""
+
+    seconds: float = 0.0
+    """The conversion time in the worker, zero for cached jobs."""
+
+    error: str | None = None
+    """The traceback of failed jobs."""
+
+
+class ConversionCache:
+    """A JSON file mapping every output path to the digests of the input and parameters it was converted from.
+
+    Args:
+        path: The cache file. It is created by :meth:`save` if it does not exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict[str, str]] = {}
+        if os.path.isfile(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_fresh(self, job: BatchJob, input_digest: str, params_hash: str) -> bool:
+        """Whether the output of ``job`` exists and was converted from the same input content and parameters."""
+        entry = self.entries.get(os.path.abspath(job.output_path))
+        return (
+            entry is not None
+            and entry["input"] == input_digest
+            and entry["params"] == params_hash
+            and os.path.isfile(job.output_path)
+        )
+
+    def update(self, job: BatchJob, input_digest: str, params_hash: str):
+        self.entries[os.path.abspath(job.output_path)] = {"input": input_digest, "params": params_hash}
+
+    def save(self):
+        """Writes the cache atomically, so that an interrupted run keeps the entries of the finished jobs."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _init_worker():
+    # every worker converts a single file at a time, several intra-op threads per worker oversubscribe the cores
+    torch.set_num_threads(1)
+
+
+def _run_job(convert: Callable[..., None], job: BatchJob, params: Mapping) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(job.output_path)), exist_ok=True)
+        convert(job.input_path, job.output_path, **params)
+    except Exception:
+        return BatchResult(job, "failed", time.perf_counter() - start, traceback.format_exc())
+    return BatchResult(job, "converted", time.perf_counter() - start)
+
+
+def run_batch(
+    convert: Callable[..., None],
+    jobs: Sequence[BatchJob],
+    params: Mapping | None = None,
+    cache_path: str | None = None,
+    num_workers: int | None = None,
+    force: bool = False,
+    on_result: Callable[[BatchResult], None] | None = None,
+) -> list[BatchResult]:
+    """Converts files in parallel, skipping the ones whose input content and parameters are unchanged.
+
+    Args:
+        convert: The conversion, called as ``convert(input_path, output_path, **params)`` in a worker process. It
+            must be a module-level function, so that it can be pickled.
+        jobs: The files to convert.
+        params: The keyword arguments of ``convert``. They must be JSON-serializable, since they are part of the
+            cache key together with the qualified name of ``convert``.
+        cache_path: The cache file. Defaults to None, which converts every file.
+        num_workers: The number of worker processes. Defaults to None, which uses one per CPU. With 1, the files are
+            converted in this process.
+        force: Whether to convert every file regardless of the cache. The cache is still updated.
+        on_result: Called with every result as soon as it is available, in completion order.
+
+    Returns:
+        The results, in the order of ``jobs``.
+    """
+    params = dict(params or {})
+    params_hash = params_digest({"convert": f"{convert.__module__}.{convert.__qualname__}", **params})
+    cache = ConversionCache(cache_path) if cache_path is not None else None
+
+    results: dict[BatchJob, BatchResult] = {}
+    digests: dict[BatchJob, str] = {}
+    pending = []
+    for job in jobs:
+        if cache is not None:
+            digests[job] = file_digest(job.input_path)
+            if not force and cache.is_fresh(job, digests[job], params_hash):
+                results[job] = BatchResult(job, "cached")
+                if on_result is not None:
+                    on_result(results[job])
+                continue
+        pending.append(job)
+
+    def finish(result: BatchResult):
+        results[result.job] = result
+        if cache is not None and result.status == "converted":
+            cache.update(result.job, digests[result.job], params_hash)
+            cache.save()
+        if on_result is not None:
+            on_result(result)
+
+    if num_workers == 1 or len(pending) <= 1:
+        for job in pending:
+            finish(_run_job(convert, job, params))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(_run_job, convert, job, params) for job in pending]
+            for future in as_completed(futures):
+                finish(future.result())
+
+    return [results[job] for job in jobs]
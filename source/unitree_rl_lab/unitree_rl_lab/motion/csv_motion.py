@@ -0,0 +1,355 @@
+"""Loading and resampling of retargeted motion ``.csv`` files.
+
+Every row of a motion csv holds one frame: the root position ``(x, y, z)``, the root orientation ``(x, y, z, w)`` and
+the joint positions in SDK order. :class:`CsvMotionLoader` resamples the frames to the output frame rate and derives
+the root and joint velocities by finite differences. All of it is batched tensor code, so it runs on the CPU without
+Isaac Sim. :func:`csv_motion_to_arrays` turns a loaded motion into the arrays of a motion ``.npz`` file with the
+forward kinematics of the robot instead of replaying it in the simulator, and :func:`pose_motion_to_arrays` does the
+same for motions given as root poses and joint positions, such as retargeted ``.pkl`` files.
+"""
+
+from __future__ import annotations
+
+import itertools
+import numpy as np
+import torch
+from collections.abc import Iterator, Sequence
+
+from unitree_rl_lab.utils.quat_kernels import axis_angle_from_quat, quat_inv, quat_mul, quat_slerp
+
+from .kinematics import UrdfKinematics
+from .velocities import VELOCITY_SOURCES, derive_velocities
+
+__all__ = [
+    "CsvMotionLoader",
+    "compute_frame_blend",
+    "csv_motion_to_arrays",
+    "pad_csv_motions",
+    "pose_motion_to_arrays",
+    "read_csv_chunks",
+    "so3_derivative",
+]
+
+
+def compute_frame_blend(
+    times: torch.Tensor, duration: float, num_frames: int
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Locates sample times between the frames of a clip.
+
+    Args:
+        times: The sample times in seconds, in ``[0, duration]``. Shape is (T,).
+        duration: The duration of the clip in seconds.
+        num_frames: The number of frames of the clip.
+
+    Returns:
+        The indexes of the frames before and after every sample and the blend factor between them. Shapes are (T,).
+    """
+    phase = times / duration
+    index_0 = (phase * (num_frames - 1)).floor().long()
+    index_1 = (index_0 + 1).clamp(max=num_frames - 1)
+    blend = phase * (num_frames - 1) - index_0
+    return index_0, index_1, blend
+
+
+def so3_derivative(rotations: torch.Tensor, dt: float) -> torch.Tensor:
+    """Computes the angular velocities of a sequence of rotations by central differences.
+
+    Args:
+        rotations: The orientations. Shape is (T, 4).
+        dt: The time step.
+
+    Returns:
+        The angular velocities, with the first and last sample repeated. Shape is (T, 3).
+    """
+    q_prev, q_next = rotations[:-2], rotations[2:]
+    omega = axis_angle_from_quat(quat_mul(q_next, quat_inv(q_prev))) / (2.0 * dt)
+    return torch.cat([omega[:1], omega, omega[-1:]], dim=0)
+
+
+def read_csv_chunks(
+    motion_file: str, frame_range: tuple[int, int] | None = None, chunk_frames: int = 16384
+) -> Iterator[np.ndarray]:
+    """Parses a motion csv file in chunks of rows, straight into ``float32``.
+
+    The chunks bound the memory of the parse, not its time: every chunk goes through the C parser of
+    :func:`numpy.loadtxt`, which neither the C engine of pandas nor :func:`numpy.fromstring` beat on motion files.
+
+    Args:
+        motion_file: Path to the csv file.
+        frame_range: The first and last frame to read (both inclusive, starting from 1). The lines before the range
+            are skipped without being parsed. Defaults to None (all frames).
+        chunk_frames: The number of frames per chunk.
+
+    Yields:
+        The frames of a chunk. Shape is (chunk_frames, num_columns), shorter for the last chunk.
+    """
+    with open(motion_file) as f:
+        lines = f if frame_range is None else itertools.islice(f, frame_range[0] - 1, frame_range[1])
+        while chunk := list(itertools.islice(lines, chunk_frames)):
+            yield np.loadtxt(chunk, delimiter=",", dtype=np.float32, ndmin=2)
+
+
+class CsvMotionLoader:
+    """Loads a motion csv file, resamples it to ``output_fps`` and computes its velocities.
+
+    The file is read in chunks of ``chunk_frames`` rows, which are resampled as they arrive, so only the output
+    motion is kept in memory and long capture sessions load in bounded memory.
+    """
+
+    def __init__(
+        self,
+        motion_file: str,
+        input_fps: int,
+        output_fps: int,
+        device: torch.device | str = "cpu",
+        frame_range: tuple[int, int] | None = None,
+        chunk_frames: int = 16384,
+    ):
+        self.motion_file = motion_file
+        self.input_fps = input_fps
+        self.output_fps = output_fps
+        self.input_dt = 1.0 / self.input_fps
+        self.output_dt = 1.0 / self.output_fps
+        self.current_idx = 0
+        self.device = device
+        self.frame_range = frame_range
+        self.chunk_frames = chunk_frames
+        self._load_motion()
+        self._compute_velocities()
+
+    def _load_motion(self):
+        """Loads the motion from the csv file and interpolates it to the output fps."""
+        base_poss, base_rots, dof_poss = [], [], []
+        # the last frame of the previous chunk, which the first output frames of the next chunk blend from
+        carry = None
+        self.input_frames = 0
+        self.output_frames = 0
+        for chunk in read_csv_chunks(self.motion_file, self.frame_range, self.chunk_frames):
+            motion = torch.from_numpy(chunk).to(self.device)
+            motion = torch.cat([motion[:, :3], motion[:, [6, 3, 4, 5]], motion[:, 7:]], dim=1)  # convert to wxyz
+            first_frame = self.input_frames - (0 if carry is None else 1)
+            if carry is not None:
+                motion = torch.cat([carry, motion], dim=0)
+            self.input_frames += chunk.shape[0]
+            carry = motion[-1:]
+            for output, value in zip((base_poss, base_rots, dof_poss), self._interpolate_frames(motion, first_frame)):
+                output.append(value)
+
+        self.duration = (self.input_frames - 1) * self.input_dt
+        print(f"Motion loaded ({self.motion_file}), duration: {self.duration} sec, frames: {self.input_frames}")
+        self.motion_base_poss = torch.cat(base_poss)
+        self.motion_base_rots = torch.cat(base_rots)
+        self.motion_dof_poss = torch.cat(dof_poss)
+        print(
+            f"Motion interpolated, input frames: {self.input_frames}, input fps: {self.input_fps}, output frames:"
+            f" {self.output_frames}, output fps: {self.output_fps}"
+        )
+
+    def _interpolate_frames(
+        self, motion: torch.Tensor, first_frame: int
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Interpolates the output frames that fall between the given input frames.
+
+        Args:
+            motion: Consecutive input frames, with the root orientation in ``(w, x, y, z)`` order.
+            first_frame: The index of the first of them in the motion.
+
+        Returns:
+            The root positions, root orientations and joint positions of the output frames.
+        """
+        # output frame k at time k / output_fps lies before the last input frame if k * input_fps < n * output_fps
+        last_frame = first_frame + motion.shape[0] - 1
+        num_frames = -(-last_frame * self.output_fps // self.input_fps)
+        steps = torch.arange(self.output_frames, num_frames, device=self.device, dtype=torch.float64)
+        self.output_frames = max(num_frames, self.output_frames)
+        # position of the output frames in input frames, exact in float64
+        position = steps * self.input_fps / self.output_fps
+        index_0 = position.floor().long()
+        blend = (position - index_0).float().unsqueeze(1)
+        index_0 -= first_frame
+        frames_0, frames_1 = motion[index_0], motion[index_0 + 1]
+        return (
+            torch.lerp(frames_0[:, :3], frames_1[:, :3], blend),
+            # one batched slerp over all frames instead of a python loop over quat_slerp
+            quat_slerp(frames_0[:, 3:7], frames_1[:, 3:7], blend),
+            torch.lerp(frames_0[:, 7:], frames_1[:, 7:], blend),
+        )
+
+    def _compute_velocities(self):
+        """Computes the velocities of the motion."""
+        self.motion_base_lin_vels = torch.gradient(self.motion_base_poss, spacing=self.output_dt, dim=0)[0]
+        self.motion_dof_vels = torch.gradient(self.motion_dof_poss, spacing=self.output_dt, dim=0)[0]
+        self.motion_base_ang_vels = so3_derivative(self.motion_base_rots, self.output_dt)
+
+    def get_next_state(
+        self,
+    ) -> tuple[
+        tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor],
+        bool,
+    ]:
+        """Gets the next state of the motion and whether the motion wrapped around to its first frame."""
+        state = (
+            self.motion_base_poss[self.current_idx : self.current_idx + 1],
+            self.motion_base_rots[self.current_idx : self.current_idx + 1],
+            self.motion_base_lin_vels[self.current_idx : self.current_idx + 1],
+            self.motion_base_ang_vels[self.current_idx : self.current_idx + 1],
+            self.motion_dof_poss[self.current_idx : self.current_idx + 1],
+            self.motion_dof_vels[self.current_idx : self.current_idx + 1],
+        )
+        self.current_idx += 1
+        reset_flag = False
+        if self.current_idx >= self.output_frames:
+            self.current_idx = 0
+            reset_flag = True
+        return state, reset_flag
+
+
+def csv_motion_to_arrays(
+    motion: CsvMotionLoader, kinematics: UrdfKinematics, joint_names: Sequence[str], velocities: bool = True
+) -> dict[str, np.ndarray]:
+    """Computes the arrays of a motion ``.npz`` file from a csv motion.
+
+    The result holds the same arrays as the files written by ``scripts/mimic/csv_to_npz.py``: the joint states in
+    the joint order of the articulation and the states of all its bodies. Joints of the robot that are not columns of
+    the csv file are kept at zero.
+
+    Args:
+        motion: The loaded csv motion.
+        kinematics: The forward kinematics of the robot.
+        joint_names: The joints of the csv columns.
+        velocities: Whether to include the velocities. Without them, the motion loader of the mimic task derives them
+            from the poses (see :func:`~unitree_rl_lab.motion.derive_velocities`). Defaults to True.
+
+    Returns:
+        The arrays ``fps``, ``joint_pos``, ``joint_vel``, ``body_pos_w``, ``body_quat_w``, ``body_lin_vel_w`` and
+        ``body_ang_vel_w`` as ``float32``, without the velocities if ``velocities`` is False.
+    """
+    return _forward_kinematics_arrays(
+        kinematics,
+        joint_names,
+        motion.output_fps,
+        motion.motion_base_poss,
+        motion.motion_base_rots,
+        motion.motion_dof_poss,
+        motion.motion_base_lin_vels,
+        motion.motion_base_ang_vels,
+        motion.motion_dof_vels,
+        velocities,
+    )
+
+
+def pose_motion_to_arrays(
+    root_pos: torch.Tensor,
+    root_quat: torch.Tensor,
+    dof_pos: torch.Tensor,
+    fps: float,
+    kinematics: UrdfKinematics,
+    joint_names: Sequence[str],
+    velocities: bool = True,
+) -> dict[str, np.ndarray]:
+    """Computes the arrays of a motion ``.npz`` file from the root poses and joint positions of a motion.
+
+    The root and joint velocities are the finite differences of :class:`CsvMotionLoader`, the body states follow from
+    the forward kinematics of all frames at once.
+
+    Args:
+        root_pos: The root positions. Shape is (T, 3).
+        root_quat: The root orientations in ``(w, x, y, z)`` order. Shape is (T, 4).
+        dof_pos: The joint positions, in the order of ``joint_names``. Shape is (T, len(joint_names)).
+        fps: The frame rate of the motion.
+        kinematics: The forward kinematics of the robot.
+        joint_names: The joints of the ``dof_pos`` columns.
+        velocities: Whether to include the velocities. Defaults to True.
+
+    Returns:
+        The arrays of :func:`csv_motion_to_arrays`.
+    """
+    root_pos, root_quat, dof_pos = (x.to(kinematics.device, torch.float32) for x in (root_pos, root_quat, dof_pos))
+    derived = derive_velocities(
+        {"joint_pos": dof_pos, "body_pos_w": root_pos[:, None], "body_quat_w": root_quat[:, None]}, fps
+    )
+    return _forward_kinematics_arrays(
+        kinematics,
+        joint_names,
+        fps,
+        root_pos,
+        root_quat,
+        dof_pos,
+        derived["body_lin_vel_w"][:, 0],
+        derived["body_ang_vel_w"][:, 0],
+        derived["joint_vel"],
+        velocities,
+    )
+
+
+def _forward_kinematics_arrays(
+    kinematics: UrdfKinematics,
+    joint_names: Sequence[str],
+    fps: float,
+    root_pos: torch.Tensor,
+    root_quat: torch.Tensor,
+    dof_pos: torch.Tensor,
+    root_lin_vel: torch.Tensor,
+    root_ang_vel: torch.Tensor,
+    dof_vel: torch.Tensor,
+    velocities: bool,
+) -> dict[str, np.ndarray]:
+    missing = [name for name in joint_names if name not in kinematics.joint_names]
+    if missing:
+        raise ValueError(f"Joints {missing} of the motion are not joints of {kinematics.urdf_path}.")
+    joint_indexes = [kinematics.joint_names.index(name) for name in joint_names]
+    shape = (dof_pos.shape[0], kinematics.num_joints)
+    joint_pos = torch.zeros(shape, device=kinematics.device)
+    joint_vel = torch.zeros(shape, device=kinematics.device)
+    joint_pos[:, joint_indexes] = dof_pos.to(kinematics.device)
+    joint_vel[:, joint_indexes] = dof_vel.to(kinematics.device)
+
+    states = kinematics.forward(
+        root_pos.to(kinematics.device),
+        root_quat.to(kinematics.device),
+        joint_pos,
+        root_lin_vel.to(kinematics.device),
+        root_ang_vel.to(kinematics.device),
+        joint_vel,
+    )
+    arrays = {"fps": np.array([fps]), "joint_pos": joint_pos, "joint_vel": joint_vel, **states}
+    if not velocities:
+        arrays = {name: value for name, value in arrays.items() if name not in VELOCITY_SOURCES}
+    return {
+        name: value.cpu().numpy().astype(np.float32) if isinstance(value, torch.Tensor) else value
+        for name, value in arrays.items()
+    }
+
+
+def pad_csv_motions(motions: Sequence[CsvMotionLoader]) -> tuple[dict[str, torch.Tensor], torch.Tensor]:
+    """Stacks motions of different lengths, so that they can be played in lockstep in parallel environments.
+
+    Shorter motions hold their last pose with zero velocities until the longest motion ends.
+
+    Args:
+        motions: The loaded csv motions, with the same output fps.
+
+    Returns:
+        The states ``base_pos``, ``base_rot``, ``base_lin_vel``, ``base_ang_vel``, ``dof_pos`` and ``dof_vel`` of all
+        motions, of shape (N, T, ...) with the number of frames ``T`` of the longest motion, and the number of frames
+        of every motion. Shape is (N,).
+    """
+    lengths = torch.tensor([motion.output_frames for motion in motions])
+    num_frames = int(lengths.max())
+    fields = {
+        "base_pos": ("motion_base_poss", False),
+        "base_rot": ("motion_base_rots", False),
+        "base_lin_vel": ("motion_base_lin_vels", True),
+        "base_ang_vel": ("motion_base_ang_vels", True),
+        "dof_pos": ("motion_dof_poss", False),
+        "dof_vel": ("motion_dof_vels", True),
+    }
+    states = {}
+    for name, (attribute, is_velocity) in fields.items():
+        padded = []
+        for motion in motions:
+            value = getattr(motion, attribute)
+            pad = value[-1:].expand(num_frames - value.shape[0], -1)
+            padded.append(torch.cat([value, torch.zeros_like(pad) if is_velocity else pad], dim=0))
+        states[name] = torch.stack(padded)
+    return states, lengths
@@ -0,0 +1,263 @@
+"""Batched forward kinematics of floating-base robots described by URDF files.
+
+:class:`UrdfKinematics` computes the poses and velocities of all bodies of a robot for a whole motion at once, in the
+body and joint order of the Isaac Lab articulation spawned from the same URDF: links connected by fixed joints are
+merged into their parent (as the URDF importer does with ``merge_fixed_joints=True``) and the remaining bodies and
+joints are listed in breadth-first order. This replaces replaying a motion in Isaac Sim just to read back the body
+states, so motion files can be converted on machines without a simulator.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import torch
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+
+from unitree_rl_lab.utils.quat_kernels import quat_apply, quat_mul
+
+__all__ = ["UrdfKinematics"]
+
+_MOVABLE_JOINT_TYPES = ("revolute", "continuous", "prismatic")
+
+
+def _quat_from_rpy(rpy: np.ndarray) -> np.ndarray:
+    """Converts URDF roll-pitch-yaw angles (extrinsic x-y-z) to a quaternion in ``(w, x, y, z)`` order."""
+    cr, cp, cy = np.cos(rpy / 2)
+    sr, sp, sy = np.sin(rpy / 2)
+    return np.array(
+        [
+            cr * cp * cy + sr * sp * sy,
+            sr * cp * cy - cr * sp * sy,
+            cr * sp * cy + sr * cp * sy,
+            cr * cp * sy - sr * sp * cy,
+        ]
+    )
+
+
+def _quat_mul(q1: np.ndarray, q2: np.ndarray) -> np.ndarray:
+    return quat_mul(torch.from_numpy(q1), torch.from_numpy(q2)).numpy()
+
+
+def _quat_apply(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    return quat_apply(torch.from_numpy(q), torch.from_numpy(v)).numpy()
+
+
+def _parse_vector(element: ET.Element | None, attribute: str, default: str) -> np.ndarray:
+    value = default if element is None else element.get(attribute, default)
+    return np.array([float(x) for x in value.split()], dtype=np.float64)
+
+
+@dataclass
+class _Link:
+    mass: float
+    com: np.ndarray
+    """Center of mass in the link frame."""
+    children: list[_Joint] = field(default_factory=list)
+
+
+@dataclass
+class _Joint:
+    name: str
+    type: str
+    parent: str
+    child: str
+    pos: np.ndarray
+    quat: np.ndarray
+    axis: np.ndarray
+    limits: tuple[float, float]
+    """Lower and upper position limit, infinite for continuous joints."""
+
+
+def _parse_urdf(urdf_path: str) -> tuple[dict[str, _Link], str]:
+    root = ET.parse(urdf_path).getroot()
+    links = {}
+    for element in root.iter("link"):
+        inertial = element.find("inertial")
+        mass = 0.0 if inertial is None else float(inertial.find("mass").get("value"))
+        com = _parse_vector(None if inertial is None else inertial.find("origin"), "xyz", "0 0 0")
+        links[element.get("name")] = _Link(mass=mass, com=com)
+
+    child_links = set()
+    for element in root.iter("joint"):
+        origin = element.find("origin")
+        limit = element.find("limit")
+        limits = (-np.inf, np.inf)
+        if limit is not None and element.get("type") in ("revolute", "prismatic"):
+            limits = (float(limit.get("lower", "-inf")), float(limit.get("upper", "inf")))
+        joint = _Joint(
+            name=element.get("name"),
+            type=element.get("type"),
+            parent=element.find("parent").get("link"),
+            child=element.find("child").get("link"),
+            pos=_parse_vector(origin, "xyz", "0 0 0"),
+            quat=_quat_from_rpy(_parse_vector(origin, "rpy", "0 0 0")),
+            axis=_parse_vector(element.find("axis"), "xyz", "1 0 0"),
+            limits=limits,
+        )
+        if joint.type not in _MOVABLE_JOINT_TYPES + ("fixed",):
+            raise ValueError(f"Unsupported joint type '{joint.type}' of joint '{joint.name}' in {urdf_path}.")
+        joint.axis /= np.linalg.norm(joint.axis)
+        links[joint.parent].children.append(joint)
+        child_links.add(joint.child)
+
+    roots = [name for name in links if name not in child_links]
+    if len(roots) != 1:
+        raise ValueError(f"Expected a single root link in {urdf_path}, found: {roots}.")
+    return links, roots[0]
+
+
+class UrdfKinematics:
+    """Forward kinematics of a floating-base URDF robot, batched over frames.
+
+    Args:
+        urdf_path: Path to the URDF file.
+        merge_fixed_joints: Whether links connected by fixed joints are merged into their parent. Defaults to True,
+            like the Isaac Lab URDF importer.
+        device: Device of the computed tensors.
+    """
+
+    def __init__(self, urdf_path: str, merge_fixed_joints: bool = True, device: torch.device | str = "cpu"):
+        self.urdf_path = urdf_path
+        self.device = device
+        links, root = _parse_urdf(urdf_path)
+
+        # every body is a link that is not merged into its parent, with the joint that connects it to its parent
+        # body and the (composed) transform from the parent body frame to the joint frame
+        self.body_names: list[str] = [root]
+        self.joint_names: list[str] = []
+        parents, joint_types, origin_pos, origin_quat, axes = [-1], [""], [np.zeros(3)], [np.eye(4)[0]], [np.zeros(3)]
+        masses, mass_moments = [0.0], [np.zeros(3)]
+        joint_limits = []
+
+        def add_link(body: int, link: str, pos: np.ndarray, quat: np.ndarray, queue: list):
+            # accumulates the mass of the link into the body and expands its joints in URDF order
+            masses[body] += links[link].mass
+            mass_moments[body] = mass_moments[body] + links[link].mass * (pos + _quat_apply(quat, links[link].com))
+            for joint in links[link].children:
+                joint_pos = pos + _quat_apply(quat, joint.pos)
+                joint_quat = _quat_mul(quat, joint.quat)
+                if joint.type == "fixed" and merge_fixed_joints:
+                    add_link(body, joint.child, joint_pos, joint_quat, queue)
+                else:
+                    queue.append((body, joint, joint_pos, joint_quat))
+
+        queue = []
+        add_link(0, root, np.zeros(3), np.eye(4)[0], queue)
+        while queue:
+            parent, joint, joint_pos, joint_quat = queue.pop(0)
+            body = len(self.body_names)
+            self.body_names.append(joint.child)
+            parents.append(parent)
+            joint_types.append(joint.type)
+            origin_pos.append(joint_pos)
+            origin_quat.append(joint_quat)
+            axes.append(joint.axis)
+            masses.append(0.0)
+            mass_moments.append(np.zeros(3))
+            if joint.type != "fixed":
+                self.joint_names.append(joint.name)
+                joint_limits.append(joint.limits)
+            add_link(body, joint.child, np.zeros(3), np.eye(4)[0], queue)
+
+        self.num_bodies = len(self.body_names)
+        self.num_joints = len(self.joint_names)
+        self._parents = parents
+        self._joint_types = joint_types
+        # index of the joint of every body into the joint positions, -1 for the root and fixed joints
+        movable = np.array([joint_type in _MOVABLE_JOINT_TYPES for joint_type in joint_types])
+        self._joint_indexes = np.where(movable, np.cumsum(movable) - 1, -1).tolist()
+
+        def to_tensor(arrays: list[np.ndarray]) -> torch.Tensor:
+            return torch.tensor(np.stack(arrays), dtype=torch.float32, device=device)
+
+        self._origin_pos = to_tensor(origin_pos)
+        self._origin_quat = to_tensor(origin_quat)
+        self._axes = to_tensor(axes)
+        com = [m / mass if mass > 0 else np.zeros(3) for m, mass in zip(mass_moments, masses)]
+        self.body_masses = to_tensor(masses)
+        self.body_coms = to_tensor(com)
+        """Centers of mass of the (merged) bodies in their body frames. Shape is (B, 3)."""
+        self.joint_limits = torch.tensor(joint_limits, dtype=torch.float32, device=device).reshape(-1, 2)
+        """Lower and upper position limits of the joints, infinite for continuous joints. Shape is (J, 2)."""
+
+    def forward(
+        self,
+        root_pos_w: torch.Tensor,
+        root_quat_w: torch.Tensor,
+        joint_pos: torch.Tensor,
+        root_lin_vel_w: torch.Tensor | None = None,
+        root_ang_vel_w: torch.Tensor | None = None,
+        joint_vel: torch.Tensor | None = None,
+    ) -> dict[str, torch.Tensor]:
+        """Computes the states of all bodies.
+
+        The velocities are only computed when all of ``root_lin_vel_w``, ``root_ang_vel_w`` and ``joint_vel`` are
+        given. Like the root state written by :meth:`isaaclab.assets.Articulation.write_root_state_to_sim`, the root
+        linear velocity is the velocity of the root center of mass, and the returned body linear velocities are those
+        of the body centers of mass, as reported by ``ArticulationData.body_lin_vel_w``.
+
+        Args:
+            root_pos_w: The root link positions. Shape is (T, 3).
+            root_quat_w: The root link orientations in ``(w, x, y, z)`` order. Shape is (T, 4).
+            joint_pos: The joint positions in :attr:`joint_names` order. Shape is (T, J).
+            root_lin_vel_w: The linear velocities of the root center of mass. Shape is (T, 3).
+            root_ang_vel_w: The root angular velocities. Shape is (T, 3).
+            joint_vel: The joint velocities in :attr:`joint_names` order. Shape is (T, J).
+
+        Returns:
+            The arrays ``body_pos_w``, ``body_quat_w`` and, with velocities, ``body_lin_vel_w`` and
+            ``body_ang_vel_w`` in :attr:`body_names` order. Shapes are (T, B, 3) and (T, B, 4).
+        """
+        with_velocities = root_lin_vel_w is not None and root_ang_vel_w is not None and joint_vel is not None
+        num_frames = root_pos_w.shape[0]
+        shape = (num_frames, self.num_bodies)
+        body_pos_w = root_pos_w.new_empty(shape + (3,))
+        body_quat_w = root_pos_w.new_empty(shape + (4,))
+        body_pos_w[:, 0] = root_pos_w
+        body_quat_w[:, 0] = root_quat_w
+        if with_velocities:
+            # velocities of the body frame origins
+            body_lin_vel_w = root_pos_w.new_empty(shape + (3,))
+            body_ang_vel_w = root_pos_w.new_empty(shape + (3,))
+            body_ang_vel_w[:, 0] = root_ang_vel_w
+            root_com_w = quat_apply(root_quat_w, self.body_coms[:1])
+            body_lin_vel_w[:, 0] = root_lin_vel_w - torch.linalg.cross(root_ang_vel_w, root_com_w, dim=-1)
+
+        for body in range(1, self.num_bodies):
+            parent, joint_type, joint = self._parents[body], self._joint_types[body], self._joint_indexes[body]
+            parent_pos_w, parent_quat_w = body_pos_w[:, parent], body_quat_w[:, parent]
+            # orientation of the joint frame before the joint moves
+            joint_quat_w = quat_mul(parent_quat_w, self._origin_quat[body : body + 1])
+            pos_w = parent_pos_w + quat_apply(parent_quat_w, self._origin_pos[body : body + 1])
+            axis = self._axes[body : body + 1]
+            if joint_type in ("revolute", "continuous"):
+                half_angle = joint_pos[:, joint : joint + 1] / 2
+                joint_quat_w = quat_mul(
+                    joint_quat_w, torch.cat([torch.cos(half_angle), torch.sin(half_angle) * axis], -1)
+                )
+            elif joint_type == "prismatic":
+                pos_w = pos_w + quat_apply(joint_quat_w, axis * joint_pos[:, joint : joint + 1])
+            body_pos_w[:, body] = pos_w
+            body_quat_w[:, body] = joint_quat_w
+
+            if with_velocities:
+                parent_ang_vel_w = body_ang_vel_w[:, parent]
+                lin_vel_w = body_lin_vel_w[:, parent] + torch.linalg.cross(
+                    parent_ang_vel_w, pos_w - parent_pos_w, dim=-1
+                )
+                ang_vel_w = parent_ang_vel_w
+                if joint_type in ("revolute", "continuous"):
+                    ang_vel_w = ang_vel_w + quat_apply(joint_quat_w, axis) * joint_vel[:, joint : joint + 1]
+                elif joint_type == "prismatic":
+                    lin_vel_w = lin_vel_w + quat_apply(joint_quat_w, axis) * joint_vel[:, joint : joint + 1]
+                body_lin_vel_w[:, body] = lin_vel_w
+                body_ang_vel_w[:, body] = ang_vel_w
+
+        states = {"body_pos_w": body_pos_w, "body_quat_w": body_quat_w}
+        if with_velocities:
+            # move the linear velocities from the body frame origins to the centers of mass
+            com_w = quat_apply(body_quat_w, self.body_coms.expand_as(body_pos_w))
+            states["body_lin_vel_w"] = body_lin_vel_w + torch.linalg.cross(body_ang_vel_w, com_w, dim=-1)
+            states["body_ang_vel_w"] = body_ang_vel_w
+        return states
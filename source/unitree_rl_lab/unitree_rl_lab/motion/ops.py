@@ -0,0 +1,89 @@
+"""Vectorized array operations of the motion conversion scripts.
+
+Joint reordering and frame resampling are applied to whole ``(T, ...)`` arrays at once: a :class:`ColumnPermutation`
+precomputes the gather index of a reordering, so applying it is a single fancy-indexing gather, and
+:func:`resample_frames` interpolates all columns of all frames with one pair of gathers.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from collections.abc import Sequence
+
+__all__ = ["ColumnPermutation", "interpolate_frames", "resample_frames"]
+
+
+class ColumnPermutation:
+    """Reorders the last axis of arrays from one list of names to another.
+
+    Args:
+        source_names: The names of the columns of the input arrays.
+        target_names: The names of the columns of the output arrays.
+        fill_value: The value of target columns without a source column. Defaults to 0.
+    """
+
+    def __init__(self, source_names: Sequence[str], target_names: Sequence[str], fill_value: float = 0.0):
+        self.source_names = list(source_names)
+        self.target_names = list(target_names)
+        self.fill_value = fill_value
+        source_indexes = {name: i for i, name in enumerate(self.source_names)}
+        self.index = np.array([source_indexes.get(name, -1) for name in self.target_names], dtype=np.int64)
+        """The source column of every target column, -1 for missing columns."""
+        self.missing = self.index < 0
+        self._gather_index = np.where(self.missing, 0, self.index)
+
+    @property
+    def missing_target_names(self) -> list[str]:
+        """The target columns without a source column."""
+        return [name for name, missing in zip(self.target_names, self.missing) if missing]
+
+    @property
+    def unused_source_names(self) -> list[str]:
+        """The source columns that are not in the target."""
+        used = set(self.index[~self.missing].tolist())
+        return [name for i, name in enumerate(self.source_names) if i not in used]
+
+    def __call__(self, data: np.ndarray) -> np.ndarray:
+        """Gathers the target columns of ``data``. Shape is (..., len(source_names)) -> (..., len(target_names))."""
+        if data.shape[-1] != len(self.source_names):
+            raise ValueError(f"Expected {len(self.source_names)} columns, got an array of shape {data.shape}.")
+        out = data[..., self._gather_index]
+        out[..., self.missing] = self.fill_value
+        return out
+
+
+def interpolate_frames(data: np.ndarray, positions: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Linearly interpolates an array at fractional frame positions.
+
+    Positions outside of ``[0, T - 1]`` are extrapolated from the first or last two frames.
+
+    Args:
+        data: The frames. Shape is (..., T, ...) with the frames along ``axis``.
+        positions: The frame positions to sample. Shape is (S,).
+        axis: The frame axis. Defaults to 0.
+
+    Returns:
+        The interpolated frames, with S frames along ``axis``.
+    """
+    num_frames = data.shape[axis]
+    if num_frames == 1:
+        return np.repeat(data, len(positions), axis=axis)
+    index_0 = np.clip(np.floor(positions).astype(np.int64), 0, num_frames - 2)
+    blend = (positions - index_0).reshape((-1,) + (1,) * (data.ndim - 1 - axis % data.ndim))
+    frames_0 = np.take(data, index_0, axis=axis)
+    frames_1 = np.take(data, index_0 + 1, axis=axis)
+    return (frames_0 + (frames_1 - frames_0) * blend).astype(data.dtype, copy=False)
+
+
+def resample_frames(data: np.ndarray, num_frames: int, axis: int = 0) -> np.ndarray:
+    """Linearly resamples an array to ``num_frames`` evenly spaced frames spanning its first and last frame.
+
+    Args:
+        data: The frames. Shape is (..., T, ...) with the frames along ``axis``.
+        num_frames: The number of output frames.
+        axis: The frame axis. Defaults to 0.
+
+    Returns:
+        The resampled frames, with ``num_frames`` frames along ``axis``.
+    """
+    return interpolate_frames(data, np.linspace(0, data.shape[axis] - 1, num_frames), axis=axis)
@@ -0,0 +1,99 @@
+"""Robots supported by the simulator-free motion conversion tools.
+
+The joint names mirror ``joint_sdk_names`` of the articulation configs in :mod:`unitree_rl_lab.assets.robots`, which
+is the column order of retargeted motion csv files. They are repeated here because the configs import Isaac Lab.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+DESCRIPTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "description")
+
+G1_29DOF_JOINT_NAMES = (
+    "left_hip_pitch_joint",
+    "left_hip_roll_joint",
+    "left_hip_yaw_joint",
+    "left_knee_joint",
+    "left_ankle_pitch_joint",
+    "left_ankle_roll_joint",
+    "right_hip_pitch_joint",
+    "right_hip_roll_joint",
+    "right_hip_yaw_joint",
+    "right_knee_joint",
+    "right_ankle_pitch_joint",
+    "right_ankle_roll_joint",
+    "waist_yaw_joint",
+    "waist_roll_joint",
+    "waist_pitch_joint",
+    "left_shoulder_pitch_joint",
+    "left_shoulder_roll_joint",
+    "left_shoulder_yaw_joint",
+    "left_elbow_joint",
+    "left_wrist_roll_joint",
+    "left_wrist_pitch_joint",
+    "left_wrist_yaw_joint",
+    "right_shoulder_pitch_joint",
+    "right_shoulder_roll_joint",
+    "right_shoulder_yaw_joint",
+    "right_elbow_joint",
+    "right_wrist_roll_joint",
+    "right_wrist_pitch_joint",
+    "right_wrist_yaw_joint",
+)
+
+M3_23DOF_JOINT_NAMES = (
+    "left_hip_pitch_joint",
+    "left_hip_roll_joint",
+    "left_hip_yaw_joint",
+    "left_knee_joint",
+    "left_ankle_pitch_joint",
+    "left_ankle_roll_joint",
+    "right_hip_pitch_joint",
+    "right_hip_roll_joint",
+    "right_hip_yaw_joint",
+    "right_knee_joint",
+    "right_ankle_pitch_joint",
+    "right_ankle_roll_joint",
+    "waist_yaw_joint",
+    "left_shoulder_pitch_joint",
+    "left_shoulder_roll_joint",
+    "left_shoulder_yaw_joint",
+    "left_elbow_pitch_joint",
+    "left_elbow_yaw_joint",
+    "right_shoulder_pitch_joint",
+    "right_shoulder_roll_joint",
+    "right_shoulder_yaw_joint",
+    "right_elbow_pitch_joint",
+    "right_elbow_yaw_joint",
+)
+
+
+@dataclass(frozen=True)
+class MotionRobot:
+    """A robot of the motion conversion tools."""
+
+    urdf_path: str | None
+    """The URDF the articulation is spawned from. None if it is not part of this repository."""
+
+    joint_names: tuple[str, ...]
+    """The joints in csv column order."""
+
+    soft_joint_pos_limit_factor: float = 0.9
+    """The fraction of the URDF joint ranges the articulation config treats as soft limits."""
+
+
+MOTION_ROBOTS = {
+    # the G1 URDF comes from unitree_ros (see UNITREE_ROS_DIR in unitree_rl_lab.assets.robots.unitree)
+    "g1": MotionRobot(urdf_path=None, joint_names=G1_29DOF_JOINT_NAMES),
+    "m3": MotionRobot(
+        urdf_path=os.path.join(DESCRIPTION_DIR, "m3_description_old", "urdf", "M3.urdf"),
+        joint_names=M3_23DOF_JOINT_NAMES,
+    ),
+    # the parallel-ankle M3 shares the SDK joints of the M3, its URDF orders the ankle joints differently
+    "m3_parallel": MotionRobot(
+        urdf_path=os.path.join(DESCRIPTION_DIR, "m3_parallel_description", "urdf", "m3_23dof.urdf"),
+        joint_names=M3_23DOF_JOINT_NAMES,
+    ),
+}
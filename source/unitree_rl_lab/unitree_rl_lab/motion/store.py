@@ -0,0 +1,167 @@
+"""Memory-mapped storage for motion clips.
+
+Motion ``.npz`` archives are zip files, so :func:`numpy.load` has to inflate a whole array into private memory
+before any part of it can be used. The store exports every array of an archive once into a cache directory of
+plain ``.npy`` files and opens those with ``mmap_mode="r"``. All processes on a host that map the same cache share
+one copy in the page cache, and callers only copy out the bodies they actually need.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+
+from .compact import open_motion_archive
+
+MOTION_FIELDS = ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+"""Arrays a motion clip provides to :class:`~unitree_rl_lab.tasks.mimic.mdp.MotionLoader`."""
+
+BODY_FIELDS = ("body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+"""Arrays with a body axis (axis 1) that can be restricted to a subset of bodies."""
+
+CACHE_SUFFIX = ".mmap"
+USER_CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "unitree_rl_lab", "motions")
+
+_STAMP_FILE = "source.json"
+
+
+def motion_cache_dir(motion_file: str) -> str:
+    """Returns the default cache directory of a motion archive, e.g. ``clip.npz`` -> ``clip.mmap``."""
+    return os.path.splitext(motion_file)[0] + CACHE_SUFFIX
+
+
+def _user_cache_dir(motion_file: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(motion_file).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(motion_file))[0]
+    return os.path.join(USER_CACHE_ROOT, f"{name}-{digest}{CACHE_SUFFIX}")
+
+
+def _source_stamp(motion_file: str) -> dict:
+    stat = os.stat(motion_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_stamp(cache_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(cache_dir, _STAMP_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_motion_cache(motion_file: str, cache_dir: str | None = None) -> str:
+    """Exports a motion archive into a directory of ``.npy`` files that can be memory-mapped.
+
+    The export is skipped when the cache is already up to date with the archive. Concurrent callers (e.g. the ranks
+    of a multi-GPU run) serialize on a lock file, so only the first one pays for the export and the directory is
+    published with an atomic rename. ``float64`` arrays are stored as ``float32``, and the arrays of compact archives
+    (see :mod:`unitree_rl_lab.motion.compact`) are decoded, so the cache is the same for both kinds of archives.
+
+    Args:
+        motion_file: Path to the ``.npz`` archive.
+        cache_dir: Target directory. Defaults to :func:`motion_cache_dir`.
+
+    Returns:
+        The cache directory.
+    """
+    cache_dir = cache_dir or motion_cache_dir(motion_file)
+    stamp = _source_stamp(motion_file)
+    if _read_stamp(cache_dir) == stamp:
+        return cache_dir
+
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    os.makedirs(parent, exist_ok=True)
+    with open(cache_dir + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # another process may have finished the export while we were waiting
+        if _read_stamp(cache_dir) == stamp:
+            return cache_dir
+
+        tmp_dir = tempfile.mkdtemp(prefix=".motion-", dir=parent)
+        try:
+            with open_motion_archive(motion_file) as data:
+                for key in data.files:
+                    array = data[key]
+                    if array.dtype == np.float64:
+                        array = array.astype(np.float32)
+                    np.save(os.path.join(tmp_dir, key + ".npy"), np.ascontiguousarray(array))
+            with open(os.path.join(tmp_dir, _STAMP_FILE), "w") as f:
+                json.dump(stamp, f)
+            # processes still mapping a stale cache keep their (unlinked) files alive
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(tmp_dir, cache_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return cache_dir
+
+
+class MotionStore:
+    """Read-only view of the arrays of a motion clip.
+
+    ``motion_file`` may be an ``.npz`` archive or a directory of ``.npy`` files (as written by
+    :func:`export_motion_cache`). Archives are exported to a cache next to the file, or below ``~/.cache`` when the
+    source directory is not writable, and then memory-mapped. With ``use_cache=False`` the archive is read directly,
+    which still only inflates (and, for compact archives, decodes) the arrays that are requested.
+    """
+
+    def __init__(self, motion_file: str, use_cache: bool = True):
+        self.motion_file = motion_file
+        if os.path.isdir(motion_file):
+            self.cache_dir = motion_file
+        elif use_cache:
+            try:
+                self.cache_dir = export_motion_cache(motion_file)
+            except PermissionError:
+                self.cache_dir = export_motion_cache(motion_file, _user_cache_dir(motion_file))
+        else:
+            self.cache_dir = None
+
+        if self.cache_dir is None:
+            self._arrays = open_motion_archive(motion_file)
+            self._names = set(self._arrays.files)
+        else:
+            self._arrays = {
+                name[:-4]: np.load(os.path.join(self.cache_dir, name), mmap_mode="r")
+                for name in os.listdir(self.cache_dir)
+                if name.endswith(".npy")
+            }
+            self._names = set(self._arrays)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    @property
+    def names(self) -> list[str]:
+        return sorted(self._names)
+
+    @property
+    def fps(self) -> np.ndarray:
+        return np.asarray(self._arrays["fps"])
+
+    @property
+    def num_frames(self) -> int:
+        return self._arrays["joint_pos"].shape[0]
+
+    def read(self, name: str, body_indexes: Sequence[int] | np.ndarray | None = None) -> np.ndarray:
+        """Copies an array out of the store as ``float32``.
+
+        Args:
+            name: Name of the array, e.g. ``"body_pos_w"``.
+            body_indexes: Bodies to keep for arrays in :data:`BODY_FIELDS`. Defaults to None (all bodies).
+
+        Returns:
+            A private, C-contiguous copy holding only the selected bodies.
+        """
+        array = self._arrays[name]
+        if body_indexes is not None and name in BODY_FIELDS:
+            # fancy indexing a memmap only copies the selected bodies
+            array = array[:, np.asarray(body_indexes, dtype=np.int64)]
+        else:
+            array = np.array(array)
+        return np.ascontiguousarray(array, dtype=np.float32)
@@ -0,0 +1,368 @@
+"""Validation and statistics of motion libraries.
+
+:func:`validate_motions` loads many motion clips, concatenates the clips of the same layout along the time axis and
+runs every check on all of their frames at once, reducing the per-frame results to per-clip issues with scatter
+reductions. The checks are:
+
+* ``structure``: missing arrays, inconsistent frame counts or shapes, joint counts that do not match the robot,
+* ``non_finite``: NaN or Inf values,
+* ``quat_norm``: body orientations whose norm drifts from 1,
+* ``joint_limits``: joint positions outside the soft limits of the articulation,
+* ``velocity_spike``: stored velocities that disagree with the finite differences of the poses, or finite differences
+  that exceed physically plausible speeds (which also catches pose jumps in clips without stored velocities),
+* ``fps``: a frame rate that differs from the expected one (by default the most common one of the library),
+* ``ground_penetration``: body frames below the ground plane.
+
+The result is a JSON-serializable report with the issues and statistics of every clip and of the library.
+"""
+
+from __future__ import annotations
+
+import collections
+import numpy as np
+import pickle
+import time
+import torch
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+
+from .compact import open_motion_archive
+from .ops import ColumnPermutation
+from .velocities import VELOCITY_SOURCES, derive_velocities
+
+__all__ = ["MotionValidationCfg", "load_motion_arrays", "soft_joint_limits", "validate_motions"]
+
+POSE_FIELDS = ("joint_pos", "body_pos_w", "body_quat_w")
+"""Arrays every clip needs, besides ``fps``."""
+
+FRAME_CHECKS = ("non_finite", "quat_norm", "joint_limits", "velocity_spike", "ground_penetration")
+"""Checks that flag individual frames."""
+
+
+@dataclass
+class MotionValidationCfg:
+    """Thresholds of :func:`validate_motions`. Velocities are in rad/s and m/s, positions in m."""
+
+    fps: float | None = None
+    """The expected frame rate. Defaults to None, which expects the most common frame rate of the library."""
+
+    quat_norm_tolerance: float = 1e-3
+    """Largest deviation of the orientation norms from 1."""
+
+    joint_limit_tolerance: float = 0.0
+    """Largest excursion of the joint positions beyond the soft limits."""
+
+    joint_vel_tolerance: float = 5.0
+    """Largest difference between the stored joint velocities and the finite differences of the joint positions."""
+
+    body_lin_vel_tolerance: float = 2.0
+    """Largest difference between the stored body linear velocities and the finite differences of the body positions.
+    It is loose, since recordings store the velocities of the centers of mass."""
+
+    body_ang_vel_tolerance: float = 5.0
+    """Largest difference between the stored body angular velocities and the derivative of the orientations."""
+
+    max_joint_vel: float = 30.0
+    max_body_lin_vel: float = 15.0
+    max_body_ang_vel: float = 40.0
+
+    ground_tolerance: float = 0.05
+    """Largest depth of body frames below the ground plane (z = 0). Frames are not collision shapes, so the default
+    leaves some room."""
+
+    batch_frames: int = 2_000_000
+    """Largest number of frames checked at once, to bound the memory."""
+
+
+def soft_joint_limits(joint_limits: torch.Tensor, factor: float) -> torch.Tensor:
+    """Scales joint limits about their centers, as Isaac Lab does with ``soft_joint_pos_limit_factor``.
+
+    Args:
+        joint_limits: The lower and upper limits. Shape is (J, 2).
+        factor: The fraction of the range to keep.
+
+    Returns:
+        The soft limits. Infinite limits stay infinite. Shape is (J, 2).
+    """
+    center = joint_limits.mean(dim=-1, keepdim=True)
+    half_range = 0.5 * (joint_limits[:, 1:] - joint_limits[:, :1]) * factor
+    soft = torch.cat([center - half_range, center + half_range], dim=-1)
+    return torch.where(torch.isfinite(joint_limits).all(dim=-1, keepdim=True), soft, joint_limits)
+
+
+def load_motion_arrays(motion_file: str, joint_permutation: ColumnPermutation | None = None) -> dict[str, np.ndarray]:
+    """Loads the arrays of a motion clip.
+
+    Regular and compact ``.npz`` archives are read as they are. Retargeted ``.pkl`` files (``fps``, ``root_pos``,
+    ``root_rot`` in ``(x, y, z, w)`` order and ``dof_pos``) become a clip with the root as its only body.
+
+    Args:
+        motion_file: The ``.npz`` or ``.pkl`` file.
+        joint_permutation: Reorders the joints of ``.pkl`` files, which are in SDK order, into the joint order of the
+            articulation. Defaults to None (kept as they are).
+    """
+    if motion_file.endswith(".pkl"):
+        with open(motion_file, "rb") as f:
+            data = pickle.load(f)
+        joint_pos = np.asarray(data["dof_pos"], dtype=np.float32)
+        return {
+            "fps": np.array([data["fps"]]),
+            "joint_pos": joint_permutation(joint_pos) if joint_permutation is not None else joint_pos,
+            "body_pos_w": np.asarray(data["root_pos"], dtype=np.float32)[:, None],
+            "body_quat_w": np.asarray(data["root_rot"], dtype=np.float32)[:, None, [3, 0, 1, 2]],
+        }
+    with open_motion_archive(motion_file) as archive:
+        return {name: np.asarray(archive[name]) for name in archive.files}
+
+
+def _structure_errors(arrays: dict[str, np.ndarray], num_joints: int | None) -> list[str]:
+    errors = [f"missing '{name}'" for name in ("fps",) + POSE_FIELDS if name not in arrays]
+    if errors:
+        return errors
+    num_frames = arrays["joint_pos"].shape[0]
+    expected_dims = {"joint_pos": 2, "joint_vel": 2, "body_pos_w": 3, "body_lin_vel_w": 3, "body_ang_vel_w": 3}
+    for name, value in arrays.items():
+        if name in expected_dims or name == "body_quat_w":
+            if value.ndim != expected_dims.get(name, 3) or value.shape[0] != num_frames:
+                errors.append(f"'{name}' has shape {value.shape} for {num_frames} frames")
+    if arrays["body_quat_w"].shape[-1:] != (4,):
+        errors.append(f"'body_quat_w' has shape {arrays['body_quat_w'].shape}")
+    body_shapes = {
+        arrays[name].shape[:2] for name in ("body_pos_w", "body_lin_vel_w", "body_ang_vel_w") if name in arrays
+    }
+    if len(body_shapes) > 1 or arrays["body_quat_w"].shape[:2] not in body_shapes:
+        errors.append("the body arrays have different numbers of bodies")
+    if "joint_vel" in arrays and arrays["joint_vel"].shape != arrays["joint_pos"].shape:
+        errors.append(f"'joint_vel' has shape {arrays['joint_vel'].shape}, 'joint_pos' {arrays['joint_pos'].shape}")
+    if num_joints is not None and arrays["joint_pos"].shape[-1] != num_joints:
+        errors.append(f"{arrays['joint_pos'].shape[-1]} joints, the robot has {num_joints}")
+    if num_frames < 2:
+        errors.append(f"{num_frames} frames")
+    fps = np.asarray(arrays["fps"]).reshape(-1)
+    if fps.size != 1 or not np.isfinite(fps[0]) or fps[0] <= 0:
+        errors.append(f"invalid fps {fps.tolist()}")
+    return errors
+
+
+def _layout(arrays: dict[str, np.ndarray]) -> tuple:
+    # clips of the same layout are concatenated and checked together
+    velocities = tuple(name for name in VELOCITY_SOURCES if name in arrays)
+    return arrays["joint_pos"].shape[1], arrays["body_pos_w"].shape[1], velocities
+
+
+def _reduce(values: torch.Tensor, clip_ids: torch.Tensor, num_clips: int, reduce: str) -> torch.Tensor:
+    initial = {"sum": 0.0, "amax": -torch.inf, "amin": torch.inf}[reduce]
+    out = torch.full((num_clips, *values.shape[1:]), initial, dtype=values.dtype, device=values.device)
+    index = clip_ids.reshape(-1, *([1] * (values.dim() - 1))).expand_as(values)
+    return out.scatter_reduce_(0, index, values, reduce)
+
+
+def _check_batch(
+    clips: list[dict[str, np.ndarray]],
+    cfg: MotionValidationCfg,
+    joint_limits: torch.Tensor | None,
+    device: str,
+) -> tuple[list[dict], list[dict]]:
+    """Runs the frame checks on clips of the same layout. Returns the issues and statistics of every clip."""
+    num_clips = len(clips)
+    lengths = torch.tensor([clip["joint_pos"].shape[0] for clip in clips], device=device)
+    clip_ids = torch.repeat_interleave(torch.arange(num_clips, device=device), lengths)
+    frame_in_clip = torch.arange(len(clip_ids), device=device) - (torch.cumsum(lengths, dim=0) - lengths)[clip_ids]
+    fps = torch.tensor([float(np.asarray(clip["fps"]).reshape(-1)[0]) for clip in clips], device=device)
+    names = [name for name in clips[0] if name in POSE_FIELDS or name in VELOCITY_SOURCES]
+    data = {
+        name: torch.as_tensor(np.concatenate([clip[name] for clip in clips]), dtype=torch.float32, device=device)
+        for name in names
+    }
+
+    # per frame: whether the check fails and by how much
+    flags, amounts = {}, {}
+    non_finite = sum((~torch.isfinite(value)).reshape(len(clip_ids), -1).sum(dim=-1) for value in data.values())
+    flags["non_finite"], amounts["non_finite"] = non_finite > 0, non_finite.float()
+    data = {name: torch.nan_to_num(value, nan=0.0, posinf=0.0, neginf=0.0) for name, value in data.items()}
+
+    quat_norm_error = (data["body_quat_w"].norm(dim=-1) - 1.0).abs().amax(dim=-1)
+    flags["quat_norm"], amounts["quat_norm"] = quat_norm_error > cfg.quat_norm_tolerance, quat_norm_error
+
+    joint_excess = None
+    if joint_limits is not None:
+        joint_pos = data["joint_pos"]
+        joint_excess = torch.maximum(joint_limits[:, 0] - joint_pos, joint_pos - joint_limits[:, 1]).clamp(min=0.0)
+        amounts["joint_limits"] = joint_excess.amax(dim=-1)
+        flags["joint_limits"] = amounts["joint_limits"] > cfg.joint_limit_tolerance
+
+    # the orientations are normalized first, so that a norm drift is not reported as a velocity spike as well
+    poses = {"joint_pos": data["joint_pos"], "body_pos_w": data["body_pos_w"]}
+    poses["body_quat_w"] = data["body_quat_w"] / data["body_quat_w"].norm(dim=-1, keepdim=True).clamp(min=1e-6)
+    derived = derive_velocities(poses, fps, clip_lengths=lengths)
+    speeds = {
+        "joint_vel": derived["joint_vel"].abs().amax(dim=-1),
+        "body_lin_vel_w": derived["body_lin_vel_w"].norm(dim=-1).amax(dim=-1),
+        "body_ang_vel_w": derived["body_ang_vel_w"].norm(dim=-1).amax(dim=-1),
+    }
+    limits = {
+        "joint_vel": (cfg.joint_vel_tolerance, cfg.max_joint_vel),
+        "body_lin_vel_w": (cfg.body_lin_vel_tolerance, cfg.max_body_lin_vel),
+        "body_ang_vel_w": (cfg.body_ang_vel_tolerance, cfg.max_body_ang_vel),
+    }
+    # excess over the thresholds, relative to them, so that the velocities of all kinds can be compared
+    spike = torch.zeros(len(clip_ids), device=device)
+    for name, (tolerance, max_speed) in limits.items():
+        spike = torch.maximum(spike, speeds[name] / max_speed - 1.0)
+        if name in data:
+            error = data[name] - derived[name]
+            error = error.abs() if name == "joint_vel" else error.norm(dim=-1)
+            spike = torch.maximum(spike, error.amax(dim=-1) / tolerance - 1.0)
+    flags["velocity_spike"], amounts["velocity_spike"] = spike > 0.0, spike.clamp(min=0.0)
+
+    depth = -data["body_pos_w"][..., 2].amin(dim=-1)
+    flags["ground_penetration"], amounts["ground_penetration"] = depth > cfg.ground_tolerance, depth
+
+    counts = {name: _reduce(flag.float(), clip_ids, num_clips, "sum") for name, flag in flags.items()}
+    firsts = {
+        name: _reduce(torch.where(flag, frame_in_clip, len(clip_ids)).float(), clip_ids, num_clips, "amin")
+        for name, flag in flags.items()
+    }
+    maxima = {name: _reduce(amount, clip_ids, num_clips, "amax") for name, amount in amounts.items()}
+    violated_joints = None
+    if joint_excess is not None:
+        violated_joints = _reduce((joint_excess > cfg.joint_limit_tolerance).float(), clip_ids, num_clips, "amax")
+    stats = {
+        "max_joint_vel": _reduce(speeds["joint_vel"], clip_ids, num_clips, "amax"),
+        "max_body_lin_vel": _reduce(speeds["body_lin_vel_w"], clip_ids, num_clips, "amax"),
+        "max_root_lin_vel": _reduce(derived["body_lin_vel_w"][:, 0].norm(dim=-1), clip_ids, num_clips, "amax"),
+        "min_body_height": -_reduce(depth, clip_ids, num_clips, "amax"),
+        "mean_root_height": _reduce(data["body_pos_w"][:, 0, 2], clip_ids, num_clips, "sum") / lengths,
+    }
+    joint_min = _reduce(data["joint_pos"], clip_ids, num_clips, "amin")
+    joint_max = _reduce(data["joint_pos"], clip_ids, num_clips, "amax")
+
+    # a single transfer of the reductions to the host
+    counts, firsts, maxima, stats = ({k: v.tolist() for k, v in d.items()} for d in (counts, firsts, maxima, stats))
+    violated_joints = violated_joints.bool().tolist() if violated_joints is not None else None
+    joint_min, joint_max = joint_min.tolist(), joint_max.tolist()
+
+    issues, clip_stats = [], []
+    for i in range(num_clips):
+        clip_issues = {}
+        for name in flags:
+            if counts[name][i] > 0:
+                clip_issues[name] = {
+                    "frames": int(counts[name][i]),
+                    "first_frame": int(firsts[name][i]),
+                    "max": float(maxima[name][i]),
+                }
+        if "joint_limits" in clip_issues:
+            clip_issues["joint_limits"]["joints"] = [j for j, violated in enumerate(violated_joints[i]) if violated]
+        issues.append(clip_issues)
+        clip_stats.append(
+            {name: float(value[i]) for name, value in stats.items()}
+            | {"joint_pos_min": joint_min[i], "joint_pos_max": joint_max[i]}
+        )
+    return issues, clip_stats
+
+
+def validate_motions(
+    motion_files: Sequence[str],
+    cfg: MotionValidationCfg | None = None,
+    joint_limits: torch.Tensor | None = None,
+    joint_names: Sequence[str] | None = None,
+    joint_permutation: ColumnPermutation | None = None,
+    device: str = "cpu",
+    on_clip: Callable[[dict], None] | None = None,
+) -> dict:
+    """Checks a library of motion clips.
+
+    Args:
+        motion_files: The ``.npz`` or ``.pkl`` clips.
+        cfg: The thresholds. Defaults to :class:`MotionValidationCfg`.
+        joint_limits: The soft joint limits in the joint order of the clips (see :func:`soft_joint_limits`). Shape
+            is (J, 2). Defaults to None, which skips the joint limit check and the joint count check.
+        joint_names: The names of the joints, used in the report. Defaults to None (indexes).
+        joint_permutation: Reorders the joints of ``.pkl`` clips (see :func:`load_motion_arrays`).
+        device: The device the checks run on.
+        on_clip: Called with the report of every clip once it is checked.
+
+    Returns:
+        The report: ``summary`` (clip and frame counts, the number of clips failing every check, the frame rates and
+        the joint ranges of the library), ``config`` and ``clips``, with the ``file``, ``num_frames``, ``fps``,
+        ``issues`` and ``stats`` of every clip.
+    """
+    cfg = cfg or MotionValidationCfg()
+    start = time.perf_counter()
+    if joint_limits is not None:
+        joint_limits = joint_limits.to(device=device, dtype=torch.float32)
+    num_joints = None if joint_limits is None else joint_limits.shape[0]
+
+    reports = []
+    layouts = collections.defaultdict(list)
+    for motion_file in motion_files:
+        report = {"file": motion_file, "num_frames": 0, "fps": None, "issues": {}, "stats": {}}
+        reports.append(report)
+        try:
+            arrays = load_motion_arrays(motion_file, joint_permutation)
+        except Exception as e:
+            report["issues"]["structure"] = {"errors": [f"cannot be loaded: {type(e).__name__}: {e}"]}
+            continue
+        errors = _structure_errors(arrays, num_joints)
+        if "joint_pos" in arrays:
+            report["num_frames"] = int(arrays["joint_pos"].shape[0])
+        if "fps" in arrays and np.asarray(arrays["fps"]).size == 1:
+            report["fps"] = float(np.asarray(arrays["fps"]).reshape(-1)[0])
+        if errors:
+            report["issues"]["structure"] = {"errors": errors}
+            continue
+        layouts[_layout(arrays)].append((report, arrays))
+
+    for clips in layouts.values():
+        batch = []
+        for i, (report, arrays) in enumerate(clips):
+            batch.append((report, arrays))
+            batch_frames = sum(item[1]["joint_pos"].shape[0] for item in batch)
+            if batch_frames >= cfg.batch_frames or i == len(clips) - 1:
+                issues, stats = _check_batch([item[1] for item in batch], cfg, joint_limits, device)
+                for (report, _), clip_issues, clip_stats in zip(batch, issues, stats):
+                    report["issues"].update(clip_issues)
+                    report["stats"] = clip_stats
+                batch = []
+
+    frame_rates = collections.Counter(report["fps"] for report in reports if report["fps"] is not None)
+    expected_fps = cfg.fps if cfg.fps is not None else (frame_rates.most_common(1)[0][0] if frame_rates else None)
+    for report in reports:
+        if report["fps"] is not None and expected_fps is not None and report["fps"] != expected_fps:
+            report["issues"]["fps"] = {"fps": report["fps"], "expected": expected_fps}
+        if report["stats"]:
+            report["stats"]["duration"] = (report["num_frames"] - 1) / report["fps"]
+
+    checked = [report for report in reports if report["stats"]]
+    joint_range = None
+    if checked:
+        joint_min = np.min([report["stats"]["joint_pos_min"] for report in checked], axis=0).tolist()
+        joint_max = np.max([report["stats"]["joint_pos_max"] for report in checked], axis=0).tolist()
+        names = joint_names if joint_names is not None else [str(j) for j in range(len(joint_min))]
+        if len(names) == len(joint_min):
+            joint_range = {name: [lo, hi] for name, lo, hi in zip(names, joint_min, joint_max)}
+    if joint_names is not None:
+        for report in reports:
+            if "joint_limits" in report["issues"]:
+                report["issues"]["joint_limits"]["joints"] = [
+                    joint_names[j] for j in report["issues"]["joint_limits"]["joints"]
+                ]
+    if on_clip is not None:
+        for report in reports:
+            on_clip(report)
+
+    summary = {
+        "num_clips": len(reports),
+        "num_clips_with_issues": sum(bool(report["issues"]) for report in reports),
+        "num_frames": sum(report["num_frames"] for report in checked),
+        "duration": sum(report["stats"]["duration"] for report in checked),
+        "clips_per_check": {
+            name: sum(name in report["issues"] for report in reports) for name in ("structure", "fps") + FRAME_CHECKS
+        },
+        "fps": {str(fps): count for fps, count in sorted(frame_rates.items())},
+        "expected_fps": expected_fps,
+        "joint_range": joint_range,
+        "seconds": time.perf_counter() - start,
+    }
+    return {"summary": summary, "config": asdict(cfg), "clips": reports}
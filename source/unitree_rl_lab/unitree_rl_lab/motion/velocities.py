@@ -0,0 +1,94 @@
+"""Velocities of motion clips derived from their poses.
+
+Motion archives may omit ``joint_vel``, ``body_lin_vel_w`` and ``body_ang_vel_w``, since they follow from the poses.
+:func:`derive_velocities` reconstructs them with the finite differences of :class:`~unitree_rl_lab.motion.CsvMotionLoader`:
+central differences with one-sided ones at the clip edges (as :func:`torch.gradient`) for positions, and
+:func:`~unitree_rl_lab.motion.so3_derivative` for orientations. It works on several clips concatenated along the time
+axis, without differencing across clip boundaries, so a whole motion library is derived in one batched pass.
+
+Simulator recordings store the velocity of the center of mass in ``body_lin_vel_w``, while the derived one is the
+velocity of the body frame, which differs by the angular velocity crossed with the offset of the center of mass.
+"""
+
+from __future__ import annotations
+
+import torch
+from collections.abc import Iterable, Mapping
+
+from unitree_rl_lab.utils.quat_kernels import axis_angle_from_quat, quat_inv, quat_mul
+
+__all__ = ["VELOCITY_SOURCES", "derive_velocities"]
+
+VELOCITY_SOURCES = {"joint_vel": "joint_pos", "body_lin_vel_w": "body_pos_w", "body_ang_vel_w": "body_quat_w"}
+"""The pose array every velocity array is derived from."""
+
+
+def _difference_frames(clip_lengths: torch.Tensor, repeat_edges: bool) -> tuple[torch.Tensor, torch.Tensor]:
+    """Returns the frames whose difference gives the derivative at every frame of concatenated clips.
+
+    With ``repeat_edges``, the first and last frame of clips with at least three frames take the central difference of
+    their neighbor (as :func:`~unitree_rl_lab.motion.so3_derivative`), otherwise a one-sided difference. Single-frame
+    clips difference a frame with itself.
+    """
+    clip_ids = torch.repeat_interleave(torch.arange(len(clip_lengths), device=clip_lengths.device), clip_lengths)
+    start = (torch.cumsum(clip_lengths, dim=0) - clip_lengths)[clip_ids]
+    end = start + clip_lengths[clip_ids] - 1
+    frames = torch.arange(len(clip_ids), device=clip_lengths.device)
+    prev_frames = torch.maximum(frames - 1, start)
+    next_frames = torch.minimum(frames + 1, end)
+    if repeat_edges:
+        long_clip = end - start >= 2
+        prev_frames = torch.where((frames == end) & long_clip, frames - 2, prev_frames)
+        next_frames = torch.where((frames == start) & long_clip, frames + 2, next_frames)
+    return prev_frames, next_frames
+
+
+def derive_velocities(
+    poses: Mapping[str, torch.Tensor],
+    fps: float | torch.Tensor,
+    names: Iterable[str] = tuple(VELOCITY_SOURCES),
+    clip_lengths: torch.Tensor | None = None,
+) -> dict[str, torch.Tensor]:
+    """Derives velocity arrays from the pose arrays of motion clips, on the device of the poses.
+
+    Args:
+        poses: The pose arrays the requested velocities are derived from (see :data:`VELOCITY_SOURCES`), with the
+            frames of all clips along the first axis.
+        fps: The frame rate, or the frame rate of every clip. Shape is () or (num_clips,).
+        names: The velocity arrays to derive. Defaults to all of them.
+        clip_lengths: The number of frames of every concatenated clip. Defaults to None (a single clip).
+
+    Returns:
+        The velocity arrays, with the shapes of their pose arrays (and 3 instead of 4 for orientations).
+    """
+    names = list(names)
+    if not names:
+        return {}
+    reference = poses[VELOCITY_SOURCES[names[0]]]
+    device = reference.device
+    if clip_lengths is None:
+        clip_lengths = torch.tensor([reference.shape[0]], device=device)
+    clip_lengths = clip_lengths.to(device=device, dtype=torch.long)
+    fps = torch.as_tensor(fps, dtype=torch.float32, device=device).reshape(-1).expand(len(clip_lengths))
+    frame_fps = torch.repeat_interleave(fps, clip_lengths)
+
+    velocities = {}
+    linear_names = [name for name in names if name != "body_ang_vel_w"]
+    if linear_names:
+        # all positions are differenced together, with one gather per side
+        prev_frames, next_frames = _difference_frames(clip_lengths, repeat_edges=False)
+        scale = frame_fps / (next_frames - prev_frames).clamp(min=1)
+        sources = [poses[VELOCITY_SOURCES[name]] for name in linear_names]
+        flat = torch.cat([source.reshape(source.shape[0], -1) for source in sources], dim=1)
+        flat_velocities = (flat[next_frames] - flat[prev_frames]) * scale[:, None]
+        for name, source, velocity in zip(
+            linear_names, sources, flat_velocities.split([source[0].numel() for source in sources], dim=1)
+        ):
+            velocities[name] = velocity.reshape(source.shape)
+    if "body_ang_vel_w" in names:
+        quats = poses["body_quat_w"]
+        prev_frames, next_frames = _difference_frames(clip_lengths, repeat_edges=True)
+        scale = (frame_fps / (next_frames - prev_frames).clamp(min=1)).reshape(-1, *([1] * (quats.dim() - 1)))
+        velocities["body_ang_vel_w"] = axis_angle_from_quat(quat_mul(quats[next_frames], quat_inv(quats[prev_frames])))
+        velocities["body_ang_vel_w"] *= scale
+    return velocities
@@ -2,6 +2,7 @@ from isaaclab.envs.mdp import *  # noqa: F401, F403
 from isaaclab_tasks.manager_based.locomotion.velocity.mdp import *  # noqa: F401, F403
 
 from .commands import *  # noqa: F401, F403
+from .contacts import *  # noqa: F401, F403
 from .curriculums import *  # noqa: F401, F403
 from .observations import *  # noqa: F401, F403
 from .rewards import *  # noqa: F401, F403
@@ -1 +1 @@
-from .velocity_command import UniformLevelVelocityCommandCfg  # noqa: F401, F403
+from .velocity_command import UniformLevelVelocityCommand, UniformLevelVelocityCommandCfg  # noqa: F401, F403
@@ -1,11 +1,267 @@
 from __future__ import annotations
 
+import torch
+import torch.nn.functional as F
+from collections.abc import Sequence
 from dataclasses import MISSING
+from typing import TYPE_CHECKING, Literal
 
-from isaaclab.envs.mdp import UniformVelocityCommandCfg
+import isaaclab.utils.math as math_utils
+from isaaclab.envs.mdp import UniformVelocityCommand, UniformVelocityCommandCfg
 from isaaclab.utils import configclass
 
+if TYPE_CHECKING:
+    from isaaclab.envs import ManagerBasedRLEnv
+
+
+class UniformLevelVelocityCommand(UniformVelocityCommand):
+    """Uniform velocity command whose ranges are widened by a curriculum.
+
+    The ranges of ``lin_vel_x``, ``lin_vel_y`` and ``ang_vel_z`` are kept on the device in :attr:`range_table`, with
+    one row per range group (see :attr:`UniformLevelVelocityCommandCfg.range_groups`). The commands are sampled from
+    the row of every env and the curricula update the rows with tensor operations, so neither reads back to the host.
+    ``cfg.ranges`` only holds the initial ranges.
+
+    With :attr:`UniformLevelVelocityCommandCfg.adaptive_sampling`, the ranges are not widened by the curricula but
+    follow the tracking success of the commands: the limit ranges are split into a grid of bins, the commands are
+    sampled from the unlocked bins of the range group of an env, and a bin whose success rate passes the threshold
+    unlocks its neighbors and is sampled less often. The success rates are EMAs of the bins of every range group, and
+    the rows of :attr:`range_table` are the bounding boxes of the unlocked bins.
+    """
+
+    cfg: UniformLevelVelocityCommandCfg
+
+    AXES = {"lin_vel_x": 0, "lin_vel_y": 1, "ang_vel_z": 2}
+    """The column of every command range in :attr:`range_table`."""
+
+    def __init__(self, cfg: UniformLevelVelocityCommandCfg, env: ManagerBasedRLEnv):
+        super().__init__(cfg, env)
+        if cfg.range_groups == "global":
+            num_groups = 1
+        elif cfg.range_groups == "env":
+            num_groups = self.num_envs
+        elif cfg.range_groups == "terrain_level":
+            if getattr(env.scene.terrain, "terrain_levels", None) is None:
+                raise ValueError("Ranges per terrain level require a terrain generator with curriculum.")
+            num_groups = env.scene.terrain.max_terrain_level
+        else:
+            raise ValueError(f"Unknown range groups '{cfg.range_groups}'.")
+
+        initial = torch.tensor([getattr(cfg.ranges, name) for name in self.AXES], device=self.device)
+        self.range_table = initial.repeat(num_groups, 1, 1)
+        """The command ranges of every group. Shape is (num_groups, 3, 2)."""
+        self.limit_table = torch.tensor([getattr(cfg.limit_ranges, name) for name in self.AXES], device=self.device)
+        """The limits of the command ranges. Shape is (3, 2)."""
+        self._group_ids = (
+            torch.arange(self.num_envs, device=self.device)
+            if cfg.range_groups == "env"
+            else torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        )
+        if cfg.adaptive_sampling:
+            self._init_adaptive_bins(initial)
+
+    @property
+    def num_groups(self) -> int:
+        return self.range_table.shape[0]
+
+    @property
+    def group_ids(self) -> torch.Tensor:
+        """The range group of every env. Shape is (num_envs,)."""
+        if self.cfg.range_groups == "terrain_level":
+            return self._env.scene.terrain.terrain_levels.clamp(max=self.num_groups - 1)
+        return self._group_ids
+
+    """
+    Operations.
+    """
+
+    def group_mean(self, env_ids: Sequence[int] | slice, values: torch.Tensor) -> torch.Tensor:
+        """Averages ``values`` of the envs ``env_ids`` over their range groups. Groups without envs are NaN.
+
+        Returns:
+            The mean of every group. Shape is (num_groups,).
+        """
+        groups = self.group_ids[env_ids]
+        sums = torch.zeros(self.num_groups, device=self.device).index_add_(0, groups, values.float())
+        counts = torch.zeros(self.num_groups, device=self.device).index_add_(0, groups, torch.ones_like(values.float()))
+        return sums / counts
+
+    def widen_ranges(self, axes: slice, mask: torch.Tensor, delta: float):
+        """Widens the ranges ``axes`` of the groups in ``mask`` by ``delta`` on both sides, within the limits.
+
+        Args:
+            axes: The columns of :attr:`range_table` to widen.
+            mask: Which groups to widen. Shape is (num_groups,).
+            delta: The amount to widen by.
+        """
+        step = (delta * mask.float())[:, None]
+        table = self.range_table[:, axes]
+        table[..., 0] -= step
+        table[..., 1] += step
+        limits = self.limit_table[axes]
+        table.clamp_(min=limits[:, :1], max=limits[:, 1:])
+
+    """
+    Implementation specific functions.
+    """
+
+    def _update_metrics(self):
+        super()._update_metrics()
+        if self.cfg.adaptive_sampling:
+            # the tracking of the current command, scored as the tracking rewards
+            lin_vel_std, ang_vel_std = self.cfg.adaptive_tracking_std
+            lin_vel_error = torch.sum(
+                torch.square(self.vel_command_b[:, :2] - self.robot.data.root_lin_vel_b[:, :2]), dim=1
+            )
+            ang_vel_error = torch.square(self.vel_command_b[:, 2] - self.robot.data.root_ang_vel_b[:, 2])
+            self._tracking[:, 0] += torch.exp(-lin_vel_error / lin_vel_std**2)
+            self._tracking[:, 1] += torch.exp(-ang_vel_error / ang_vel_std**2)
+            self._tracking[:, 2] += 1.0
+
+    def _resample_command(self, env_ids: Sequence[int]):
+        if self.cfg.adaptive_sampling:
+            self._update_bin_success(env_ids)
+            self._adaptive_sampling(env_ids)
+        else:
+            ranges = self.range_table[self.group_ids[env_ids]]
+            r = torch.rand(ranges.shape[:2], device=self.device)
+            self.vel_command_b[env_ids] = torch.lerp(ranges[..., 0], ranges[..., 1], r)
+        r = torch.empty(len(env_ids), device=self.device)
+        # heading target
+        if self.cfg.heading_command:
+            self.heading_target[env_ids] = r.uniform_(*self.cfg.ranges.heading)
+            # update heading envs
+            self.is_heading_env[env_ids] = r.uniform_(0.0, 1.0) <= self.cfg.rel_heading_envs
+        # update standing envs
+        self.is_standing_env[env_ids] = r.uniform_(0.0, 1.0) <= self.cfg.rel_standing_envs
+
+    def _update_command(self):
+        """Post-processes the velocity command, as :class:`UniformVelocityCommand` with the ranges of every env."""
+        if self.cfg.heading_command:
+            ang_vel_z = self.range_table[self.group_ids, self.AXES["ang_vel_z"]]
+            heading_error = math_utils.wrap_to_pi(self.heading_target - self.robot.data.heading_w)
+            heading_ang_vel = torch.clamp(
+                self.cfg.heading_control_stiffness * heading_error, min=ang_vel_z[:, 0], max=ang_vel_z[:, 1]
+            )
+            self.vel_command_b[:, 2] = torch.where(self.is_heading_env, heading_ang_vel, self.vel_command_b[:, 2])
+        self.vel_command_b.masked_fill_(self.is_standing_env[:, None], 0.0)
+
+    """
+    Adaptive sampling.
+    """
+
+    def _init_adaptive_bins(self, initial: torch.Tensor):
+        """Splits the limit ranges into the bins of ``cfg.adaptive_bins`` and unlocks the bins of the initial ranges."""
+        if self.cfg.heading_command:
+            raise ValueError("Adaptive sampling scores the sampled yaw rate and does not support heading commands.")
+        self.bin_shape = tuple(self.cfg.adaptive_bins)
+        self.bin_count = self.bin_shape[0] * self.bin_shape[1] * self.bin_shape[2]
+        self._bin_width = (self.limit_table[:, 1] - self.limit_table[:, 0]) / torch.tensor(
+            self.bin_shape, device=self.device
+        )
+        grid = torch.stack(
+            torch.meshgrid(*[torch.arange(n, device=self.device) for n in self.bin_shape], indexing="ij"), dim=-1
+        ).view(-1, 3)
+        self._bin_lower = self.limit_table[:, 0] + grid * self._bin_width
+        """The lower corner of every bin. Shape is (bin_count, 3)."""
+
+        # the bins overlapping the initial ranges, or containing them where they are a single value
+        eps = 1e-6
+        bin_upper = self._bin_lower + self._bin_width
+        overlaps = (bin_upper > initial[:, 0] + eps) & (self._bin_lower < initial[:, 1] - eps)
+        contains = (self._bin_lower <= initial[:, 0]) & (initial[:, 0] <= bin_upper)
+        unlocked = torch.where(initial[:, 1] - initial[:, 0] > 2 * eps, overlaps, contains).all(dim=-1)
+        self.bin_unlocked = unlocked.repeat(self.num_groups, 1)
+        """Which bins the commands of every range group are sampled from. Shape is (num_groups, bin_count)."""
+        self.bin_success = torch.zeros(self.num_groups, self.bin_count, device=self.device)
+        """EMA of the success rate of the commands of every bin. Shape is (num_groups, bin_count)."""
+        self.command_bins = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        """The bin of the current command of every env."""
+        # tracking score sums of the current command: linear velocity, yaw rate, number of steps
+        self._tracking = torch.zeros(self.num_envs, 3, device=self.device)
+        self.metrics["unlocked_bins"] = torch.zeros(self.num_envs, device=self.device)
+        self.metrics["solved_bins"] = torch.zeros(self.num_envs, device=self.device)
+        self._update_range_table()
+
+    def _update_bin_success(self, env_ids: Sequence[int]):
+        """Scores the finished commands of ``env_ids`` and updates the success rates and unlocked bins."""
+        tracking = self._tracking[env_ids]
+        steps = tracking[:, 2]
+        scores = tracking[:, :2] / steps.clamp(min=1.0)[:, None]
+        # commands that end in a failure fail, the ones the env stood still for or held too briefly do not count
+        success = torch.all(scores > self.cfg.adaptive_success_threshold, dim=1)
+        success &= ~self._env.termination_manager.terminated[env_ids]
+        valid = (steps >= self.cfg.adaptive_min_steps) & ~self.is_standing_env[env_ids]
+        bins = self.group_ids[env_ids] * self.bin_count + self.command_bins[env_ids]
+        counts = torch.zeros(self.bin_success.numel(), device=self.device).index_add_(0, bins, valid.float())
+        successes = torch.zeros_like(counts).index_add_(0, bins, (valid & success).float())
+        bin_success = self.bin_success.view(-1)
+        rate = torch.lerp(bin_success, successes / counts.clamp(min=1.0), self.cfg.adaptive_alpha)
+        bin_success.copy_(torch.where(counts > 0, rate, bin_success))
+        self._tracking[env_ids] = 0.0
+
+        # solved bins unlock their neighbors
+        solved = (self.bin_success > self.cfg.adaptive_success_threshold) & self.bin_unlocked
+        neighbors = F.max_pool3d(solved.float().view(-1, 1, *self.bin_shape), 3, stride=1, padding=1)
+        self.bin_unlocked |= neighbors.view(self.num_groups, self.bin_count) > 0
+        self._update_range_table()
+        group_ids = self.group_ids
+        self.metrics["unlocked_bins"][:] = self.bin_unlocked.float().mean(dim=1)[group_ids]
+        self.metrics["solved_bins"][:] = solved.float().mean(dim=1)[group_ids]
+
+    def _adaptive_sampling(self, env_ids: Sequence[int]):
+        """Samples the commands of ``env_ids`` from the unlocked bins, the solved ones with a lower weight."""
+        weights = self.bin_unlocked * torch.where(
+            self.bin_success > self.cfg.adaptive_success_threshold, self.cfg.adaptive_solved_weight, 1.0
+        )
+        cumsum = torch.cumsum(weights, dim=1)
+        draws = torch.rand(len(env_ids), 4, device=self.device)
+        if self.num_groups == 1:
+            bins = torch.searchsorted(cumsum[0], draws[:, 0] * cumsum[0, -1], right=True)
+        else:
+            cumsum = cumsum[self.group_ids[env_ids]]
+            bins = torch.searchsorted(cumsum, (draws[:, 0] * cumsum[:, -1])[:, None], right=True).squeeze(1)
+        bins.clamp_(max=self.bin_count - 1)
+        self.command_bins[env_ids] = bins
+        self.vel_command_b[env_ids] = self._bin_lower[bins] + draws[:, 1:] * self._bin_width
+
+    def _update_range_table(self):
+        # the bounding boxes of the unlocked bins
+        unlocked = self.bin_unlocked[..., None]
+        self.range_table[..., 0] = torch.where(unlocked, self._bin_lower, torch.inf).amin(dim=1)
+        self.range_table[..., 1] = torch.where(unlocked, self._bin_lower + self._bin_width, -torch.inf).amax(dim=1)
+
 
 @configclass
 class UniformLevelVelocityCommandCfg(UniformVelocityCommandCfg):
+    class_type: type = UniformLevelVelocityCommand
+
     limit_ranges: UniformVelocityCommandCfg.Ranges = MISSING
+
+    range_groups: Literal["global", "env", "terrain_level"] = "global"
+    """Which envs share the command ranges the curricula widen: all of them, none of them, or the envs on the same
+    terrain level. Defaults to "global"."""
+
+    adaptive_sampling: bool = False
+    """Whether to sample the commands from the bins of ``limit_ranges`` unlocked by the tracking success instead of
+    uniformly from the ranges widened by the curricula. The velocity command curricula then only log the ranges.
+    Defaults to False."""
+
+    adaptive_bins: tuple[int, int, int] = (10, 3, 8)
+    """The number of bins of ``lin_vel_x``, ``lin_vel_y`` and ``ang_vel_z``. Defaults to (10, 3, 8)."""
+
+    adaptive_tracking_std: tuple[float, float] = (0.5, 0.5)
+    """The standard deviations of the exponential tracking scores of the linear velocity and the yaw rate, as in the
+    tracking rewards. Defaults to (0.5, 0.5)."""
+
+    adaptive_success_threshold: float = 0.8
+    """The mean tracking score a command needs to succeed, and the success rate that solves a bin. Defaults to 0.8."""
+
+    adaptive_min_steps: int = 50
+    """The number of steps a command needs to be held to count. Defaults to 50."""
+
+    adaptive_alpha: float = 0.1
+    """The EMA factor of the success rates, per resampling. Defaults to 0.1."""
+
+    adaptive_solved_weight: float = 0.2
+    """The sampling weight of the solved bins relative to the other unlocked bins. Defaults to 0.2."""
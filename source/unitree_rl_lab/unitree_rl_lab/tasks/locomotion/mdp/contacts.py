@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import torch
+import weakref
+from typing import TYPE_CHECKING
+
+from isaaclab.sensors import ContactSensor
+
+if TYPE_CHECKING:
+    from isaaclab.envs import ManagerBasedRLEnv
+
+__all__ = ["ContactFeatures", "contact_features"]
+
+
+class ContactFeatures:
+    """Reductions of the net contact forces of a contact sensor in one step, shared by the contact terms.
+
+    The norms over the force history are computed for all bodies of the sensor at once, on first access in a step, and
+    every term then selects its bodies from the (num_envs, num_bodies) blocks instead of gathering and reducing the
+    (num_envs, history_length, num_bodies, 3) history itself. All features are views into one preallocated block.
+
+    The features are versioned by ``env.common_step_counter``, so they describe the state the rewards and terminations
+    of a step are computed on, not the sensor data reset envs get afterwards.
+    """
+
+    def __init__(self, sensor: ContactSensor):
+        self.sensor = sensor
+        num_envs, _, num_bodies = sensor.data.net_forces_w_history.shape[:3]
+        self._block = torch.zeros(4, num_envs, num_bodies, device=sensor.device)
+        self.force_norm_max = self._block[0]
+        """Largest force norm over the history. Shape is (num_envs, num_bodies)."""
+        self.force_norm = self._block[1]
+        """Current force norm. Shape is (num_envs, num_bodies)."""
+        self.force_xy_norm = self._block[2]
+        """Norm of the current horizontal force. Shape is (num_envs, num_bodies)."""
+        self.force_z_abs = self._block[3]
+        """Magnitude of the current vertical force. Shape is (num_envs, num_bodies)."""
+        self._contact_masks: dict[float, torch.Tensor] = {}
+        self._version = None
+
+    def update(self, version: int) -> ContactFeatures:
+        """Recomputes the features if they were computed for another ``version`` of the step counter. Returns self."""
+        if version == self._version:
+            return self
+        self._version = version
+        self._contact_masks.clear()
+        forces = self.sensor.data.net_forces_w_history
+        torch.amax(torch.linalg.vector_norm(forces, dim=-1), dim=1, out=self.force_norm_max)
+        current = self.sensor.data.net_forces_w
+        torch.linalg.vector_norm(current, dim=-1, out=self.force_norm)
+        torch.linalg.vector_norm(current[..., :2], dim=-1, out=self.force_xy_norm)
+        torch.abs(current[..., 2], out=self.force_z_abs)
+        return self
+
+    def in_contact(self, threshold: float) -> torch.Tensor:
+        """Whether the largest force norm over the history exceeds ``threshold``, for all bodies of the sensor.
+
+        The mask of every threshold is computed once per step. Shape is (num_envs, num_bodies).
+        """
+        mask = self._contact_masks.get(threshold)
+        if mask is None:
+            mask = self._contact_masks[threshold] = self.force_norm_max > threshold
+        return mask
+
+
+_CONTACT_FEATURES: weakref.WeakKeyDictionary[ManagerBasedRLEnv, dict[str, ContactFeatures]] = (
+    weakref.WeakKeyDictionary()
+)
+"""The contact features of every env, by sensor name. They are dropped with the env."""
+
+
+def contact_features(env: ManagerBasedRLEnv, sensor_name: str) -> ContactFeatures:
+    """Returns the up-to-date contact features of the sensor ``sensor_name``, created on first use."""
+    features = _CONTACT_FEATURES.setdefault(env, {})
+    if sensor_name not in features:
+        features[sensor_name] = ContactFeatures(env.scene.sensors[sensor_name])
+    return features[sensor_name].update(env.common_step_counter)
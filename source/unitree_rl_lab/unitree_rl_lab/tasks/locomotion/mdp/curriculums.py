@@ -7,34 +7,34 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedRLEnv
 
+    from .commands import UniformLevelVelocityCommand
+
+
+def _widen_tracked_ranges(
+    env: ManagerBasedRLEnv, env_ids: Sequence[int], reward_term_name: str, axes: slice
+) -> UniformLevelVelocityCommand:
+    """Widens the command ranges ``axes`` of the range groups whose reset envs tracked the command well.
+
+    The tracking reward is averaged over the reset envs of every range group on the device, and the ranges of the groups
+    above 80% of the reward weight are widened by 0.1, without reading the reward back to the host. With adaptive
+    sampling, the command term widens its ranges itself.
+    """
+    command_term: UniformLevelVelocityCommand = env.command_manager.get_term("base_velocity")
+    if not command_term.cfg.adaptive_sampling and env.common_step_counter % env.max_episode_length == 0:
+        reward_term = env.reward_manager.get_term_cfg(reward_term_name)
+        reward = command_term.group_mean(env_ids, env.reward_manager._episode_sums[reward_term_name][env_ids])
+        # groups without reset envs are NaN and stay as they are
+        command_term.widen_ranges(axes, reward / env.max_episode_length_s > reward_term.weight * 0.8, 0.1)
+    return command_term
+
 
 def lin_vel_cmd_levels(
     env: ManagerBasedRLEnv,
     env_ids: Sequence[int],
     reward_term_name: str = "track_lin_vel_xy_exp",
 ) -> torch.Tensor:
-    command_term = env.command_manager.get_term("base_velocity")
-    ranges = command_term.cfg.ranges
-    limit_ranges = command_term.cfg.limit_ranges
-
-    reward_term = env.reward_manager.get_term_cfg(reward_term_name)
-    reward = torch.mean(env.reward_manager._episode_sums[reward_term_name][env_ids]) / env.max_episode_length_s
-
-    if env.common_step_counter % env.max_episode_length == 0:
-        if reward > reward_term.weight * 0.8:
-            delta_command = torch.tensor([-0.1, 0.1], device=env.device)
-            ranges.lin_vel_x = torch.clamp(
-                torch.tensor(ranges.lin_vel_x, device=env.device) + delta_command,
-                limit_ranges.lin_vel_x[0],
-                limit_ranges.lin_vel_x[1],
-            ).tolist()
-            ranges.lin_vel_y = torch.clamp(
-                torch.tensor(ranges.lin_vel_y, device=env.device) + delta_command,
-                limit_ranges.lin_vel_y[0],
-                limit_ranges.lin_vel_y[1],
-            ).tolist()
-
-    return torch.tensor(ranges.lin_vel_x[1], device=env.device)
+    command_term = _widen_tracked_ranges(env, env_ids, reward_term_name, slice(0, 2))
+    return command_term.range_table[:, 0, 1].mean()
 
 
 def ang_vel_cmd_levels(
@@ -42,20 +42,5 @@ def ang_vel_cmd_levels(
     env_ids: Sequence[int],
     reward_term_name: str = "track_ang_vel_z_exp",
 ) -> torch.Tensor:
-    command_term = env.command_manager.get_term("base_velocity")
-    ranges = command_term.cfg.ranges
-    limit_ranges = command_term.cfg.limit_ranges
-
-    reward_term = env.reward_manager.get_term_cfg(reward_term_name)
-    reward = torch.mean(env.reward_manager._episode_sums[reward_term_name][env_ids]) / env.max_episode_length_s
-
-    if env.common_step_counter % env.max_episode_length == 0:
-        if reward > reward_term.weight * 0.8:
-            delta_command = torch.tensor([-0.1, 0.1], device=env.device)
-            ranges.ang_vel_z = torch.clamp(
-                torch.tensor(ranges.ang_vel_z, device=env.device) + delta_command,
-                limit_ranges.ang_vel_z[0],
-                limit_ranges.ang_vel_z[1],
-            ).tolist()
-
-    return torch.tensor(ranges.ang_vel_z[1], device=env.device)
+    command_term = _widen_tracked_ranges(env, env_ids, reward_term_name, slice(2, 3))
+    return command_term.range_table[:, 2, 1].mean()
@@ -12,6 +12,8 @@ from isaaclab.managers import SceneEntityCfg
 from isaaclab.sensors import ContactSensor
 import isaaclab.utils.math as math_utils
 
+from .contacts import contact_features
+
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedRLEnv
 
@@ -270,16 +272,12 @@ def joint_acc_l2(env: ManagerBasedRLEnv, asset_cfg: SceneEntityCfg = SceneEntity
 
 
 def undesired_contacts(env: ManagerBasedRLEnv, threshold: float, sensor_cfg: SceneEntityCfg) -> torch.Tensor:
-    contact_sensor: ContactSensor = env.scene.sensors[sensor_cfg.name]
-    net_contact_forces = contact_sensor.data.net_forces_w_history
-    is_contact = torch.max(torch.norm(net_contact_forces[:, :, sensor_cfg.body_ids], dim=-1), dim=1)[0] > threshold
+    is_contact = contact_features(env, sensor_cfg.name).in_contact(threshold)[:, sensor_cfg.body_ids]
     return torch.sum(is_contact, dim=1)
 
 
 def fly(env: ManagerBasedRLEnv, threshold: float, sensor_cfg: SceneEntityCfg) -> torch.Tensor:
-    contact_sensor: ContactSensor = env.scene.sensors[sensor_cfg.name]
-    net_contact_forces = contact_sensor.data.net_forces_w_history
-    is_contact = torch.max(torch.norm(net_contact_forces[:, :, sensor_cfg.body_ids], dim=-1), dim=1)[0] > threshold
+    is_contact = contact_features(env, sensor_cfg.name).in_contact(threshold)[:, sensor_cfg.body_ids]
     return torch.sum(is_contact, dim=-1) < 0.5
 
 
@@ -308,8 +306,7 @@ def feet_air_time_positive_biped(env: ManagerBasedRLEnv, threshold: float, senso
 def feet_slide(
     env: ManagerBasedRLEnv, sensor_cfg: SceneEntityCfg, asset_cfg: SceneEntityCfg = SceneEntityCfg("robot")
 ) -> torch.Tensor:
-    contact_sensor: ContactSensor = env.scene.sensors[sensor_cfg.name]
-    contacts = contact_sensor.data.net_forces_w_history[:, :, sensor_cfg.body_ids, :].norm(dim=-1).max(dim=1)[0] > 1.0
+    contacts = contact_features(env, sensor_cfg.name).in_contact(1.0)[:, sensor_cfg.body_ids]
     asset: Articulation = env.scene[asset_cfg.name]
     body_vel = asset.data.body_lin_vel_w[:, asset_cfg.body_ids, :2]
     reward = torch.sum(body_vel.norm(dim=-1) * contacts, dim=1)
@@ -319,8 +316,7 @@ def feet_slide(
 def body_force(
     env: ManagerBasedRLEnv, sensor_cfg: SceneEntityCfg, threshold: float = 500, max_reward: float = 400
 ) -> torch.Tensor:
-    contact_sensor: ContactSensor = env.scene.sensors[sensor_cfg.name]
-    reward = contact_sensor.data.net_forces_w[:, sensor_cfg.body_ids, 2].norm(dim=-1)
+    reward = contact_features(env, sensor_cfg.name).force_z_abs[:, sensor_cfg.body_ids].norm(dim=-1)
     reward[reward < threshold] = 0
     reward[reward > threshold] -= threshold
     reward = reward.clamp(min=0, max=max_reward)
@@ -342,11 +338,9 @@ def body_orientation_l2(env: ManagerBasedRLEnv, asset_cfg: SceneEntityCfg = Scen
 
 
 def feet_stumble(env: ManagerBasedRLEnv, sensor_cfg: SceneEntityCfg) -> torch.Tensor:
-    contact_sensor: ContactSensor = env.scene.sensors[sensor_cfg.name]
+    features = contact_features(env, sensor_cfg.name)
     return torch.any(
-        torch.norm(contact_sensor.data.net_forces_w[:, sensor_cfg.body_ids, :2], dim=2)
-        > 5 * torch.abs(contact_sensor.data.net_forces_w[:, sensor_cfg.body_ids, 2]),
-        dim=1,
+        features.force_xy_norm[:, sensor_cfg.body_ids] > 5 * features.force_z_abs[:, sensor_cfg.body_ids], dim=1
     )
 
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import math
-import numpy as np
 import os
 import torch
 from collections.abc import Sequence
@@ -13,14 +12,14 @@ from isaaclab.managers import CommandTerm, CommandTermCfg
 from isaaclab.markers import VisualizationMarkers, VisualizationMarkersCfg
 from isaaclab.markers.config import FRAME_MARKER_CFG
 from isaaclab.utils import configclass
-from isaaclab.utils.math import (
-    quat_apply,
+from isaaclab.utils.math import quat_from_euler_xyz, quat_mul, sample_uniform
+
+from unitree_rl_lab.motion import VELOCITY_SOURCES, MotionStore, derive_velocities
+from unitree_rl_lab.utils.quat_kernels import (
     quat_error_magnitude,
-    quat_from_euler_xyz,
-    quat_inv,
-    quat_mul,
-    sample_uniform,
-    yaw_quat,
+    quat_slerp,
+    relative_body_pose_,
+    subtract_frame_transforms,
 )
 
 if TYPE_CHECKING:
@@ -28,34 +27,137 @@ if TYPE_CHECKING:
 
 
 class MotionLoader:
-    def __init__(self, motion_file: str, body_indexes: Sequence[int], device: str = "cpu"):
-        assert os.path.isfile(motion_file), f"Invalid file path: {motion_file}"
-        data = np.load(motion_file)
-        self.fps = data["fps"]
-        self.joint_pos = torch.tensor(data["joint_pos"], dtype=torch.float32, device=device)
-        self.joint_vel = torch.tensor(data["joint_vel"], dtype=torch.float32, device=device)
-        self._body_pos_w = torch.tensor(data["body_pos_w"], dtype=torch.float32, device=device)
-        self._body_quat_w = torch.tensor(data["body_quat_w"], dtype=torch.float32, device=device)
-        self._body_lin_vel_w = torch.tensor(data["body_lin_vel_w"], dtype=torch.float32, device=device)
-        self._body_ang_vel_w = torch.tensor(data["body_ang_vel_w"], dtype=torch.float32, device=device)
+    """Loads a motion clip onto the device, keeping only the bodies in ``body_indexes``.
+
+    The clip is read through a :class:`~unitree_rl_lab.motion.MotionStore`, so ``.npz`` archives are memory-mapped
+    from a per-host cache instead of being inflated in full by every process. Velocities the archive does not store
+    are derived from the poses on the device (see :func:`~unitree_rl_lab.motion.derive_velocities`), unless
+    ``derive_missing`` is False, in which case they are None and listed in :attr:`missing_velocities`.
+    """
+
+    def __init__(
+        self,
+        motion_file: str,
+        body_indexes: Sequence[int] | torch.Tensor,
+        device: str = "cpu",
+        use_cache: bool = True,
+        derive_missing: bool = True,
+    ):
+        assert os.path.exists(motion_file), f"Invalid file path: {motion_file}"
+        if isinstance(body_indexes, torch.Tensor):
+            body_indexes = body_indexes.cpu().numpy()
+        store = MotionStore(motion_file, use_cache=use_cache)
+        self.fps = store.fps
+        self.joint_pos = torch.as_tensor(store.read("joint_pos"), device=device)
+        self._body_pos_w = torch.as_tensor(store.read("body_pos_w", body_indexes), device=device)
+        self._body_quat_w = torch.as_tensor(store.read("body_quat_w", body_indexes), device=device)
+        velocities = {
+            name: torch.as_tensor(store.read(name, body_indexes), device=device)
+            for name in VELOCITY_SOURCES
+            if name in store
+        }
+        self.missing_velocities = [name for name in VELOCITY_SOURCES if name not in store]
+        if derive_missing:
+            poses = {"joint_pos": self.joint_pos, "body_pos_w": self._body_pos_w, "body_quat_w": self._body_quat_w}
+            fps = float(self.fps.reshape(-1)[0])
+            velocities.update(derive_velocities(poses, fps, self.missing_velocities))
+        self.joint_vel = velocities.get("joint_vel")
+        self._body_lin_vel_w = velocities.get("body_lin_vel_w")
+        self._body_ang_vel_w = velocities.get("body_ang_vel_w")
         self._body_indexes = body_indexes
         self.time_step_total = self.joint_pos.shape[0]
 
     @property
     def body_pos_w(self) -> torch.Tensor:
-        return self._body_pos_w[:, self._body_indexes]
+        return self._body_pos_w
 
     @property
     def body_quat_w(self) -> torch.Tensor:
-        return self._body_quat_w[:, self._body_indexes]
+        return self._body_quat_w
 
     @property
     def body_lin_vel_w(self) -> torch.Tensor:
-        return self._body_lin_vel_w[:, self._body_indexes]
+        return self._body_lin_vel_w
 
     @property
     def body_ang_vel_w(self) -> torch.Tensor:
-        return self._body_ang_vel_w[:, self._body_indexes]
+        return self._body_ang_vel_w
+
+
+class MotionLibrary:
+    """Concatenates several motion clips along the time axis.
+
+    The per-frame tensors have the same layout as the ones of :class:`MotionLoader`, with the frames of clip ``i`` at
+    ``clip_offsets[i]:clip_offsets[i] + clip_lengths[i]``. A single clip gives the same tensors as its loader.
+    Velocities missing from some clips are derived for all of them in one pass on the device, and the stored ones are
+    then copied over.
+    """
+
+    def __init__(
+        self,
+        motion_files: Sequence[str],
+        body_indexes: Sequence[int] | torch.Tensor,
+        device: str = "cpu",
+        use_cache: bool = True,
+    ):
+        assert len(motion_files) > 0, "The motion library needs at least one motion file."
+        # clips are staged on the CPU so that the device only holds the concatenated tensors
+        clips = [
+            MotionLoader(motion_file, body_indexes, device="cpu", use_cache=use_cache, derive_missing=False)
+            for motion_file in motion_files
+        ]
+        num_joints = {clip.joint_pos.shape[1] for clip in clips}
+        assert len(num_joints) == 1, f"Motion clips have different numbers of joints: {num_joints}"
+
+        self.motion_files = list(motion_files)
+        self.num_clips = len(clips)
+        self.clip_fps = torch.tensor([float(clip.fps.reshape(-1)[0]) for clip in clips], device=device)
+        self.clip_lengths = torch.tensor([clip.time_step_total for clip in clips], dtype=torch.long, device=device)
+        self.clip_offsets = torch.cumsum(self.clip_lengths, dim=0) - self.clip_lengths
+        self.time_step_total = int(self.clip_lengths.sum())
+
+        self.joint_pos = torch.cat([clip.joint_pos for clip in clips]).to(device)
+        self.body_pos_w = torch.cat([clip.body_pos_w for clip in clips]).to(device)
+        self.body_quat_w = torch.cat([clip.body_quat_w for clip in clips]).to(device)
+
+        missing = sorted({name for clip in clips for name in clip.missing_velocities})
+        poses = {"joint_pos": self.joint_pos, "body_pos_w": self.body_pos_w, "body_quat_w": self.body_quat_w}
+        velocities = derive_velocities(poses, self.clip_fps, missing, clip_lengths=self.clip_lengths)
+        for name in VELOCITY_SOURCES:
+            stored = [getattr(clip, name) for clip in clips]
+            if name not in velocities:
+                velocities[name] = torch.cat(stored).to(device)
+                continue
+            for clip_id, value in enumerate(stored):
+                if value is not None:
+                    offset = int(self.clip_offsets[clip_id])
+                    velocities[name][offset : offset + value.shape[0]] = value.to(device)
+        self.joint_vel = velocities["joint_vel"]
+        self.body_lin_vel_w = velocities["body_lin_vel_w"]
+        self.body_ang_vel_w = velocities["body_ang_vel_w"]
+
+
+class TrackingErrors:
+    """Errors between the reference motion and the robot in one step.
+
+    Position and velocity errors are squared Euclidean distances, rotation errors are angles in radians. The anchor
+    and joint errors have shape (num_envs,), the body errors (num_envs, num_bodies) in the order of
+    :attr:`MotionCommandCfg.body_names`. All errors are views into two preallocated blocks.
+    """
+
+    def __init__(self, num_envs: int, num_bodies: int, device: str):
+        self._env_errors = torch.zeros(6, num_envs, device=device)
+        self._body_errors = torch.zeros(4, num_envs, num_bodies, device=device)
+        self.anchor_pos = self._env_errors[0]
+        self.anchor_rot = self._env_errors[1]
+        self.anchor_lin_vel = self._env_errors[2]
+        self.anchor_ang_vel = self._env_errors[3]
+        self.joint_pos = self._env_errors[4]
+        self.joint_vel = self._env_errors[5]
+        self.body_pos = self._body_errors[0]
+        self.body_rot = self._body_errors[1]
+        self.body_lin_vel = self._body_errors[2]
+        self.body_ang_vel = self._body_errors[3]
 
 
 class MotionCommand(CommandTerm):
@@ -71,19 +173,26 @@ class MotionCommand(CommandTerm):
             self.robot.find_bodies(self.cfg.body_names, preserve_order=True)[0], dtype=torch.long, device=self.device
         )
 
-        self.motion = MotionLoader(self.cfg.motion_file, self.body_indexes, device=self.device)
+        motion_files = [self.cfg.motion_file] if isinstance(self.cfg.motion_file, str) else self.cfg.motion_file
+        self.motion = MotionLibrary(
+            motion_files, self.body_indexes, device=self.device, use_cache=self.cfg.use_motion_cache
+        )
+        # `time_steps` counts frames within the clip `clip_ids` of each env, `frame_indexes` into the library tensors
+        self.clip_ids = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
         self.time_steps = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        self.time_step_totals = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        self.frame_indexes = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        # with frame interpolation, the reference lies `frame_phase` of the way from `frame_indexes` to the next frame
+        self.frame_phase = torch.zeros(self.num_envs, device=self.device)
+        self._frame_steps = torch.ones(self.num_envs, device=self.device)
+        self._next_frame_indexes = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        self._init_frame_buffers()
+        self._update_frame_indexes()
         self.body_pos_relative_w = torch.zeros(self.num_envs, len(cfg.body_names), 3, device=self.device)
         self.body_quat_relative_w = torch.zeros(self.num_envs, len(cfg.body_names), 4, device=self.device)
         self.body_quat_relative_w[:, :, 0] = 1.0
 
-        self.bin_count = int(self.motion.time_step_total // (1 / (env.cfg.decimation * env.cfg.sim.dt))) + 1
-        self.bin_failed_count = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
-        self._current_bin_failed = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
-        self.kernel = torch.tensor(
-            [self.cfg.adaptive_lambda**i for i in range(self.cfg.adaptive_kernel_size)], device=self.device
-        )
-        self.kernel = self.kernel / self.kernel.sum()
+        self._init_sampling_bins(env.step_dt)
 
         self.metrics["error_anchor_pos"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_anchor_rot"] = torch.zeros(self.num_envs, device=self.device)
@@ -96,50 +205,254 @@ class MotionCommand(CommandTerm):
         self.metrics["sampling_entropy"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["sampling_top1_prob"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["sampling_top1_bin"] = torch.zeros(self.num_envs, device=self.device)
+        if self.cfg.debug_frame_cache:
+            self.metrics["frame_cache_hit_rate"] = torch.zeros(self.num_envs, device=self.device)
+
+    def _init_sampling_bins(self, step_dt: float):
+        """Splits every clip into adaptive sampling bins of about one second of playback.
+
+        The bins of all clips are numbered consecutively, so the failure statistics and the sampling distribution are
+        flat tensors over ``bin_count`` bins. The kernel smoothing does not reach across clip boundaries: neighbors
+        past the last bin of a clip are replaced by that bin, as the replicate padding did for a single clip.
+        """
+        # without interpolation a clip plays one frame per step, whatever its frame rate
+        frames_per_second = self.motion.clip_fps if self.cfg.interpolate_frames else 1 / step_dt
+        self.clip_bin_counts = torch.floor(self.motion.clip_lengths / frames_per_second).long() + 1
+        self.clip_bin_offsets = torch.cumsum(self.clip_bin_counts, dim=0) - self.clip_bin_counts
+        self.bin_count = int(self.clip_bin_counts.sum())
+        self._bin_clip_ids = torch.repeat_interleave(
+            torch.arange(self.motion.num_clips, device=self.device), self.clip_bin_counts
+        )
+        self._current_bin_failed = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
+        self._has_new_failures = False
+        self.kernel = torch.tensor(
+            [self.cfg.adaptive_lambda**i for i in range(self.cfg.adaptive_kernel_size)], device=self.device
+        )
+        self.kernel = self.kernel / self.kernel.sum()
+
+        bins = torch.arange(self.bin_count, device=self.device)
+        last_bins = (self.clip_bin_offsets + self.clip_bin_counts - 1)[self._bin_clip_ids]
+        offsets = torch.arange(self.cfg.adaptive_kernel_size, device=self.device)
+        self._kernel_neighbors = torch.minimum(bins[:, None] + offsets, last_bins[:, None])
+
+        # The EMA of the failure counts is kept as `_bin_failed_scale * _bin_failed_raw`: decaying it only changes the
+        # scale, so the raw counts, their smoothed version and its cumulative sum only change on steps with failures.
+        self._bin_failed_raw = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
+        self._bin_failed_scale = 1.0
+        self._smoothed_failed_raw = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
+        self._smoothed_failed_cumsum = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
+        self._sampling_probabilities = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
+        self._sampling_entropy = torch.zeros((), device=self.device)
+        self._sampling_top1_prob = torch.zeros((), device=self.device)
+        self._sampling_top1_bin = torch.zeros((), device=self.device)
+        self._update_sampling_table()
+
+    @property
+    def bin_failed_count(self) -> torch.Tensor:
+        """Exponential moving average of the failures per sampling bin."""
+        return self._bin_failed_raw * self._bin_failed_scale
+
+    def _update_bin_failed_count(self):
+        alpha = self.cfg.adaptive_alpha
+        self._bin_failed_scale *= 1.0 - alpha
+        if self._bin_failed_scale < 1e-6:
+            # fold the scale into the raw counts before they lose precision
+            self._bin_failed_raw.mul_(self._bin_failed_scale)
+            self._bin_failed_scale = 1.0
+            self._sampling_table_outdated = True
+        if self._has_new_failures:
+            self._bin_failed_raw.add_(self._current_bin_failed, alpha=alpha / self._bin_failed_scale)
+            self._current_bin_failed.zero_()
+            self._has_new_failures = False
+            self._sampling_table_outdated = True
+
+    def _update_sampling_table(self):
+        # Non-causal kernel, clamped at the end of each clip
+        torch.sum(self._bin_failed_raw[self._kernel_neighbors] * self.kernel, dim=-1, out=self._smoothed_failed_raw)
+        torch.cumsum(self._smoothed_failed_raw, dim=0, out=self._smoothed_failed_cumsum)
+        self._sampling_table_outdated = False
+
+        # The sampling metrics are taken with the table, at the EMA scale of this update. Resets only copy them.
+        uniform = self.cfg.adaptive_uniform_ratio / float(self.bin_count)
+        total_mass = self._smoothed_failed_cumsum[-1] * self._bin_failed_scale + uniform * self.bin_count
+        p = torch.mul(self._smoothed_failed_raw, self._bin_failed_scale, out=self._sampling_probabilities)
+        p.add_(uniform).div_(total_mass)
+        H = -(p * (p + 1e-12).log()).sum()
+        torch.div(H, math.log(self.bin_count), out=self._sampling_entropy)
+        pmax, imax = p.max(dim=0)
+        self._sampling_top1_prob.copy_(pmax)
+        torch.div(imax, self.bin_count, out=self._sampling_top1_bin)
+
+    def _init_frame_buffers(self):
+        num_bodies = len(self.cfg.body_names)
+        num_joints = self.motion.joint_pos.shape[1]
+        # anchor columns of the motion, as views to avoid gathering all bodies for the anchor lookups
+        self._motion_anchor_pos_w = self.motion.body_pos_w[:, self.motion_anchor_body_index]
+        self._motion_anchor_quat_w = self.motion.body_quat_w[:, self.motion_anchor_body_index]
+        self._motion_anchor_lin_vel_w = self.motion.body_lin_vel_w[:, self.motion_anchor_body_index]
+        self._motion_anchor_ang_vel_w = self.motion.body_ang_vel_w[:, self.motion_anchor_body_index]
+
+        self._ref_joint_pos = torch.zeros(self.num_envs, num_joints, device=self.device)
+        self._ref_joint_vel = torch.zeros(self.num_envs, num_joints, device=self.device)
+        self._ref_body_pos_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+        self._ref_body_quat_w = torch.zeros(self.num_envs, num_bodies, 4, device=self.device)
+        self._ref_body_lin_vel_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+        self._ref_body_ang_vel_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+        self._ref_anchor_pos_w = torch.zeros(self.num_envs, 3, device=self.device)
+        self._ref_anchor_quat_w = torch.zeros(self.num_envs, 4, device=self.device)
+        self._ref_anchor_lin_vel_w = torch.zeros(self.num_envs, 3, device=self.device)
+        self._ref_anchor_ang_vel_w = torch.zeros(self.num_envs, 3, device=self.device)
+        self._robot_body_pos_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+        self._robot_body_quat_w = torch.zeros(self.num_envs, num_bodies, 4, device=self.device)
+        self._robot_body_lin_vel_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+        self._robot_body_ang_vel_w = torch.zeros(self.num_envs, num_bodies, 3, device=self.device)
+
+        # Step-versioned frame cache: a buffer is only refilled when the version it was filled at is outdated. The
+        # reference version changes whenever `time_steps` does, the robot version with every env step and whenever a
+        # state is written to the robot (see `invalidate_robot_frames`).
+        self._ref_version = 0
+        self._robot_write_version = 0
+        self._frame_versions: dict[str, object] = {}
+        # `body_pos_relative_w`/`body_quat_relative_w` are only updated at the end of `_update_command`
+        self._relative_pose_version = 0
+        self._tracking_errors = TrackingErrors(self.num_envs, num_bodies, self.device)
+        self.frame_cache_stats = {"hits": 0, "misses": 0}
+
+    def invalidate_robot_frames(self):
+        """Marks the cached robot frames as outdated. Has to be called after writing a state to the robot.
+
+        The robot frames are cached once per env step, but interval events such as ``push_robot`` write the robot state
+        after the command manager computed the command, within the same step.
+        """
+        self._robot_write_version += 1
+
+    def _robot_version(self) -> tuple[int, int]:
+        return self._env.common_step_counter, self._robot_write_version
+
+    def _is_cached(self, name: str, version) -> bool:
+        """Returns whether the frame buffer ``name`` is valid for ``version``.
+
+        The caller has to refill the buffer when this returns False, and then mark it with :meth:`_mark_cached`.
+        """
+        cached = self._frame_versions.get(name) == version
+        if self.cfg.debug_frame_cache:
+            self.frame_cache_stats["hits" if cached else "misses"] += 1
+        return cached
+
+    def _mark_cached(self, name: str, version):
+        """Marks the frame buffer ``name`` as valid for ``version``, once it has been refilled."""
+        self._frame_versions[name] = version
+
+    def _update_frame_indexes(self):
+        """Maps ``clip_ids`` and ``time_steps`` to library frames. Has to be called whenever either of them changes."""
+        torch.index_select(self.motion.clip_lengths, 0, self.clip_ids, out=self.time_step_totals)
+        torch.index_select(self.motion.clip_offsets, 0, self.clip_ids, out=self.frame_indexes)
+        self.frame_indexes.add_(self.time_steps)
+        if self.cfg.interpolate_frames:
+            # the last frame of a clip is held
+            torch.add(self.frame_indexes, self.time_steps + 1 < self.time_step_totals, out=self._next_frame_indexes)
+            torch.index_select(self.motion.clip_fps, 0, self.clip_ids, out=self._frame_steps)
+            self._frame_steps.mul_(self._env.step_dt)
+        self._ref_version += 1
+
+    def _gather_reference(self, source: torch.Tensor, out: torch.Tensor, is_quat: bool = False) -> torch.Tensor:
+        """Gathers the reference frames of all envs from ``source`` into ``out``.
+
+        With :attr:`MotionCommandCfg.interpolate_frames`, the frames are blended with the following ones by
+        ``frame_phase``: linearly for positions and velocities, spherically for orientations.
+        """
+        torch.index_select(source, 0, self.frame_indexes, out=out)
+        if self.cfg.interpolate_frames:
+            next_frames = source.index_select(0, self._next_frame_indexes)
+            phase = self.frame_phase.view((-1,) + (1,) * (out.dim() - 1))
+            if is_quat:
+                out.copy_(quat_slerp(out, next_frames, phase))
+            else:
+                out.lerp_(next_frames, phase)
+        return out
 
     @property
     def command(self) -> torch.Tensor:  # TODO Consider again if this is the best observation
+        # a new tensor, as the observation manager may clip or scale it in place
         return torch.cat([self.joint_pos, self.joint_vel], dim=1)
 
+    # Reference and robot quantities are gathered with `torch.index_select` into the persistent buffers allocated in
+    # `_init_frame_buffers`, so a lookup costs O(num_envs * num_bodies) and, without frame interpolation, allocates
+    # nothing. Each buffer is filled at most once per step and shared by all terms reading it, so the returned tensors
+    # must not be modified in place. The observation terms return copies, which the observation manager may clip or
+    # scale in place.
+
     @property
     def joint_pos(self) -> torch.Tensor:
-        return self.motion.joint_pos[self.time_steps]
+        if not self._is_cached("joint_pos", self._ref_version):
+            self._gather_reference(self.motion.joint_pos, self._ref_joint_pos)
+            self._mark_cached("joint_pos", self._ref_version)
+        return self._ref_joint_pos
 
     @property
     def joint_vel(self) -> torch.Tensor:
-        return self.motion.joint_vel[self.time_steps]
+        if not self._is_cached("joint_vel", self._ref_version):
+            self._gather_reference(self.motion.joint_vel, self._ref_joint_vel)
+            self._mark_cached("joint_vel", self._ref_version)
+        return self._ref_joint_vel
 
     @property
     def body_pos_w(self) -> torch.Tensor:
-        return self.motion.body_pos_w[self.time_steps] + self._env.scene.env_origins[:, None, :]
+        if not self._is_cached("body_pos_w", self._ref_version):
+            self._gather_reference(self.motion.body_pos_w, self._ref_body_pos_w)
+            self._ref_body_pos_w.add_(self._env.scene.env_origins[:, None, :])
+            self._mark_cached("body_pos_w", self._ref_version)
+        return self._ref_body_pos_w
 
     @property
     def body_quat_w(self) -> torch.Tensor:
-        return self.motion.body_quat_w[self.time_steps]
+        if not self._is_cached("body_quat_w", self._ref_version):
+            self._gather_reference(self.motion.body_quat_w, self._ref_body_quat_w, is_quat=True)
+            self._mark_cached("body_quat_w", self._ref_version)
+        return self._ref_body_quat_w
 
     @property
     def body_lin_vel_w(self) -> torch.Tensor:
-        return self.motion.body_lin_vel_w[self.time_steps]
+        if not self._is_cached("body_lin_vel_w", self._ref_version):
+            self._gather_reference(self.motion.body_lin_vel_w, self._ref_body_lin_vel_w)
+            self._mark_cached("body_lin_vel_w", self._ref_version)
+        return self._ref_body_lin_vel_w
 
     @property
     def body_ang_vel_w(self) -> torch.Tensor:
-        return self.motion.body_ang_vel_w[self.time_steps]
+        if not self._is_cached("body_ang_vel_w", self._ref_version):
+            self._gather_reference(self.motion.body_ang_vel_w, self._ref_body_ang_vel_w)
+            self._mark_cached("body_ang_vel_w", self._ref_version)
+        return self._ref_body_ang_vel_w
 
     @property
     def anchor_pos_w(self) -> torch.Tensor:
-        return self.motion.body_pos_w[self.time_steps, self.motion_anchor_body_index] + self._env.scene.env_origins
+        if not self._is_cached("anchor_pos_w", self._ref_version):
+            self._gather_reference(self._motion_anchor_pos_w, self._ref_anchor_pos_w)
+            self._ref_anchor_pos_w.add_(self._env.scene.env_origins)
+            self._mark_cached("anchor_pos_w", self._ref_version)
+        return self._ref_anchor_pos_w
 
     @property
     def anchor_quat_w(self) -> torch.Tensor:
-        return self.motion.body_quat_w[self.time_steps, self.motion_anchor_body_index]
+        if not self._is_cached("anchor_quat_w", self._ref_version):
+            self._gather_reference(self._motion_anchor_quat_w, self._ref_anchor_quat_w, is_quat=True)
+            self._mark_cached("anchor_quat_w", self._ref_version)
+        return self._ref_anchor_quat_w
 
     @property
     def anchor_lin_vel_w(self) -> torch.Tensor:
-        return self.motion.body_lin_vel_w[self.time_steps, self.motion_anchor_body_index]
+        if not self._is_cached("anchor_lin_vel_w", self._ref_version):
+            self._gather_reference(self._motion_anchor_lin_vel_w, self._ref_anchor_lin_vel_w)
+            self._mark_cached("anchor_lin_vel_w", self._ref_version)
+        return self._ref_anchor_lin_vel_w
 
     @property
     def anchor_ang_vel_w(self) -> torch.Tensor:
-        return self.motion.body_ang_vel_w[self.time_steps, self.motion_anchor_body_index]
+        if not self._is_cached("anchor_ang_vel_w", self._ref_version):
+            self._gather_reference(self._motion_anchor_ang_vel_w, self._ref_anchor_ang_vel_w)
+            self._mark_cached("anchor_ang_vel_w", self._ref_version)
+        return self._ref_anchor_ang_vel_w
 
     @property
     def robot_joint_pos(self) -> torch.Tensor:
@@ -151,19 +464,31 @@ class MotionCommand(CommandTerm):
 
     @property
     def robot_body_pos_w(self) -> torch.Tensor:
-        return self.robot.data.body_pos_w[:, self.body_indexes]
+        if not self._is_cached("robot_body_pos_w", self._robot_version()):
+            torch.index_select(self.robot.data.body_pos_w, 1, self.body_indexes, out=self._robot_body_pos_w)
+            self._mark_cached("robot_body_pos_w", self._robot_version())
+        return self._robot_body_pos_w
 
     @property
     def robot_body_quat_w(self) -> torch.Tensor:
-        return self.robot.data.body_quat_w[:, self.body_indexes]
+        if not self._is_cached("robot_body_quat_w", self._robot_version()):
+            torch.index_select(self.robot.data.body_quat_w, 1, self.body_indexes, out=self._robot_body_quat_w)
+            self._mark_cached("robot_body_quat_w", self._robot_version())
+        return self._robot_body_quat_w
 
     @property
     def robot_body_lin_vel_w(self) -> torch.Tensor:
-        return self.robot.data.body_lin_vel_w[:, self.body_indexes]
+        if not self._is_cached("robot_body_lin_vel_w", self._robot_version()):
+            torch.index_select(self.robot.data.body_lin_vel_w, 1, self.body_indexes, out=self._robot_body_lin_vel_w)
+            self._mark_cached("robot_body_lin_vel_w", self._robot_version())
+        return self._robot_body_lin_vel_w
 
     @property
     def robot_body_ang_vel_w(self) -> torch.Tensor:
-        return self.robot.data.body_ang_vel_w[:, self.body_indexes]
+        if not self._is_cached("robot_body_ang_vel_w", self._robot_version()):
+            torch.index_select(self.robot.data.body_ang_vel_w, 1, self.body_indexes, out=self._robot_body_ang_vel_w)
+            self._mark_cached("robot_body_ang_vel_w", self._robot_version())
+        return self._robot_body_ang_vel_w
 
     @property
     def robot_anchor_pos_w(self) -> torch.Tensor:
@@ -181,64 +506,150 @@ class MotionCommand(CommandTerm):
     def robot_anchor_ang_vel_w(self) -> torch.Tensor:
         return self.robot.data.body_ang_vel_w[:, self.robot_anchor_body_index]
 
+    # Poses in the frame of the robot anchor. Positions and orientations come out of the same transform, so both are
+    # computed on the first access of either and cached like the world frame quantities.
+
+    def _update_robot_body_pose_b(self):
+        if not self._is_cached("robot_body_pose_b", self._robot_version()):
+            self._robot_body_pos_b, self._robot_body_quat_b = subtract_frame_transforms(
+                self.robot_anchor_pos_w[:, None, :],
+                self.robot_anchor_quat_w[:, None, :],
+                self.robot_body_pos_w,
+                self.robot_body_quat_w,
+            )
+            self._mark_cached("robot_body_pose_b", self._robot_version())
+
+    def _update_motion_anchor_pose_b(self):
+        if not self._is_cached("motion_anchor_pose_b", (self._ref_version, self._robot_version())):
+            self._motion_anchor_pos_b, self._motion_anchor_quat_b = subtract_frame_transforms(
+                self.robot_anchor_pos_w, self.robot_anchor_quat_w, self.anchor_pos_w, self.anchor_quat_w
+            )
+            self._mark_cached("motion_anchor_pose_b", (self._ref_version, self._robot_version()))
+
+    @property
+    def robot_body_pos_b(self) -> torch.Tensor:
+        self._update_robot_body_pose_b()
+        return self._robot_body_pos_b
+
+    @property
+    def robot_body_quat_b(self) -> torch.Tensor:
+        self._update_robot_body_pose_b()
+        return self._robot_body_quat_b
+
+    @property
+    def motion_anchor_pos_b(self) -> torch.Tensor:
+        self._update_motion_anchor_pose_b()
+        return self._motion_anchor_pos_b
+
+    @property
+    def motion_anchor_quat_b(self) -> torch.Tensor:
+        self._update_motion_anchor_pose_b()
+        return self._motion_anchor_quat_b
+
+    @property
+    def tracking_errors(self) -> TrackingErrors:
+        """The tracking errors of the current step, shared by the metrics, rewards and terminations."""
+        version = (self._ref_version, self._relative_pose_version, self._robot_version())
+        if not self._is_cached("tracking_errors", version):
+            errors = self._tracking_errors
+            torch.sum(torch.square(self.anchor_pos_w - self.robot_anchor_pos_w), dim=-1, out=errors.anchor_pos)
+            errors.anchor_rot.copy_(quat_error_magnitude(self.anchor_quat_w, self.robot_anchor_quat_w))
+            torch.sum(
+                torch.square(self.anchor_lin_vel_w - self.robot_anchor_lin_vel_w), dim=-1, out=errors.anchor_lin_vel
+            )
+            torch.sum(
+                torch.square(self.anchor_ang_vel_w - self.robot_anchor_ang_vel_w), dim=-1, out=errors.anchor_ang_vel
+            )
+            torch.sum(torch.square(self.joint_pos - self.robot_joint_pos), dim=-1, out=errors.joint_pos)
+            torch.sum(torch.square(self.joint_vel - self.robot_joint_vel), dim=-1, out=errors.joint_vel)
+
+            torch.sum(torch.square(self.body_pos_relative_w - self.robot_body_pos_w), dim=-1, out=errors.body_pos)
+            errors.body_rot.copy_(quat_error_magnitude(self.body_quat_relative_w, self.robot_body_quat_w))
+            torch.sum(torch.square(self.body_lin_vel_w - self.robot_body_lin_vel_w), dim=-1, out=errors.body_lin_vel)
+            torch.sum(torch.square(self.body_ang_vel_w - self.robot_body_ang_vel_w), dim=-1, out=errors.body_ang_vel)
+            self._mark_cached("tracking_errors", version)
+        return self._tracking_errors
+
+    def get_body_subset(self, body_names: list[str] | None) -> slice | torch.Tensor | None:
+        """Resolves ``body_names`` to a selector along the body axis of the tracked body tensors.
+
+        Terms resolve their subset once at construction. The selector is None when the subset holds all tracked
+        bodies, a slice when it is a contiguous range of them and an index tensor otherwise.
+        """
+        if body_names is None:
+            return None
+        indexes = [i for i, name in enumerate(self.cfg.body_names) if name in body_names]
+        if len(indexes) == len(self.cfg.body_names):
+            return None
+        if indexes and indexes == list(range(indexes[0], indexes[-1] + 1)):
+            return slice(indexes[0], indexes[-1] + 1)
+        return torch.tensor(indexes, dtype=torch.long, device=self.device)
+
     def _update_metrics(self):
-        self.metrics["error_anchor_pos"] = torch.norm(self.anchor_pos_w - self.robot_anchor_pos_w, dim=-1)
-        self.metrics["error_anchor_rot"] = quat_error_magnitude(self.anchor_quat_w, self.robot_anchor_quat_w)
-        self.metrics["error_anchor_lin_vel"] = torch.norm(self.anchor_lin_vel_w - self.robot_anchor_lin_vel_w, dim=-1)
-        self.metrics["error_anchor_ang_vel"] = torch.norm(self.anchor_ang_vel_w - self.robot_anchor_ang_vel_w, dim=-1)
+        errors = self.tracking_errors
+        self.metrics["error_anchor_pos"] = errors.anchor_pos.sqrt()
+        self.metrics["error_anchor_rot"] = errors.anchor_rot.clone()
+        self.metrics["error_anchor_lin_vel"] = errors.anchor_lin_vel.sqrt()
+        self.metrics["error_anchor_ang_vel"] = errors.anchor_ang_vel.sqrt()
 
-        self.metrics["error_body_pos"] = torch.norm(self.body_pos_relative_w - self.robot_body_pos_w, dim=-1).mean(
-            dim=-1
-        )
-        self.metrics["error_body_rot"] = quat_error_magnitude(self.body_quat_relative_w, self.robot_body_quat_w).mean(
-            dim=-1
-        )
+        self.metrics["error_body_pos"] = errors.body_pos.sqrt().mean(dim=-1)
+        self.metrics["error_body_rot"] = errors.body_rot.mean(dim=-1)
 
-        self.metrics["error_body_lin_vel"] = torch.norm(self.body_lin_vel_w - self.robot_body_lin_vel_w, dim=-1).mean(
-            dim=-1
-        )
-        self.metrics["error_body_ang_vel"] = torch.norm(self.body_ang_vel_w - self.robot_body_ang_vel_w, dim=-1).mean(
-            dim=-1
-        )
+        self.metrics["error_body_lin_vel"] = errors.body_lin_vel.sqrt().mean(dim=-1)
+        self.metrics["error_body_ang_vel"] = errors.body_ang_vel.sqrt().mean(dim=-1)
 
-        self.metrics["error_joint_pos"] = torch.norm(self.joint_pos - self.robot_joint_pos, dim=-1)
-        self.metrics["error_joint_vel"] = torch.norm(self.joint_vel - self.robot_joint_vel, dim=-1)
+        self.metrics["error_joint_pos"] = errors.joint_pos.sqrt()
+        self.metrics["error_joint_vel"] = errors.joint_vel.sqrt()
+
+        if self.cfg.debug_frame_cache:
+            lookups = self.frame_cache_stats["hits"] + self.frame_cache_stats["misses"]
+            self.metrics["frame_cache_hit_rate"][:] = self.frame_cache_stats["hits"] / max(lookups, 1)
 
     def _adaptive_sampling(self, env_ids: Sequence[int]):
         episode_failed = self._env.termination_manager.terminated[env_ids]
         if torch.any(episode_failed):
+            clip_ids = self.clip_ids[env_ids]
+            clip_bin_counts = self.clip_bin_counts[clip_ids]
             current_bin_index = torch.clamp(
-                (self.time_steps * self.bin_count) // max(self.motion.time_step_total, 1), 0, self.bin_count - 1
+                (self.time_steps[env_ids] * clip_bin_counts) // self.time_step_totals[env_ids].clamp(min=1),
+                torch.zeros_like(clip_bin_counts),
+                clip_bin_counts - 1,
             )
-            fail_bins = current_bin_index[env_ids][episode_failed]
+            fail_bins = (self.clip_bin_offsets[clip_ids] + current_bin_index)[episode_failed]
             self._current_bin_failed[:] = torch.bincount(fail_bins, minlength=self.bin_count)
+            self._has_new_failures = True
 
         # Sample
-        sampling_probabilities = self.bin_failed_count + self.cfg.adaptive_uniform_ratio / float(self.bin_count)
-        sampling_probabilities = torch.nn.functional.pad(
-            sampling_probabilities.unsqueeze(0).unsqueeze(0),
-            (0, self.cfg.adaptive_kernel_size - 1),  # Non-causal kernel
-            mode="replicate",
-        )
-        sampling_probabilities = torch.nn.functional.conv1d(sampling_probabilities, self.kernel.view(1, 1, -1)).view(-1)
-
-        sampling_probabilities = sampling_probabilities / sampling_probabilities.sum()
-
-        sampled_bins = torch.multinomial(sampling_probabilities, len(env_ids), replacement=True)
-
+        # The kernel sums to one, so smoothing `scale * raw + uniform` gives `scale * smoothed_raw + uniform`. A draw
+        # picks the failure part with its share of the total mass and inverts its cumulative sum, or a uniform bin.
+        if self._sampling_table_outdated:
+            self._update_sampling_table()
+        uniform = self.cfg.adaptive_uniform_ratio / float(self.bin_count)
+        failed_mass = self._smoothed_failed_cumsum[-1] * self._bin_failed_scale
+        total_mass = failed_mass + uniform * self.bin_count
+
+        draws = torch.rand(2, len(env_ids), device=self.device)
+        failed_bins = torch.searchsorted(
+            self._smoothed_failed_cumsum, draws[1] * self._smoothed_failed_cumsum[-1], right=True
+        ).clamp_(max=self.bin_count - 1)
+        uniform_bins = (draws[1] * self.bin_count).long().clamp_(max=self.bin_count - 1)
+        sampled_bins = torch.where(draws[0] * total_mass < failed_mass, failed_bins, uniform_bins)
+
+        clip_ids = self._bin_clip_ids[sampled_bins]
+        self.clip_ids[env_ids] = clip_ids
+        self.frame_phase[env_ids] = 0.0
+        local_bins = sampled_bins - self.clip_bin_offsets[clip_ids]
         self.time_steps[env_ids] = (
-            (sampled_bins + sample_uniform(0.0, 1.0, (len(env_ids),), device=self.device))
-            / self.bin_count
-            * (self.motion.time_step_total - 1)
+            (local_bins + sample_uniform(0.0, 1.0, (len(env_ids),), device=self.device))
+            / self.clip_bin_counts[clip_ids]
+            * (self.motion.clip_lengths[clip_ids] - 1)
         ).long()
+        self._update_frame_indexes()
 
         # Metrics
-        H = -(sampling_probabilities * (sampling_probabilities + 1e-12).log()).sum()
-        H_norm = H / math.log(self.bin_count)
-        pmax, imax = sampling_probabilities.max(dim=0)
-        self.metrics["sampling_entropy"][:] = H_norm
-        self.metrics["sampling_top1_prob"][:] = pmax
-        self.metrics["sampling_top1_bin"][:] = imax.float() / self.bin_count
+        self.metrics["sampling_entropy"][:] = self._sampling_entropy
+        self.metrics["sampling_top1_prob"][:] = self._sampling_top1_prob
+        self.metrics["sampling_top1_bin"][:] = self._sampling_top1_bin
 
     def _resample_command(self, env_ids: Sequence[int]):
         if len(env_ids) == 0:
@@ -275,28 +686,34 @@ class MotionCommand(CommandTerm):
             torch.cat([root_pos[env_ids], root_ori[env_ids], root_lin_vel[env_ids], root_ang_vel[env_ids]], dim=-1),
             env_ids=env_ids,
         )
+        self.invalidate_robot_frames()
 
     def _update_command(self):
-        self.time_steps += 1
-        env_ids = torch.where(self.time_steps >= self.motion.time_step_total)[0]
+        if self.cfg.interpolate_frames:
+            # advance by the clip time of one control step, carrying whole frames into `time_steps`
+            self.frame_phase.add_(self._frame_steps)
+            frames = self.frame_phase.floor()
+            self.frame_phase.sub_(frames)
+            self.time_steps.add_(frames.long())
+        else:
+            self.time_steps += 1
+        self._update_frame_indexes()
+        env_ids = torch.where(self.time_steps >= self.time_step_totals)[0]
         self._resample_command(env_ids)
 
-        anchor_pos_w_repeat = self.anchor_pos_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        anchor_quat_w_repeat = self.anchor_quat_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        robot_anchor_pos_w_repeat = self.robot_anchor_pos_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        robot_anchor_quat_w_repeat = self.robot_anchor_quat_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-
-        delta_pos_w = robot_anchor_pos_w_repeat
-        delta_pos_w[..., 2] = anchor_pos_w_repeat[..., 2]
-        delta_ori_w = yaw_quat(quat_mul(robot_anchor_quat_w_repeat, quat_inv(anchor_quat_w_repeat)))
-
-        self.body_quat_relative_w = quat_mul(delta_ori_w, self.body_quat_w)
-        self.body_pos_relative_w = delta_pos_w + quat_apply(delta_ori_w, self.body_pos_w - anchor_pos_w_repeat)
-
-        self.bin_failed_count = (
-            self.cfg.adaptive_alpha * self._current_bin_failed + (1 - self.cfg.adaptive_alpha) * self.bin_failed_count
+        relative_body_pose_(
+            self.anchor_pos_w,
+            self.anchor_quat_w,
+            self.robot_anchor_pos_w,
+            self.robot_anchor_quat_w,
+            self.body_pos_w,
+            self.body_quat_w,
+            out_pos=self.body_pos_relative_w,
+            out_quat=self.body_quat_relative_w,
         )
-        self._current_bin_failed.zero_()
+        self._relative_pose_version += 1
+
+        self._update_bin_failed_count()
 
     def _set_debug_vis_impl(self, debug_vis: bool):
         if debug_vis:
@@ -356,7 +773,27 @@ class MotionCommandCfg(CommandTermCfg):
 
     asset_name: str = MISSING
 
-    motion_file: str = MISSING
+    motion_file: str | list[str] = MISSING
+    """Path to the motion clip to track, or a list of clips that are tracked by a single policy.
+
+    With several clips, each env is assigned a clip when its command is resampled, and the adaptive sampling weighs
+    the bins of all clips against each other.
+    """
+
+    use_motion_cache: bool = True
+    """Whether to memory-map the motion file from a per-host ``.mmap`` cache directory next to it."""
+
+    interpolate_frames: bool = False
+    """Whether to play the motion in continuous time at the frame rate stored in the clip.
+
+    The reference is then interpolated between neighboring frames, so one clip can be tracked at any control rate
+    (``decimation * sim.dt``). Otherwise the motion advances by one frame per control step, which requires the clip
+    to be stored at the control rate.
+    """
+
+    debug_frame_cache: bool = False
+    """Whether to count hits and misses of the per-step frame cache in :attr:`MotionCommand.frame_cache_stats`."""
+
     anchor_body_name: str = MISSING
     body_names: list[str] = MISSING
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import torch
 from typing import TYPE_CHECKING, Literal
 
+import isaaclab.envs.mdp.events as isaaclab_events
 import isaaclab.utils.math as math_utils
 from isaaclab.assets import Articulation
 from isaaclab.envs.mdp.events import _randomize_prop_by_op
@@ -11,6 +12,8 @@ from isaaclab.managers import SceneEntityCfg
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedEnv
 
+    from .commands import MotionCommand
+
 
 def randomize_joint_default_pos(
     env: ManagerBasedEnv,
@@ -91,3 +94,21 @@ def randomize_rigid_body_com(
 
     # Set the new coms
     asset.root_physx_view.set_coms(coms, env_ids)
+
+
+def push_by_setting_velocity(
+    env: ManagerBasedEnv,
+    env_ids: torch.Tensor,
+    velocity_range: dict[str, tuple[float, float]],
+    asset_cfg: SceneEntityCfg = SceneEntityCfg("robot"),
+    command_name: str = "motion",
+):
+    """Push the asset as :func:`isaaclab.envs.mdp.push_by_setting_velocity` and invalidate the robot frames cached by
+    the motion command.
+
+    Interval events run after the command manager computed the command, so without the invalidation the
+    observations of the step would read the robot velocities from before the push.
+    """
+    isaaclab_events.push_by_setting_velocity(env, env_ids, velocity_range, asset_cfg)
+    command: MotionCommand = env.command_manager.get_term(command_name)
+    command.invalidate_robot_frames()
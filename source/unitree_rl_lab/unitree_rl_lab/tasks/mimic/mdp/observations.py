@@ -3,9 +3,8 @@ from __future__ import annotations
 import torch
 from typing import TYPE_CHECKING
 
-from isaaclab.utils.math import matrix_from_quat, subtract_frame_transforms
-
 from unitree_rl_lab.tasks.mimic.mdp.commands import MotionCommand
+from unitree_rl_lab.utils.quat_kernels import matrix_6d_from_quat
 
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedEnv
@@ -13,71 +12,40 @@ if TYPE_CHECKING:
 
 def robot_anchor_ori_w(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    mat = matrix_from_quat(command.robot_anchor_quat_w)
-    return mat[..., :2].reshape(mat.shape[0], -1)
+    return matrix_6d_from_quat(command.robot_anchor_quat_w)
 
 
 def robot_anchor_lin_vel_w(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    return command.robot_anchor_vel_w[:, :3].view(env.num_envs, -1)
+    return command.robot_anchor_lin_vel_w.view(env.num_envs, -1)
 
 
 def robot_anchor_ang_vel_w(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    return command.robot_anchor_vel_w[:, 3:6].view(env.num_envs, -1)
+    return command.robot_anchor_ang_vel_w.view(env.num_envs, -1)
 
 
 def robot_body_pos_b(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    num_bodies = len(command.cfg.body_names)
-    pos_b, _ = subtract_frame_transforms(
-        command.robot_anchor_pos_w[:, None, :].repeat(1, num_bodies, 1),
-        command.robot_anchor_quat_w[:, None, :].repeat(1, num_bodies, 1),
-        command.robot_body_pos_w,
-        command.robot_body_quat_w,
-    )
-
-    return pos_b.view(env.num_envs, -1)
+    return command.robot_body_pos_b.reshape(env.num_envs, -1).clone()
 
 
 def robot_body_ori_b(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    num_bodies = len(command.cfg.body_names)
-    _, ori_b = subtract_frame_transforms(
-        command.robot_anchor_pos_w[:, None, :].repeat(1, num_bodies, 1),
-        command.robot_anchor_quat_w[:, None, :].repeat(1, num_bodies, 1),
-        command.robot_body_pos_w,
-        command.robot_body_quat_w,
-    )
-    mat = matrix_from_quat(ori_b)
-    return mat[..., :2].reshape(mat.shape[0], -1)
+    return matrix_6d_from_quat(command.robot_body_quat_b).view(env.num_envs, -1)
 
 
 def motion_anchor_pos_b(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    pos, _ = subtract_frame_transforms(
-        command.robot_anchor_pos_w,
-        command.robot_anchor_quat_w,
-        command.anchor_pos_w,
-        command.anchor_quat_w,
-    )
-
-    return pos.view(env.num_envs, -1)
+    return command.motion_anchor_pos_b.view(env.num_envs, -1).clone()
 
 
 def motion_anchor_ori_b(env: ManagerBasedEnv, command_name: str) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
 
-    _, ori = subtract_frame_transforms(
-        command.robot_anchor_pos_w,
-        command.robot_anchor_quat_w,
-        command.anchor_pos_w,
-        command.anchor_quat_w,
-    )
-    mat = matrix_from_quat(ori)
-    return mat[..., :2].reshape(mat.shape[0], -1)
+    return matrix_6d_from_quat(command.motion_anchor_quat_b)
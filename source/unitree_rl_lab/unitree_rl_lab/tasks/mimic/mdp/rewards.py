@@ -3,9 +3,8 @@ from __future__ import annotations
 import torch
 from typing import TYPE_CHECKING
 
-from isaaclab.managers import SceneEntityCfg
+from isaaclab.managers import ManagerTermBase, RewardTermCfg, SceneEntityCfg, TerminationTermCfg
 from isaaclab.sensors import ContactSensor
-from isaaclab.utils.math import quat_error_magnitude
 
 from unitree_rl_lab.tasks.mimic.mdp.commands import MotionCommand
 
@@ -13,65 +12,68 @@ if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedRLEnv
 
 
-def _get_body_indexes(command: MotionCommand, body_names: list[str] | None) -> list[int]:
-    return [i for i, name in enumerate(command.cfg.body_names) if (body_names is None) or (name in body_names)]
+def _select_bodies(errors: torch.Tensor, body_subset: slice | torch.Tensor | None) -> torch.Tensor:
+    if body_subset is None:
+        return errors
+    if isinstance(body_subset, slice):
+        return errors[:, body_subset]
+    return errors.index_select(1, body_subset)
+
+
+class _MotionBodyTerm(ManagerTermBase):
+    """Base class of the terms on a subset of the tracked bodies.
+
+    The ``body_names`` parameter is resolved once, with :meth:`MotionCommand.get_body_subset`.
+    """
+
+    def __init__(self, cfg: RewardTermCfg | TerminationTermCfg, env: ManagerBasedRLEnv):
+        super().__init__(cfg, env)
+        self.command: MotionCommand = env.command_manager.get_term(cfg.params["command_name"])
+        self.body_subset = self.command.get_body_subset(cfg.params.get("body_names"))
 
 
 def motion_global_anchor_position_error_exp(env: ManagerBasedRLEnv, command_name: str, std: float) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    error = torch.sum(torch.square(command.anchor_pos_w - command.robot_anchor_pos_w), dim=-1)
+    error = command.tracking_errors.anchor_pos
     return torch.exp(-error / std**2)
 
 
 def motion_global_anchor_orientation_error_exp(env: ManagerBasedRLEnv, command_name: str, std: float) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    error = quat_error_magnitude(command.anchor_quat_w, command.robot_anchor_quat_w) ** 2
+    error = command.tracking_errors.anchor_rot**2
     return torch.exp(-error / std**2)
 
 
-def motion_relative_body_position_error_exp(
-    env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
-    body_indexes = _get_body_indexes(command, body_names)
-    error = torch.sum(
-        torch.square(command.body_pos_relative_w[:, body_indexes] - command.robot_body_pos_w[:, body_indexes]), dim=-1
-    )
-    return torch.exp(-error.mean(-1) / std**2)
+class motion_relative_body_position_error_exp(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        error = _select_bodies(self.command.tracking_errors.body_pos, self.body_subset)
+        return torch.exp(-error.mean(-1) / std**2)
 
 
-def motion_relative_body_orientation_error_exp(
-    env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
-    body_indexes = _get_body_indexes(command, body_names)
-    error = (
-        quat_error_magnitude(command.body_quat_relative_w[:, body_indexes], command.robot_body_quat_w[:, body_indexes])
-        ** 2
-    )
-    return torch.exp(-error.mean(-1) / std**2)
+class motion_relative_body_orientation_error_exp(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        error = _select_bodies(self.command.tracking_errors.body_rot, self.body_subset) ** 2
+        return torch.exp(-error.mean(-1) / std**2)
 
 
-def motion_global_body_linear_velocity_error_exp(
-    env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
-    body_indexes = _get_body_indexes(command, body_names)
-    error = torch.sum(
-        torch.square(command.body_lin_vel_w[:, body_indexes] - command.robot_body_lin_vel_w[:, body_indexes]), dim=-1
-    )
-    return torch.exp(-error.mean(-1) / std**2)
+class motion_global_body_linear_velocity_error_exp(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        error = _select_bodies(self.command.tracking_errors.body_lin_vel, self.body_subset)
+        return torch.exp(-error.mean(-1) / std**2)
 
 
-def motion_global_body_angular_velocity_error_exp(
-    env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
-    body_indexes = _get_body_indexes(command, body_names)
-    error = torch.sum(
-        torch.square(command.body_ang_vel_w[:, body_indexes] - command.robot_body_ang_vel_w[:, body_indexes]), dim=-1
-    )
-    return torch.exp(-error.mean(-1) / std**2)
+class motion_global_body_angular_velocity_error_exp(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, std: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        error = _select_bodies(self.command.tracking_errors.body_ang_vel, self.body_subset)
+        return torch.exp(-error.mean(-1) / std**2)
 
 
 def feet_contact_time(env: ManagerBasedRLEnv, sensor_cfg: SceneEntityCfg, threshold: float) -> torch.Tensor:
@@ -3,12 +3,6 @@ from __future__ import annotations
 import torch
 from typing import TYPE_CHECKING
 
-try:
-    from isaaclab.utils.math import quat_apply_inverse
-except ImportError:
-    from isaaclab.utils.math import quat_rotate_inverse as quat_apply_inverse
-
-
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedRLEnv
 
@@ -16,12 +10,13 @@ from isaaclab.assets import Articulation, RigidObject
 from isaaclab.managers import SceneEntityCfg
 
 from unitree_rl_lab.tasks.mimic.mdp.commands import MotionCommand
-from unitree_rl_lab.tasks.mimic.mdp.rewards import _get_body_indexes
+from unitree_rl_lab.tasks.mimic.mdp.rewards import _MotionBodyTerm, _select_bodies
+from unitree_rl_lab.utils.quat_kernels import quat_apply_inverse
 
 
 def bad_anchor_pos(env: ManagerBasedRLEnv, command_name: str, threshold: float) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    return torch.norm(command.anchor_pos_w - command.robot_anchor_pos_w, dim=1) > threshold
+    return command.tracking_errors.anchor_pos > threshold**2
 
 
 def bad_anchor_pos_z_only(env: ManagerBasedRLEnv, command_name: str, threshold: float) -> torch.Tensor:
@@ -42,21 +37,19 @@ def bad_anchor_ori(
     return (motion_projected_gravity_b[:, 2] - robot_projected_gravity_b[:, 2]).abs() > threshold
 
 
-def bad_motion_body_pos(
-    env: ManagerBasedRLEnv, command_name: str, threshold: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
-
-    body_indexes = _get_body_indexes(command, body_names)
-    error = torch.norm(command.body_pos_relative_w[:, body_indexes] - command.robot_body_pos_w[:, body_indexes], dim=-1)
-    return torch.any(error > threshold, dim=-1)
-
+class bad_motion_body_pos(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, threshold: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        error = _select_bodies(self.command.tracking_errors.body_pos, self.body_subset)
+        return torch.any(error > threshold**2, dim=-1)
 
-def bad_motion_body_pos_z_only(
-    env: ManagerBasedRLEnv, command_name: str, threshold: float, body_names: list[str] | None = None
-) -> torch.Tensor:
-    command: MotionCommand = env.command_manager.get_term(command_name)
 
-    body_indexes = _get_body_indexes(command, body_names)
-    error = torch.abs(command.body_pos_relative_w[:, body_indexes, -1] - command.robot_body_pos_w[:, body_indexes, -1])
-    return torch.any(error > threshold, dim=-1)
+class bad_motion_body_pos_z_only(_MotionBodyTerm):
+    def __call__(
+        self, env: ManagerBasedRLEnv, command_name: str, threshold: float, body_names: list[str] | None = None
+    ) -> torch.Tensor:
+        robot_body_pos_w = _select_bodies(self.command.robot_body_pos_w, self.body_subset)
+        body_pos_relative_w = _select_bodies(self.command.body_pos_relative_w, self.body_subset)
+        error = torch.abs(body_pos_relative_w[..., -1] - robot_body_pos_w[..., -1])
+        return torch.any(error > threshold, dim=-1)
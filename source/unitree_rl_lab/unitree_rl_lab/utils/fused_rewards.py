@@ -0,0 +1,315 @@
+"""Fused evaluation of the reward terms of a manager-based environment.
+
+The reward manager of Isaac Lab calls every term separately and then updates the reward, the episodic sum and the
+step reward of the term, so a step with 20 small terms launches well over a hundred tiny kernels. A
+:class:`FusedRewardEvaluator` replaces :meth:`RewardManager.compute` of an environment:
+
+* the values of all terms are written into one (num_terms, num_envs) block, and the weighting, the reward and the step
+  rewards are updated from it with a handful of kernels,
+* with the ``"compile"`` backend, the function terms are evaluated by one :func:`torch.compile` function.
+
+Terms that cannot be fused are evaluated eagerly: class-based terms (they keep state), the terms listed in
+``eager_terms``, terms that break the graph of :func:`torch.compile` or fail to compile, terms whose compiled function
+recompiles, and terms whose fused value differs from their eager value. The fused function is compiled with
+``fullgraph=True``; when it fails, the terms are compiled one by one to find the ones that cannot be fused.
+
+A compiled function guards on the Python state it read when it was traced, such as the step counter of a per-step cache
+or the timestamp of lazily refreshed asset data, and would recompile every step. The fused function therefore runs with
+recompilation disabled; when it would recompile, its terms are evaluated eagerly for the step and compiled one by one,
+and those whose own function recompiles on the next step stay eager. Every compiled function has its own copy of the
+code, so their compile caches are independent and other compiled functions of the process are left alone.
+
+The fused values are compared with the eager ones during the first ``validation_steps`` calls after the fused function
+is built, and then every ``validation_interval`` calls. The eager cost of the terms and the cost of the fused call are
+measured on these first calls, where the fused terms are evaluated eagerly for the comparison anyway, so the terms are
+not called more often than the steps need.
+
+.. code-block:: python
+
+    evaluator = FusedRewardEvaluator.install(env.unwrapped, backend="compile", eager_terms=["feet_slide"])
+    ...
+    print(evaluator.format_report())
+"""
+
+from __future__ import annotations
+
+import inspect
+import time
+import torch
+import types
+from collections.abc import Callable, Sequence
+from torch._dynamo.exc import RecompileError
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from isaaclab.envs import ManagerBasedRLEnv
+    from isaaclab.managers import RewardManager
+
+__all__ = ["FusedRewardEvaluator"]
+
+BACKENDS = ("eager", "compile")
+
+
+class FusedRewardEvaluator:
+    """Evaluates all reward terms of a :class:`RewardManager` with one fused call.
+
+    Args:
+        reward_manager: The reward manager whose terms are evaluated.
+        backend: ``"eager"`` (fused bookkeeping only) or ``"compile"``.
+        eager_terms: Names of terms, or of term functions, that are always evaluated eagerly, such as terms reading a
+            cache refreshed once per step.
+        validation_steps: The number of first calls of a fused function whose values are compared with the eager
+            values, and on which the costs are measured.
+        validation_interval: The number of calls between later comparisons. Zero disables them.
+        atol: The absolute tolerance of the comparison, relative to the magnitude of the eager values.
+    """
+
+    def __init__(
+        self,
+        reward_manager: RewardManager,
+        backend: str = "compile",
+        eager_terms: Sequence[str] = (),
+        validation_steps: int = 3,
+        validation_interval: int = 1000,
+        atol: float = 1e-4,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}.")
+        self.manager = reward_manager
+        self.backend = backend
+        self.eager_terms = set(eager_terms)
+        self.validation_steps = validation_steps
+        self.validation_interval = validation_interval
+        self.atol = atol
+        self.fallback_reasons: dict[str, str] = {}
+        """Why terms are evaluated eagerly, by term name."""
+        self.term_costs: dict[str, float] = {}
+        """Mean eager evaluation time of the active terms in milliseconds, measured on the first calls."""
+        self.fused_cost: float | None = None
+        """Mean time of one fused call in milliseconds, measured on the first calls of the fused function."""
+        self._costs: dict[str, tuple[float, int]] = {}
+        self._num_calls = 0
+        self._weights = None
+        self._dt = None
+        self._plan_key = None
+        self._probes: dict[int, Callable[[], torch.Tensor]] = {}
+
+    @classmethod
+    def install(cls, env: ManagerBasedRLEnv, **kwargs) -> FusedRewardEvaluator:
+        """Replaces the ``compute`` method of the reward manager of ``env`` with a fused evaluator."""
+        evaluator = cls(env.reward_manager, **kwargs)
+        env.reward_manager.compute = evaluator.compute
+        return evaluator
+
+    """
+    Operations.
+    """
+
+    def compute(self, dt: float) -> torch.Tensor:
+        """Computes the reward, with the same results and side effects as :meth:`RewardManager.compute`."""
+        manager = self.manager
+        weights = tuple(float(term_cfg.weight) for term_cfg in manager._term_cfgs)
+        if weights != self._weights or dt != self._dt:
+            # weights change with curricula; the set of active terms decides the layout
+            self._update_weights(weights, dt)
+        if self._plan_key != self._active:
+            self._plan()
+
+        measure = self._num_calls < self.validation_steps
+        self._evaluate(measure)
+        self._num_calls += 1
+        if self._fused_names and (
+            self._num_calls <= self.validation_steps
+            or (self.validation_interval > 0 and self._num_calls % self.validation_interval == 0)
+        ):
+            self._validate(measure)
+
+        # weighting and bookkeeping of all terms at once
+        torch.mul(self._values, self._scales, out=self._weighted)
+        torch.sum(self._weighted, dim=0, out=manager._reward_buf)
+        # the episodic sums stay owned by the manager, which resets them
+        for row, name in enumerate(self._active_names):
+            manager._episode_sums[name].add_(self._weighted[row])
+        manager._step_reward.index_copy_(1, self._active_index, (self._weighted / dt).T)
+        return manager._reward_buf
+
+    def format_report(self) -> str:
+        """Returns a table of the terms, how they are evaluated and their eager cost."""
+        if self._plan_key is None:
+            return "No reward has been computed yet."
+        lines = [f"{'term':<32} {'evaluation':<12} {'eager [ms]':>10}  note"]
+        for name in self._active_names:
+            mode = "fused" if name in self._fused_names else "eager"
+            cost = self.term_costs.get(name, float("nan"))
+            lines.append(f"{name:<32} {mode:<12} {cost:>10.4f}  {self.fallback_reasons.get(name, '')}")
+        lines.append(f"{'all terms, eager':<45} {sum(self.term_costs.values()):>10.4f}")
+        if self.fused_cost is not None:
+            fused_eager = sum(self.term_costs.get(name, 0.0) for name in self._fused_names)
+            lines.append(f"{'fused terms, eager':<45} {fused_eager:>10.4f}")
+            lines.append(f"{'fused terms, ' + self.backend:<45} {self.fused_cost:>10.4f}")
+        return "\n".join(lines)
+
+    """
+    Helpers.
+    """
+
+    def _update_weights(self, weights: tuple[float, ...], dt: float):
+        manager = self.manager
+        self._weights, self._dt = weights, dt
+        self._active = tuple(i for i, weight in enumerate(weights) if weight != 0.0)
+        self._active_names = [manager._term_names[i] for i in self._active]
+        self._scales = torch.tensor([weights[i] * dt for i in self._active], device=manager.device).unsqueeze(1)
+        # the step rewards of inactive terms stay zero, as in the reward manager
+        inactive = [i for i in range(len(weights)) if weights[i] == 0.0]
+        if inactive:
+            manager._step_reward[:, inactive] = 0.0
+
+    def _plan(self):
+        """Lays out the active terms, decides which ones are fused and builds the fused function."""
+        manager = self.manager
+        self._plan_key = self._active
+        self._active_index = torch.tensor(self._active, dtype=torch.long, device=manager.device)
+        num_envs = manager.num_envs
+        self._values = torch.zeros(len(self._active), num_envs, device=manager.device)
+        self._weighted = torch.zeros_like(self._values)
+
+        self._terms = [(name, manager._term_cfgs[i]) for name, i in zip(self._active_names, self._active)]
+        candidates = []
+        for row, (name, term_cfg) in enumerate(self._terms):
+            if self.backend == "eager":
+                self.fallback_reasons.setdefault(name, "eager backend")
+            elif not inspect.isfunction(term_cfg.func):
+                # an instance of a ManagerTermBase
+                self.fallback_reasons.setdefault(name, "class term")
+            elif name in self.eager_terms or getattr(term_cfg.func, "__name__", None) in self.eager_terms:
+                self.fallback_reasons.setdefault(name, "marked eager")
+            elif name not in self.fallback_reasons:
+                candidates.append(row)
+        self._probes = {}
+        self._build(candidates)
+
+    def _build(self, rows: list[int]):
+        """Builds the fused function of the terms in ``rows``, leaving out the terms that fail on their own."""
+        error = self._try_build(rows) if rows else None
+        if error is not None and len(rows) > 1:
+            errors = {row: self._try_build([row]) for row in rows}
+            for row, row_error in errors.items():
+                if row_error is not None:
+                    self.fallback_reasons[self._terms[row][0]] = row_error
+            rows = [row for row in rows if errors[row] is None]
+            error = self._try_build(rows) if rows else None
+        if error is not None:
+            for row in rows:
+                self.fallback_reasons[self._terms[row][0]] = error
+            rows = []
+        if not rows:
+            self._fused = None
+            self._fused_rows = torch.zeros(0, dtype=torch.long, device=self.manager.device)
+        self._fused_names = {self._terms[row][0] for row in rows}
+        self._eager_terms = [(row, term) for row, term in enumerate(self._terms) if row not in rows]
+        # a new fused function is validated and timed on its first calls
+        self._num_calls = 0
+        self.fused_cost = None
+        self._costs.pop("", None)
+
+    def _compile(self, rows: list[int]) -> Callable[[], torch.Tensor]:
+        env = self.manager._env
+        terms = [self._terms[row][1] for row in rows]
+
+        def evaluate_terms() -> torch.Tensor:
+            return torch.stack([term_cfg.func(env, **term_cfg.params).float() for term_cfg in terms])
+
+        # dynamo keeps the compiled code of a function on its code object, so every fused function and every probe
+        # gets a copy of it: their compile caches do not fill up or recompile each other
+        code = evaluate_terms.__code__.replace()
+        evaluate_terms = types.FunctionType(code, globals(), code.co_name, None, evaluate_terms.__closure__)
+        return torch.compile(evaluate_terms, dynamic=False, fullgraph=True)
+
+    def _try_build(self, rows: list[int]) -> str | None:
+        """Builds the fused function of ``rows`` and runs it once. Returns the error, or None on success."""
+        self._fused_rows = torch.tensor(rows, dtype=torch.long, device=self.manager.device)
+        try:
+            self._fused = self._compile(rows)
+            self._values.index_copy_(0, self._fused_rows, self._fused())
+        except Exception as e:
+            self._fused = None
+            return f"{self.backend} failed: {type(e).__name__}"
+        return None
+
+    def _evaluate(self, measure: bool):
+        """Writes the values of all active terms into their rows. The fused terms go first, see :meth:`_validate`."""
+        env = self.manager._env
+        if self._probes:
+            self._run_probes()
+        elif self._fused is not None:
+            try:
+                with torch._dynamo.config.patch(error_on_recompile=True):
+                    values = self._timed("", self._fused, measure)
+                self._values.index_copy_(0, self._fused_rows, values)
+            except RecompileError:
+                self._start_probes()
+        for row, (name, term_cfg) in self._eager_terms:
+            self._values[row] = self._timed(name, lambda: term_cfg.func(env, **term_cfg.params), measure)
+
+    def _start_probes(self):
+        """Compiles the fused terms one by one, after the fused function would have recompiled.
+
+        The probes are compiled and evaluated now, and run again on the next step to find the terms that recompile.
+        """
+        rows = self._fused_rows.tolist()
+        self._build([])
+        for row in rows:
+            try:
+                probe = self._compile([row])
+                self._values[row] = probe()[0]
+                self._probes[row] = probe
+            except Exception as e:
+                self.fallback_reasons[self._terms[row][0]] = f"{self.backend} failed: {type(e).__name__}"
+        self._eager_terms = [(row, term) for row, term in self._eager_terms if row not in self._probes]
+
+    def _run_probes(self):
+        """Runs the probes and fuses the terms whose probe did not recompile. The others are evaluated eagerly."""
+        rows = []
+        with torch._dynamo.config.patch(error_on_recompile=True):
+            for row, probe in self._probes.items():
+                try:
+                    probe()
+                    rows.append(row)
+                except RecompileError:
+                    self.fallback_reasons[self._terms[row][0]] = "recompiles every step"
+        self._probes = {}
+        self._build(rows)
+
+    def _validate(self, measure: bool):
+        """Compares the fused values with the eager values and evaluates the mismatching terms eagerly from now on."""
+        env = self.manager._env
+        mismatches = []
+        for row in self._fused_rows.tolist():
+            name, term_cfg = self._terms[row]
+            expected = self._timed(name, lambda: term_cfg.func(env, **term_cfg.params), measure).float()
+            error = (self._values[row] - expected).abs().max().item()
+            if not error <= self.atol * max(1.0, expected.abs().max().item()):
+                self.fallback_reasons[name] = f"mismatch {error:.2e}"
+                mismatches.append(row)
+            # the reward uses the eager value of the step
+            self._values[row] = expected
+        if mismatches:
+            self._build([row for row in self._fused_rows.tolist() if row not in mismatches])
+
+    def _timed(self, name: str, fn: Callable[[], torch.Tensor], measure: bool) -> torch.Tensor:
+        """Calls ``fn`` and, with ``measure``, adds its time to the costs of term ``name`` (the fused call for "")."""
+        if not measure:
+            return fn()
+        synchronize = torch.cuda.synchronize if str(self.manager.device).startswith("cuda") else lambda: None
+        synchronize()
+        start = time.perf_counter()
+        value = fn()
+        synchronize()
+        total, count = self._costs.get(name, (0.0, 0))
+        total, count = total + (time.perf_counter() - start) * 1e3, count + 1
+        self._costs[name] = (total, count)
+        if name:
+            self.term_costs[name] = total / count
+        else:
+            self.fused_cost = total / count
+        return value
@@ -0,0 +1,236 @@
+"""Batched quaternion kernels for the per-step hot paths of the tasks.
+
+The functions only depend on PyTorch and follow the conventions of :mod:`isaaclab.utils.math` (quaternions in
+``(w, x, y, z)`` order), so they can be benchmarked and checked against it without Isaac Sim. Unlike the Isaac Lab
+functions, they broadcast their inputs, which avoids repeating per-env frames for every body, and they only compute
+the parts of intermediate quaternions and matrices that the result needs. All functions are straight-line tensor code
+that can be scripted with :func:`torch.jit.script` or traced by :func:`torch.compile`. Functions with a trailing
+underscore write their result into preallocated ``out`` tensors.
+
+``scripts/benchmarks/quat_kernels.py`` checks the kernels against :mod:`isaaclab.utils.math` and times both.
+"""
+
+from __future__ import annotations
+
+import torch
+
+
+def quat_mul(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
+    """Multiplies two quaternions. Unlike :func:`isaaclab.utils.math.quat_mul`, the inputs are broadcast.
+
+    Args:
+        q1: The first quaternion. Shape is (..., 4).
+        q2: The second quaternion. Shape is (..., 4).
+
+    Returns:
+        The product ``q1 * q2``. Shape is the broadcast shape of the inputs.
+    """
+    w1, x1, y1, z1 = q1.unbind(-1)
+    w2, x2, y2, z2 = q2.unbind(-1)
+    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return torch.stack([w, x, y, z], dim=-1)
+
+
+def quat_inv(q: torch.Tensor) -> torch.Tensor:
+    """Inverts quaternions of any norm. Shape is (..., 4)."""
+    return q * torch.tensor([1.0, -1.0, -1.0, -1.0], device=q.device) / q.pow(2).sum(dim=-1, keepdim=True).clamp(1e-9)
+
+
+def yaw_quat(q: torch.Tensor) -> torch.Tensor:
+    """Extracts the (normalized) rotation about the world z-axis of quaternions. Shape is (..., 4)."""
+    w, x, y, z = q.unbind(-1)
+    yaw = torch.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    zeros = torch.zeros_like(yaw)
+    return torch.stack([torch.cos(yaw / 2), zeros, zeros, torch.sin(yaw / 2)], dim=-1)
+
+
+def quat_slerp(q0: torch.Tensor, q1: torch.Tensor, t: torch.Tensor) -> torch.Tensor:
+    """Interpolates unit quaternions spherically along the shorter arc.
+
+    Args:
+        q0: The quaternions at ``t = 0``. Shape is (..., 4).
+        q1: The quaternions at ``t = 1``. Shape is (..., 4).
+        t: The interpolation parameters. Shape is (..., 1), broadcast against the quaternions.
+
+    Returns:
+        The interpolated quaternions. Shape is the broadcast shape of the inputs.
+    """
+    q1 = torch.where((q0 * q1).sum(dim=-1, keepdim=True) < 0, -q1, q1)
+    # the angle between the 4D vectors; unlike acos of their dot product, this is accurate for close rotations
+    half_theta = 2.0 * torch.atan2(
+        torch.linalg.vector_norm(q0 - q1, dim=-1, keepdim=True), torch.linalg.vector_norm(q0 + q1, dim=-1, keepdim=True)
+    )
+    sin_half_theta = torch.sin(half_theta)
+    # fall back to linear interpolation for (nearly) identical rotations
+    small = sin_half_theta < 1e-6
+    sin_half_theta = torch.where(small, torch.ones_like(sin_half_theta), sin_half_theta)
+    w0 = torch.where(small, 1.0 - t, torch.sin((1.0 - t) * half_theta) / sin_half_theta)
+    w1 = torch.where(small, t, torch.sin(t * half_theta) / sin_half_theta)
+    return w0 * q0 + w1 * q1
+
+
+def axis_angle_from_quat(q: torch.Tensor, eps: float = 1.0e-6) -> torch.Tensor:
+    """Converts unit quaternions to rotation vectors, like :func:`isaaclab.utils.math.axis_angle_from_quat`.
+
+    The quaternions are flipped onto the hemisphere ``w >= 0``, so the angle is in ``[0, pi]``. Below ``eps`` the
+    ratio ``sin(angle / 2) / angle`` is replaced by its Taylor expansion. Shape is (..., 4) -> (..., 3).
+    """
+    q = torch.where(q[..., :1] < 0, -q, q)
+    half_angle = torch.atan2(torch.linalg.vector_norm(q[..., 1:], dim=-1), q[..., 0])
+    angle = 2.0 * half_angle
+    sin_half_angle_over_angle = torch.where(
+        angle.abs() > eps, torch.sin(half_angle) / angle, 0.5 - angle * angle / 48.0
+    )
+    return q[..., 1:] / sin_half_angle_over_angle.unsqueeze(-1)
+
+
+def matrix_from_quat(q: torch.Tensor) -> torch.Tensor:
+    """Converts quaternions of any norm to rotation matrices. Shape is (..., 4) -> (..., 3, 3)."""
+    w, x, y, z = q.unbind(-1)
+    two_s = 2.0 / q.pow(2).sum(dim=-1)
+    o = torch.stack(
+        [
+            1 - two_s * (y * y + z * z),
+            two_s * (x * y - z * w),
+            two_s * (x * z + y * w),
+            two_s * (x * y + z * w),
+            1 - two_s * (x * x + z * z),
+            two_s * (y * z - x * w),
+            two_s * (x * z - y * w),
+            two_s * (y * z + x * w),
+            1 - two_s * (x * x + y * y),
+        ],
+        dim=-1,
+    )
+    return o.reshape(q.shape[:-1] + (3, 3))
+
+
+def quat_left_matrix(q: torch.Tensor) -> torch.Tensor:
+    """Returns the matrices ``L(q)`` with ``L(q) @ p == q * p``. Shape is (..., 4) -> (..., 4, 4)."""
+    w, x, y, z = q.unbind(-1)
+    o = torch.stack([w, -x, -y, -z, x, w, -z, y, y, z, w, -x, z, -y, x, w], dim=-1)
+    return o.reshape(q.shape[:-1] + (4, 4))
+
+
+def quat_apply(q: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    """Rotates vectors by unit quaternions. Shapes (..., 4) and (..., 3) are broadcast."""
+    xyz = q[..., 1:]
+    t = torch.linalg.cross(xyz, v, dim=-1) * 2
+    return v + q[..., :1] * t + torch.linalg.cross(xyz, t, dim=-1)
+
+
+def quat_apply_inverse(q: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    """Rotates vectors by the inverse of unit quaternions. Shapes (..., 4) and (..., 3) are broadcast."""
+    xyz = q[..., 1:]
+    t = torch.linalg.cross(xyz, v, dim=-1) * 2
+    return v - q[..., :1] * t + torch.linalg.cross(xyz, t, dim=-1)
+
+
+def quat_error_magnitude(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
+    """Computes the rotation angle between unit quaternions, like :func:`isaaclab.utils.math.quat_error_magnitude`.
+
+    Only the parts of ``q1 * q2^-1`` that the angle needs are computed: the real part is the dot product of the
+    inputs and the imaginary part is ``w2 v1 - w1 v2 - v1 x v2``.
+
+    Args:
+        q1: The first quaternion. Shape is (..., 4).
+        q2: The second quaternion. Shape is (..., 4).
+
+    Returns:
+        The angle in ``[0, pi]``. Shape is the broadcast shape of the inputs without the last dimension.
+    """
+    w = (q1 * q2).sum(dim=-1)
+    v1, v2 = q1[..., 1:], q2[..., 1:]
+    v = q2[..., :1] * v1 - q1[..., :1] * v2 - torch.linalg.cross(v1, v2, dim=-1)
+    return 2.0 * torch.atan2(torch.linalg.vector_norm(v, dim=-1), w.abs())
+
+
+def matrix_6d_from_quat(q: torch.Tensor) -> torch.Tensor:
+    """Computes the 6D rotation representation of quaternions of any norm.
+
+    The result equals ``matrix_from_quat(q)[..., :2].flatten(-2)``, the first two columns of the rotation matrix in
+    row-major order, without computing the third column.
+
+    Args:
+        q: The quaternions. Shape is (..., 4).
+
+    Returns:
+        The 6D representation. Shape is (..., 6).
+    """
+    w, x, y, z = q.unbind(-1)
+    two_s = 2.0 / q.pow(2).sum(dim=-1)
+    return torch.stack(
+        [
+            1 - two_s * (y * y + z * z),
+            two_s * (x * y - z * w),
+            two_s * (x * y + z * w),
+            1 - two_s * (x * x + z * z),
+            two_s * (x * z - y * w),
+            two_s * (y * z + x * w),
+        ],
+        dim=-1,
+    )
+
+
+def subtract_frame_transforms(
+    t01: torch.Tensor, q01: torch.Tensor, t02: torch.Tensor, q02: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Expresses frame 2 in frame 1, like :func:`isaaclab.utils.math.subtract_frame_transforms` for unit ``q01``.
+
+    Frame 1 is broadcast against frame 2, so a per-env frame of shape (N, 3)/(N, 4) can be subtracted from per-body
+    frames of shape (N, B, 3)/(N, B, 4) by passing it as (N, 1, 3)/(N, 1, 4) instead of repeating it.
+
+    Args:
+        t01: Position of frame 1 w.r.t. frame 0. Shape is (..., 3).
+        q01: Orientation of frame 1 w.r.t. frame 0. Shape is (..., 4).
+        t02: Position of frame 2 w.r.t. frame 0. Shape is (..., 3).
+        q02: Orientation of frame 2 w.r.t. frame 0. Shape is (..., 4).
+
+    Returns:
+        The position and orientation of frame 2 w.r.t. frame 1.
+    """
+    return quat_apply_inverse(q01, t02 - t01), quat_mul(quat_inv(q01), q02)
+
+
+def relative_body_pose_(
+    anchor_pos_w: torch.Tensor,
+    anchor_quat_w: torch.Tensor,
+    target_anchor_pos_w: torch.Tensor,
+    target_anchor_quat_w: torch.Tensor,
+    body_pos_w: torch.Tensor,
+    body_quat_w: torch.Tensor,
+    out_pos: torch.Tensor,
+    out_quat: torch.Tensor,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Moves bodies from their anchor onto a target anchor, keeping the anchor height and correcting only the yaw.
+
+    With ``delta_ori = yaw(target_anchor_quat * anchor_quat^-1)`` and ``delta_pos`` the target anchor position at
+    the height of the anchor, the bodies are mapped to ``delta_ori * body_quat`` and
+    ``delta_pos + delta_ori (body_pos - anchor_pos)``. The transform is computed once per env and applied to all
+    bodies with two batched matrix products, so no per-body copies of the anchors are made.
+
+    Args:
+        anchor_pos_w: The anchor positions. Shape is (N, 3).
+        anchor_quat_w: The anchor orientations. Shape is (N, 4).
+        target_anchor_pos_w: The target anchor positions. Shape is (N, 3).
+        target_anchor_quat_w: The target anchor orientations. Shape is (N, 4).
+        body_pos_w: The body positions. Shape is (N, B, 3).
+        body_quat_w: The body orientations. Shape is (N, B, 4).
+        out_pos: The output body positions. Shape is (N, B, 3).
+        out_quat: The output body orientations. Shape is (N, B, 4).
+
+    Returns:
+        The tensors ``out_pos`` and ``out_quat``.
+    """
+    delta_ori_w = yaw_quat(quat_mul(target_anchor_quat_w, quat_inv(anchor_quat_w)))
+    delta_rot_w = matrix_from_quat(delta_ori_w)
+    delta_pos_w = target_anchor_pos_w.clone()
+    delta_pos_w[:, 2] = anchor_pos_w[:, 2]
+    # out_pos = delta_pos + R body_pos - R anchor_pos, with the per-env offset added by baddbmm
+    offset = delta_pos_w - torch.bmm(delta_rot_w, anchor_pos_w.unsqueeze(-1)).squeeze(-1)
+    torch.baddbmm(offset.unsqueeze(1), body_pos_w, delta_rot_w.transpose(1, 2), out=out_pos)
+    torch.bmm(body_quat_w, quat_left_matrix(delta_ori_w).transpose(1, 2), out=out_quat)
+    return out_pos, out_quat
@@ -0,0 +1,279 @@
+"""Per-term timing of the managers of a manager-based environment.
+
+A :class:`TermProfiler` wraps the function of every term of the observation, reward, termination, event and curriculum
+managers of an environment, and the methods that evaluate the managers, with timers. On a CUDA device the timers are
+CUDA events, so the times are those of the kernels of a term on the GPU and not of their launch; the events are read in
+batches, which synchronizes the device every few thousand terms. On the CPU the timers are wall-clock times.
+
+The report lists the mean and the 99th percentile time of every term and manager call, and their cost per environment
+step, so the cost of a reward design is visible next to its effect.
+
+.. code-block:: python
+
+    profiler = TermProfiler.install(env.unwrapped)
+    ...
+    profiler.write_report(log_dir)
+"""
+
+from __future__ import annotations
+
+import functools
+import numpy as np
+import os
+import time
+import torch
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from isaaclab.envs import ManagerBasedRLEnv
+
+__all__ = ["TermProfiler", "TermStats"]
+
+
+class TermStats:
+    """Call times of one term or manager, in milliseconds.
+
+    The mean covers all calls after the warm-up, the percentiles the last ``window`` calls.
+    """
+
+    def __init__(self, manager: str, name: str, window: int, warmup_calls: int):
+        self.manager = manager
+        self.name = name
+        self.num_calls = 0
+        """Number of calls, including the warm-up calls."""
+        self.total = 0.0
+        """Total time of the calls after the warm-up."""
+        self._warmup_calls = warmup_calls
+        self._samples = np.zeros(window)
+
+    def add(self, elapsed: float):
+        self.num_calls += 1
+        index = self.num_calls - self._warmup_calls - 1
+        if index >= 0:
+            self._samples[index % len(self._samples)] = elapsed
+            self.total += elapsed
+
+    @property
+    def num_samples(self) -> int:
+        """Number of timed calls after the warm-up."""
+        return max(self.num_calls - self._warmup_calls, 0)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.num_samples if self.num_samples else float("nan")
+
+    def percentile(self, q: float) -> float:
+        if not self.num_samples:
+            return float("nan")
+        return float(np.percentile(self._samples[: min(self.num_samples, len(self._samples))], q))
+
+
+class _CpuClock:
+    """Wall-clock timers."""
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def stop(self, stats: TermStats, start: float):
+        stats.add((time.perf_counter() - start) * 1e3)
+
+    def flush(self):
+        pass
+
+
+class _CudaClock:
+    """CUDA event timers. The events are recorded on the current stream and read when ``flush_size`` are pending."""
+
+    def __init__(self, flush_size: int = 4096):
+        self._flush_size = flush_size
+        self._events: list[torch.cuda.Event] = []
+        self._pending: list[tuple[TermStats, torch.cuda.Event, torch.cuda.Event]] = []
+
+    def _event(self) -> torch.cuda.Event:
+        return self._events.pop() if self._events else torch.cuda.Event(enable_timing=True)
+
+    def start(self) -> torch.cuda.Event:
+        event = self._event()
+        event.record()
+        return event
+
+    def stop(self, stats: TermStats, start: torch.cuda.Event):
+        end = self._event()
+        end.record()
+        self._pending.append((stats, start, end))
+        if len(self._pending) >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._pending[-1][2].synchronize()
+        for stats, start, end in self._pending:
+            stats.add(start.elapsed_time(end))
+            self._events += (start, end)
+        self._pending.clear()
+
+
+class _TimedTerm:
+    """Times the calls of a term function. Other attributes, such as ``reset`` of class terms, are forwarded."""
+
+    def __init__(self, func: Callable, clock: _CpuClock | _CudaClock, stats: TermStats):
+        functools.update_wrapper(self, func, updated=())
+        self.func = func
+        self._clock = clock
+        self._stats = stats
+
+    def __call__(self, *args, **kwargs):
+        start = self._clock.start()
+        value = self.func(*args, **kwargs)
+        self._clock.stop(self._stats, start)
+        return value
+
+    def __getattr__(self, name: str):
+        if name == "func":
+            raise AttributeError(name)
+        return getattr(self.func, name)
+
+
+class TermProfiler:
+    """Times the terms and the managers of a :class:`ManagerBasedRLEnv`.
+
+    Args:
+        env: The environment whose managers are timed.
+        window: The number of last calls of every term whose times are kept for the percentiles.
+        warmup_calls: The number of first calls of every term that are not timed.
+    """
+
+    MANAGER_METHODS = {
+        "observation": ("observation_manager", "compute"),
+        "reward": ("reward_manager", "compute"),
+        "termination": ("termination_manager", "compute"),
+        "event": ("event_manager", "apply"),
+        "curriculum": ("curriculum_manager", "compute"),
+    }
+    """The manager attribute of the environment and its timed method, by manager name."""
+
+    def __init__(self, env: ManagerBasedRLEnv, window: int = 10000, warmup_calls: int = 10):
+        self.env = env
+        self.window = window
+        self.warmup_calls = warmup_calls
+        self.clock = _CudaClock() if str(env.device).startswith("cuda") else _CpuClock()
+        self.term_stats: dict[tuple[str, str], TermStats] = {}
+        """Statistics of the term calls, by manager label and term name."""
+        self.manager_stats: dict[str, TermStats] = {}
+        """Statistics of the manager calls, by manager name. Event modes are timed separately, as ``event/<mode>``."""
+        self._start_step = env.common_step_counter
+
+    @classmethod
+    def install(cls, env: ManagerBasedRLEnv, **kwargs) -> TermProfiler:
+        """Wraps the terms and manager methods of ``env`` with timers."""
+        profiler = cls(env, **kwargs)
+        for manager_name, (attr, _) in cls.MANAGER_METHODS.items():
+            manager = getattr(env, attr, None)
+            if manager is None:
+                continue
+            for label, name, term_cfg in profiler._term_cfgs(manager_name, manager):
+                term_cfg.func = _TimedTerm(term_cfg.func, profiler.clock, profiler._stats(label, name))
+            profiler._wrap_manager(manager_name, manager)
+        return profiler
+
+    """
+    Operations.
+    """
+
+    def format_report(self) -> str:
+        """Returns a table of the managers and their terms, sorted by cost per environment step."""
+        self.clock.flush()
+        num_steps = max(self.env.common_step_counter - self._start_step, 1)
+        header = f"{'manager / term':<48} {'calls':>8} {'mean [ms]':>10} {'p99 [ms]':>10} {'ms/step':>9} {'share':>7}"
+        lines = [
+            f"{num_steps} environment steps, {'CUDA event' if isinstance(self.clock, _CudaClock) else 'CPU'} timers"
+        ]
+        lines += [header, "-" * len(header)]
+
+        def row(label: str, stats: TermStats, step_total: float) -> str:
+            per_step = stats.total / num_steps
+            share = per_step / step_total if step_total > 0 else float("nan")
+            return (
+                f"{label:<48} {stats.num_calls:>8} {stats.mean:>10.4f} {stats.percentile(99):>10.4f}"
+                f" {per_step:>9.4f} {share:>7.1%}"
+            )
+
+        step_total = sum(stats.total for stats in self.manager_stats.values()) / num_steps
+        for manager in sorted(self.manager_stats.values(), key=lambda stats: -stats.total):
+            lines.append(row(manager.name, manager, step_total))
+            terms = [stats for stats in self.term_stats.values() if stats.manager == manager.name and stats.num_calls]
+            for stats in sorted(terms, key=lambda stats: -stats.total):
+                lines.append(row(f"  {stats.name}", stats, manager.total / num_steps))
+        lines.append("share: of all managers for a manager, of its manager for a term")
+        return "\n".join(lines)
+
+    def write_report(self, log_dir: str) -> str:
+        """Writes the report to ``params/term_profile.txt`` of the run directory ``log_dir``. Returns the path."""
+        path = os.path.join(log_dir, "params", "term_profile.txt")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(self.format_report() + "\n")
+        return path
+
+    """
+    Helpers.
+    """
+
+    def _stats(self, manager: str, name: str) -> TermStats:
+        key = (manager, name)
+        if key not in self.term_stats:
+            self.term_stats[key] = TermStats(manager, name, self.window, self.warmup_calls)
+        return self.term_stats[key]
+
+    @staticmethod
+    def _term_cfgs(manager_name: str, manager) -> list[tuple[str, str, object]]:
+        """The manager label, name and configuration of the terms of a manager.
+
+        Event terms are listed under their mode, since every mode is applied separately, and observation terms are
+        named with their group.
+        """
+        if manager_name == "observation":
+            return [
+                (manager_name, f"{group}/{name}", term_cfg)
+                for group, names in manager._group_obs_term_names.items()
+                for name, term_cfg in zip(names, manager._group_obs_term_cfgs[group])
+            ]
+        if manager_name == "event":
+            return [
+                (f"event/{mode}", name, term_cfg)
+                for mode, names in manager._mode_term_names.items()
+                for name, term_cfg in zip(names, manager._mode_term_cfgs[mode])
+            ]
+        return [(manager_name, name, term_cfg) for name, term_cfg in zip(manager._term_names, manager._term_cfgs)]
+
+    def _wrap_manager(self, manager_name: str, manager):
+        method = getattr(manager, self.MANAGER_METHODS[manager_name][1])
+        clock = self.clock
+
+        if manager_name == "event":
+
+            @functools.wraps(method)
+            def timed(mode: str, *args, **kwargs):
+                label = f"event/{mode}"
+                if label not in self.manager_stats:
+                    self.manager_stats[label] = TermStats(label, label, self.window, self.warmup_calls)
+                start = clock.start()
+                value = method(mode, *args, **kwargs)
+                clock.stop(self.manager_stats[label], start)
+                return value
+
+        else:
+            stats = self.manager_stats[manager_name] = TermStats(
+                manager_name, manager_name, self.window, self.warmup_calls
+            )
+
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                start = clock.start()
+                value = method(*args, **kwargs)
+                clock.stop(stats, start)
+                return value
+
+        setattr(manager, self.MANAGER_METHODS[manager_name][1], timed)